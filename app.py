@@ -1,14 +1,19 @@
 # app.py
 from pathlib import Path
 import sys
-import importlib
+import os
+import time
 import streamlit as st
 
+_RUN_T0 = time.perf_counter()
+
 # ==== Paths & sys.path ====
 ROOT = Path(__file__).resolve().parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from core.profile_utils import profiler
+
 # ==== Streamlit ====
 st.set_page_config(
     page_title="VLabsTools",
@@ -16,7 +21,7 @@ st.set_page_config(
     layout="wide",
 )
 
-# ==== Import các trang sau khi đã config ====
+# ==== Danh sách trang (nạp lười) ====
 # Chỉ giữ các trang còn dùng: mainwindow_page, network_page, soft_page, encryption_page, about_page
 required_modules = {
     "mainwindow_page": "🏠 Home",
@@ -25,26 +30,17 @@ required_modules = {
     "encryption_page": "🔐 Encryption",
     "about_page":      "ℹ️ About",
 }
+PAGES = {label: mod_name for mod_name, label in required_modules.items()}
 
-PAGES = {}
-errors = []
-
-for mod_name, label in required_modules.items():
-    try:
-        mod = importlib.import_module(f"ui.{mod_name}")
-        render_fn = getattr(mod, "render", None)
-        if callable(render_fn):
-            PAGES[label] = render_fn
-        else:
-            errors.append(f"Module 'ui.{mod_name}' thiếu hàm render().")
-    except Exception as e:
-        errors.append(f"Lỗi import 'ui.{mod_name}': {e}")
-
-# Nếu có lỗi, hiển thị nhưng vẫn cho chạy các trang còn lại
-for msg in errors:
-    st.error(msg)
-if not PAGES:
-    st.stop()
+@st.cache_resource(show_spinner=False)
+def load_page(mod_name: str):
+    """Import 'ui.<mod_name>' lần đầu trang được chọn (đo giờ qua profiler); cache hàm render.
+    Import lỗi thì không cache -> lượt sau thử lại."""
+    mod = profiler().import_module(f"ui.{mod_name}")
+    render_fn = getattr(mod, "render", None)
+    if not callable(render_fn):
+        raise ImportError(f"Module 'ui.{mod_name}' thiếu hàm render().")
+    return render_fn
 
 # ==== Header (logo tuỳ chọn) ====
 logo_path = ROOT / "assets" / "logo.ico"  # đổi thành logo.png nếu cần
@@ -57,4 +53,35 @@ with cols[1]:
 
 # ==== Sidebar điều hướng ====
 choice = st.sidebar.radio(" ", list(PAGES.keys()))
-PAGES[choice]()
+try:
+    render_page = load_page(PAGES[choice])
+except Exception as e:
+    st.error(f"Lỗi import 'ui.{PAGES[choice]}': {e}")
+    st.stop()
+
+# ==== Startup profiler (?profile=1 hoặc VLABS_PROFILE=1) ====
+def _show_profile() -> None:
+    prof = profiler()
+    with st.sidebar.expander("⏱ Startup profile", expanded=False):
+        s = prof.summary()
+        age = s["process_age_at_first_run_s"]
+        st.caption(
+            (f"Cold start: {age:.1f}s tới lượt chạy đầu · " if age is not None else "")
+            + f"Import trang: {s['import_ms_total']:.0f} ms · {s['runs']} lượt chạy, "
+            + (f"lượt trước {s['last_run_ms']:.0f} ms, TB {s['avg_run_ms']:.0f} ms" if s["runs"] else "chưa có")
+        )
+        imports = prof.imports()
+        if imports:
+            st.dataframe([i.row() for i in imports], hide_index=True, use_container_width=True)
+        renders = prof.renders()
+        if renders:
+            st.dataframe([r._asdict() for r in renders], hide_index=True, use_container_width=True)
+
+if st.query_params.get("profile") or os.environ.get("VLABS_PROFILE"):
+    _show_profile()
+
+try:
+    with profiler().render(choice):
+        render_page()
+finally:
+    profiler().script_run((time.perf_counter() - _RUN_T0) * 1000)
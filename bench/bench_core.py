@@ -0,0 +1,310 @@
+# bench/bench_core.py
+"""
+Benchmark các hàm core với dịch vụ giả cục bộ (bench/standins.py), ở nhiều quy mô:
+
+    port_scan      N listener TCP, quét dải port bao trùm       (param = số listener)
+    bulk_dns       N tên qua stub DNS, cache nguội / ấm          (param = số tên)
+    ssl_inventory  N endpoint TLS tự ký, handshake song song     (param = số endpoint)
+    check_ssl      gọi tuần tự tới 1 endpoint TLS                (param = số lần gọi)
+    generate_one   sinh mật khẩu từng cái (secrets.choice/ký tự)  (param = độ dài)
+    iter_passwords sinh mật khẩu theo lô (os.urandom theo khối)   (param = độ dài, cùng quy mô generate_one)
+
+Mỗi ca đo: thông lượng (item/s), độ trễ p50/p90/p99 theo item, bộ nhớ đỉnh (tracemalloc,
+chạy ở 1 lượt riêng để không làm sai thời gian), số thread tối đa. Kết quả ghi JSON để so
+sánh giữa các lần chạy:
+
+    python bench/bench_core.py                                  # quick -> bench/results/<thời điểm>.json
+    python bench/bench_core.py --scale full --only port_scan,ssl_inventory -o base.json
+    python bench/compare.py base.json bench/results/<mới>.json
+"""
+from __future__ import annotations
+import argparse, json, math, os, platform, subprocess, sys, threading, time, tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.standins import ListenerFarm, StubDNS, TLSFarm
+from core import network_utils as nu
+from core.encryption_utils import build_charsets, generate_one, iter_passwords
+from core.port_utils import PortSet
+
+SCALES: Dict[str, Dict[str, Tuple[int, ...]]] = {
+    "quick": {"port_scan": (100, 1000), "bulk_dns": (100, 1000), "ssl_inventory": (10, 100),
+              "check_ssl": (20,), "generate_one": (16, 64, 128)},
+    "full":  {"port_scan": (100, 1000, 5000), "bulk_dns": (100, 1000, 10000),
+              "ssl_inventory": (10, 100, 500), "check_ssl": (20, 100), "generate_one": (16, 64, 128)},
+}
+
+class Sample(NamedTuple):
+    items: int
+    latencies_ms: List[float]
+    ok: bool = True
+    note: str = ""
+
+Run = Callable[[int], Sample]      # run(rep) -> Sample; rep khác nhau -> tránh cache giữa các lượt
+
+# --------- Các ca ---------
+@contextmanager
+def case_port_scan(listeners: int, args) -> Iterator[Run]:
+    with ListenerFarm(listeners) as farm:
+        # listener + cùng số port đóng lấy từ dải bao trùm (RST ngay) -> 2N port mỗi lượt
+        listening = set(farm.ports)
+        closed = islice((p for p in farm.span if p not in listening), listeners)
+        ports = PortSet.from_iterable(farm.ports) | PortSet.from_iterable(closed)
+
+        def run(rep: int) -> Sample:
+            got = list(nu.iter_port_scan("127.0.0.1", ports, timeout=args.timeout, workers=args.workers))
+            opened = {r.port for r in got if r.state == "open"}
+            missing = len(listening - opened)
+            return Sample(len(got), [r.rtt_ms for r in got if r.rtt_ms is not None], not missing,
+                          f"{len(ports)} port, thiếu {missing} listener" if missing else f"{len(ports)} port")
+        yield run
+
+def _dns_names(n: int, rep: int) -> List[str]:
+    # ~5% NXDOMAIN để có cả nhánh phủ định
+    return [f"{'nx' if i % 20 == 0 else 'h'}{i}-r{rep}.bench.test" for i in range(n)]
+
+@contextmanager
+def case_bulk_dns(names: int, args, warm: bool = False) -> Iterator[Run]:
+    with StubDNS(delay=args.dns_delay) as stub:
+        def resolve(batch: List[str]) -> List[nu.DnsResult]:
+            return list(nu.iter_bulk_dns(batch, ("A", "AAAA"), workers=args.dns_workers,
+                                         nameservers=["127.0.0.1"], port=stub.port, timeout=2.0))
+
+        def run(rep: int) -> Sample:
+            batch = _dns_names(names, rep)
+            if warm:
+                resolve(batch)
+            got = resolve(batch)
+            ok = sum(r.status == "OK" for r in got) == names - len(range(0, names, 20))
+            return Sample(len(got), [r.ms for r in got if r.ms is not None], ok)
+        yield run
+
+@contextmanager
+def case_bulk_dns_warm(names: int, args) -> Iterator[Run]:
+    with case_bulk_dns(names, args, warm=True) as run:
+        yield run
+
+@contextmanager
+def case_ssl_inventory(endpoints: int, args) -> Iterator[Run]:
+    with TLSFarm(endpoints) as farm:
+        def run(rep: int) -> Sample:
+            t0 = time.perf_counter()
+            lat: List[float] = []
+            got = 0
+            # cache_ttl=0: mỗi lượt handshake thật; độ trễ = thời điểm từng kết quả về
+            for info in nu._iter_async(lambda: nu.aiter_ssl_inventory(farm.endpoints, args.workers, 5.0, 0),
+                                       want=args.workers):
+                lat.append((time.perf_counter() - t0) * 1000)
+                got += info.not_after is not None
+            return Sample(len(lat), lat, got == endpoints)
+        yield run
+
+@contextmanager
+def case_check_ssl(calls: int, args) -> Iterator[Run]:
+    with TLSFarm(1) as farm:
+        host, port = farm.endpoints[0]
+
+        def run(rep: int) -> Sample:
+            lat = []
+            for _ in range(calls):
+                t0 = time.perf_counter()
+                nu.check_ssl(host, port)   # tự ký -> verify lỗi sau handshake, vẫn đo đủ 1 lượt kết nối
+                lat.append((time.perf_counter() - t0) * 1000)
+            return Sample(calls, lat)
+        yield run
+
+@contextmanager
+def case_generate_one(length: int, args) -> Iterator[Run]:
+    groups, combined = build_charsets(use_symbols=True)
+
+    def run(rep: int) -> Sample:
+        lat = []
+        clock = time.perf_counter_ns
+        for _ in range(args.passwords):
+            t0 = clock()
+            pw = generate_one(length, groups, combined)
+            lat.append((clock() - t0) / 1e6)
+        return Sample(args.passwords, lat, len(pw) == length)
+    yield run
+
+@contextmanager
+def case_iter_passwords(length: int, args) -> Iterator[Run]:
+    groups, combined = build_charsets(use_symbols=True)
+
+    def run(rep: int) -> Sample:
+        # độ trễ/item = khoảng cách giữa 2 lần yield (gồm cả lần đọc khối urandom kế tiếp)
+        lat = []
+        clock = time.perf_counter_ns
+        t0 = clock()
+        for pw in iter_passwords(args.passwords, length, groups, combined):
+            t1 = clock()
+            lat.append((t1 - t0) / 1e6)
+            t0 = t1
+        return Sample(len(lat), lat, len(lat) == args.passwords and len(pw) == length)
+    yield run
+
+CASES: Dict[str, Tuple[str, Callable]] = {
+    "port_scan":     ("port_scan", case_port_scan),
+    "bulk_dns":      ("bulk_dns", case_bulk_dns),
+    "bulk_dns_warm": ("bulk_dns", case_bulk_dns_warm),   # cùng quy mô với bulk_dns
+    "ssl_inventory": ("ssl_inventory", case_ssl_inventory),
+    "check_ssl":     ("check_ssl", case_check_ssl),
+    "generate_one":  ("generate_one", case_generate_one),
+    "iter_passwords": ("generate_one", case_iter_passwords),
+}
+
+# --------- Đo ---------
+def _os_threads() -> int | None:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+class _ThreadSampler:
+    """Lấy mẫu số thread (Python và của hệ điều hành) mỗi 5 ms trong lúc chạy."""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self.peak_os = _os_threads()
+        self._stop = threading.Event()
+        self._t = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(0.005):
+            self.peak = max(self.peak, threading.active_count() - 1)
+            n = _os_threads()
+            if n is not None:
+                self.peak_os = max(self.peak_os or 0, n - 1)
+
+    def __enter__(self) -> _ThreadSampler:
+        self._t.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._t.join()
+
+def percentile(sorted_vals: List[float], q: float) -> float | None:
+    """Nearest-rank trên list đã sắp xếp."""
+    if not sorted_vals:
+        return None
+    k = min(len(sorted_vals), max(1, math.ceil(q / 100 * len(sorted_vals)))) - 1
+    return sorted_vals[k]
+
+def measure(run: Run, repeat: int, memory: bool) -> dict:
+    runs: List[Tuple[float, Sample, int, int | None]] = []
+    threads_before = threading.active_count()
+    for rep in range(repeat):
+        with _ThreadSampler() as ts:
+            t0 = time.perf_counter()
+            sample = run(rep)
+            dt = time.perf_counter() - t0
+        runs.append((dt, sample, ts.peak, ts.peak_os))
+    runs.sort(key=lambda r: r[0])
+    dt, sample, peak, peak_os = runs[len(runs) // 2]          # lượt trung vị theo thời gian
+    lat = sorted(sample.latencies_ms)
+    out = {
+        "items": sample.items,
+        "seconds": round(dt, 6),
+        "seconds_all": [round(r[0], 6) for r in runs],
+        "throughput": round(sample.items / dt, 2) if dt > 0 else None,
+        "p50_ms": percentile(lat, 50), "p90_ms": percentile(lat, 90), "p99_ms": percentile(lat, 99),
+        "max_ms": lat[-1] if lat else None,
+        "threads_before": threads_before, "peak_threads": peak, "peak_os_threads": peak_os,
+        "ok": all(r[1].ok for r in runs), "note": sample.note,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            run(repeat)
+            out["peak_kib"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+    return out
+
+def _meta(args) -> dict:
+    try:
+        rev = subprocess.run(["git", "-C", str(ROOT), "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        rev = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git": rev, "python": platform.python_version(), "platform": platform.platform(),
+        "cpus": os.cpu_count(), "scale": args.scale, "repeat": args.repeat,
+        "args": {k: v for k, v in vars(args).items() if k not in ("output", "only")},
+    }
+
+def _raise_nofile() -> None:
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except Exception:
+        pass
+
+def _fmt(v, spec: str) -> str:
+    return "-" if v is None else format(v, spec)
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark core/ với dịch vụ giả cục bộ.")
+    ap.add_argument("--scale", choices=sorted(SCALES), default="quick")
+    ap.add_argument("--only", help=f"danh sách ca, phân cách dấu phẩy: {','.join(CASES)}")
+    ap.add_argument("--repeat", type=int, default=3, help="số lượt mỗi ca (báo cáo lượt trung vị)")
+    ap.add_argument("--no-memory", action="store_true", help="bỏ lượt đo bộ nhớ bằng tracemalloc")
+    ap.add_argument("--timeout", type=float, default=0.5, help="timeout port scan")
+    ap.add_argument("--workers", type=int, default=1000, help="kết nối đồng thời cho scan/TLS")
+    ap.add_argument("--dns-workers", type=int, default=200)
+    ap.add_argument("--dns-delay", type=float, default=0.0, help="độ trễ giả lập của stub DNS (giây)")
+    ap.add_argument("--passwords", type=int, default=20000, help="số mật khẩu mỗi lượt generate_one/iter_passwords")
+    ap.add_argument("-o", "--output", help="file JSON (mặc định bench/results/bench-<thời điểm>.json)")
+    args = ap.parse_args()
+
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        ap.error(f"ca không tồn tại: {', '.join(unknown)}")
+    _raise_nofile()
+    nu.set_network_owner("bench")
+
+    results = []
+    print(f"{'bench':<14} {'param':>6} {'items':>7} {'s':>8} {'item/s':>10} {'p50':>8} {'p90':>8} "
+          f"{'p99':>8} {'KiB':>9} {'thr':>4}  ok")
+    for name in names:
+        scale_key, factory = CASES[name]
+        for param in SCALES[args.scale][scale_key]:
+            try:
+                with factory(param, args) as run:
+                    res = measure(run, max(1, args.repeat), not args.no_memory)
+            except Exception as e:   # vd. thiếu openssl/dnspython: ghi lại, chạy tiếp ca khác
+                res = {"error": f"{type(e).__name__}: {e}"}
+                print(f"{name:<14} {param:>6}  LỖI {res['error']}")
+            else:
+                print(f"{name:<14} {param:>6} {res['items']:>7} {res['seconds']:>8.3f} "
+                      f"{_fmt(res['throughput'], '.0f'):>10} {_fmt(res['p50_ms'], '.3f'):>8} "
+                      f"{_fmt(res['p90_ms'], '.3f'):>8} {_fmt(res['p99_ms'], '.3f'):>8} "
+                      f"{_fmt(res.get('peak_kib'), '.0f'):>9} {res['peak_threads']:>4}  "
+                      f"{'yes' if res['ok'] else 'NO'} {res['note']}", flush=True)
+            results.append({"bench": name, "param": param, **res})
+
+    out = Path(args.output) if args.output else (
+        ROOT / "bench" / "results" / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"meta": _meta(args), "results": results}, indent=2), encoding="utf-8")
+    print(f"-> {out}")
+    return 0 if all(r.get("ok") for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# bench/bench_port_scan.py
+"""
+So sánh engine asyncio của port_scan với bản ThreadPoolExecutor cũ.
+
+Mở N listener trên 127.0.0.1 (port ngẫu nhiên), quét dải port bao trùm chúng
+bằng cả 2 engine rồi in thời gian, tốc độ (port/s) và số thread tối đa.
+
+    python bench/bench_port_scan.py --listeners 3000
+"""
+from __future__ import annotations
+import argparse, socket, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.network_utils import iter_port_scan
+
+
+def open_listeners(n: int) -> list[socket.socket]:
+    socks = []
+    for _ in range(n):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind(("127.0.0.1", 0))
+        s.listen(64)
+        socks.append(s)
+    return socks
+
+
+def _probe_port(host: str, port: int, timeout: float) -> tuple[int, bool]:
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return port, True
+    except Exception:
+        return port, False
+
+
+def legacy_scan(host: str, ports: list[int], timeout: float, workers: int) -> list[int]:
+    """Bản cũ: 1 future cho mỗi port trong pool 200 thread."""
+    open_ports = []
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = {ex.submit(_probe_port, host, p, timeout): p for p in ports}
+        for fut in as_completed(futures):
+            port, ok = fut.result()
+            if ok:
+                open_ports.append(port)
+    return sorted(open_ports)
+
+
+def async_scan(host: str, ports: list[int], timeout: float, workers: int) -> list[int]:
+    return sorted(r.port for r in iter_port_scan(host, ports, timeout, workers) if r.state == "open")
+
+
+def run(name: str, fn, host: str, ports: list[int], timeout: float, workers: int) -> list[int]:
+    peak = [threading.active_count()]
+    stop = threading.Event()
+
+    def sample() -> None:
+        while not stop.wait(0.05):
+            peak[0] = max(peak[0], threading.active_count())
+
+    t = threading.Thread(target=sample, daemon=True)
+    t.start()
+    t0 = time.perf_counter()
+    found = fn(host, ports, timeout, workers)
+    dt = time.perf_counter() - t0
+    stop.set()
+    t.join()
+    print(f"{name:<8} {len(ports):>7} ports  {dt:7.2f} s  {len(ports) / dt:9.0f} ports/s  "
+          f"open={len(found):<6} peak threads={peak[0]}")
+    return found
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--listeners", type=int, default=3000)
+    ap.add_argument("--timeout", type=float, default=0.3)
+    ap.add_argument("--legacy-workers", type=int, default=200)
+    ap.add_argument("--workers", type=int, default=1000)
+    args = ap.parse_args()
+
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except Exception:
+        pass
+
+    socks = open_listeners(args.listeners)
+    try:
+        opened = sorted(s.getsockname()[1] for s in socks)
+        ports = list(range(opened[0], opened[-1] + 1))
+        a = run("legacy", legacy_scan, "127.0.0.1", ports, args.timeout, args.legacy_workers)
+        b = run("asyncio", async_scan, "127.0.0.1", ports, args.timeout, args.workers)
+        # Dải quét trùng dải port nguồn ephemeral nên có thể có vài "self-connect" lẻ tẻ,
+        # chỉ cần cả 2 engine đều thấy đủ các listener đã mở.
+        missing = set(opened) - set(a) or set(opened) - set(b)
+        assert not missing, f"Thiếu port: {sorted(missing)[:10]}"
+    finally:
+        for s in socks:
+            s.close()
+
+
+if __name__ == "__main__":
+    main()
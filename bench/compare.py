@@ -0,0 +1,77 @@
+# bench/compare.py
+"""
+So sánh 2 file kết quả của bench_core.py (cũ -> mới), ghép theo (bench, param).
+
+    python bench/compare.py base.json new.json --threshold 10
+
+Đánh dấu REGRESSION khi thông lượng giảm hoặc p99 / bộ nhớ đỉnh tăng quá 'threshold' %;
+exit 1 nếu có (dùng được trong CI).
+"""
+from __future__ import annotations
+import argparse, json, sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# (trường, lớn hơn là tốt hơn?)
+METRICS: Tuple[Tuple[str, bool], ...] = (
+    ("throughput", True), ("p50_ms", False), ("p99_ms", False), ("peak_kib", False), ("peak_threads", False),
+)
+GATED = ("throughput", "p99_ms", "peak_kib")
+
+def load(path: str) -> Tuple[dict, Dict[Tuple[str, int], dict]]:
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    return data.get("meta", {}), {(r["bench"], r["param"]): r for r in data.get("results", [])}
+
+def change_pct(old, new) -> float | None:
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+def compare(old: Dict, new: Dict, threshold: float) -> Tuple[List[List[str]], int]:
+    rows, regressions = [], 0
+    for key in sorted(old.keys() | new.keys()):
+        a, b = old.get(key), new.get(key)
+        row = [key[0], str(key[1])]
+        if a is None or b is None or "error" in a or "error" in b:
+            rows.append(row + ["(chỉ có ở 1 bên hoặc lỗi)"])
+            continue
+        flags = []
+        for field, higher_better in METRICS:
+            pct = change_pct(a.get(field), b.get(field))
+            if pct is None:
+                row.append("-")
+                continue
+            row.append(f"{b[field]:.4g} ({pct:+.1f}%)")
+            worse = -pct if higher_better else pct
+            if field in GATED and worse > threshold:
+                flags.append(field)
+        if not b.get("ok", True):
+            flags.append("ok")
+        regressions += bool(flags)
+        note = "REGRESSION: " + ", ".join(flags) if flags else ""
+        if a.get("items") != b.get("items"):
+            note = f"{note} (items {a.get('items')} -> {b.get('items')})".strip()
+        rows.append(row + [note])
+    return rows, regressions
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="So sánh 2 lần chạy bench_core.py.")
+    ap.add_argument("old")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=10.0, help="% thay đổi coi là regression")
+    args = ap.parse_args()
+
+    meta_a, old = load(args.old)
+    meta_b, new = load(args.new)
+    print(f"cũ: {meta_a.get('git')} {meta_a.get('timestamp')}  ->  mới: {meta_b.get('git')} {meta_b.get('timestamp')}")
+    if (meta_a.get("cpus"), meta_a.get("python")) != (meta_b.get("cpus"), meta_b.get("python")):
+        print("Cảnh báo: khác số CPU / phiên bản Python, so sánh chỉ mang tính tham khảo.")
+    rows, regressions = compare(old, new, args.threshold)
+    header = ["bench", "param"] + [m for m, _ in METRICS] + [""]
+    widths = [max(len(str(r[i])) if i < len(r) else 0 for r in rows + [header]) for i in range(len(header))]
+    for r in [header] + rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(r, widths)).rstrip())
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+# bench/smoke.py
+"""
+Kiểm tra nhanh hành vi core với dịch vụ giả cục bộ (bench/standins.py), không cần mạng ngoài:
+
+- PortSet: parse (dải, dải đảo, khoảng trắng, spec sai), biên 1/65535, gộp đoạn chồng/kề,
+  |, -, &, in (bisect) so với set Python trên dải ngẫu nhiên
+- banner grab: ssh/smtp/ftp/http/tls/silent qua port scan có banners=True
+- IP public: nguồn bị blackhole không chặn câu trả lời, câu trả lời rác bị bỏ qua,
+  lần gọi lại lấy từ cache (không request mới), tất cả nguồn chết -> None đúng hạn
+- DER parser (chứng chỉ tự ký của TLSFarm): subject/issuer/SAN/ngày hiệu lực khớp openssl và
+  getpeercert() của CPython, cả UTCTime lẫn GeneralizedTime (sau 2050); DER cắt cụt -> {},
+  DER bị sửa ngẫu nhiên không làm văng exception
+- wordlist kèm sẵn: chỉ mục .wlx trong assets/wordlists khớp từng từ với file text, được chọn
+  mặc định và sinh passphrase đúng số từ, không cần thư mục cache
+- bulk DNS (stub DNS): A/AAAA/MX đúng giá trị, NXDOMAIN, CNAME theo tới đích, server không
+  trả lời -> lỗi timeout đúng hạn mà không chặn các tên khác, lần hỏi lại lấy từ cache
+
+    python bench/smoke.py            # exit 1 nếu có kiểm tra FAIL
+"""
+from __future__ import annotations
+import random, ssl, subprocess, sys, time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.standins import BannerFarm, IPSource, StubDNS, TLSFarm
+from core import network_utils as nu
+from core.port_utils import PORT_MAX, PORT_MIN, PortSet, RankedPorts
+
+Check = Tuple[str, bool, str]
+
+def check_portset() -> List[Check]:
+    out: List[Check] = []
+    cases = (
+        ("22,80,443", ((22, 22), (80, 80), (443, 443))),
+        ("1024-1, 80", ((1, 1024),)),                      # dải đảo + port nằm trong dải
+        (" 20 - 25 ,26,27-30", ((20, 30),)),               # khoảng trắng, đoạn kề nhau được gộp
+        ("10-20,15-30,40-50,31-39", ((10, 50),)),          # chồng + kề
+        ("0,1,65535,65536,70000-80000", ((1, 1), (65535, 65535))),
+        ("0-100,65500-99999", ((1, 100), (65500, 65535))),
+        ("abc,80-,-5,1-2-3,,8x,443", ((443, 443),)),       # phần sai bị bỏ qua
+        ("", ()),
+        ("1-65535", ((1, 65535),)),
+    )
+    for spec, want in cases:
+        got = PortSet.parse(spec)
+        out.append((f"portset parse {spec!r}", got.ranges == want, str(got)))
+
+    full = PortSet.full()
+    out.append(("portset full: len/biên", len(full) == 65535 and PORT_MIN in full and PORT_MAX in full
+                and 0 not in full and 65536 not in full and "80" not in full, str(full)))
+    out.append(("portset from_iterable", PortSet.from_iterable(range(1, 1025)).ranges == ((1, 1024),)
+                and PortSet.from_iterable(range(5, 5)).ranges == ()
+                and PortSet.from_iterable([3, 1, 2, 2, 9]).ranges == ((1, 3), (9, 9))
+                and PortSet.from_iterable(range(0, 70000)) == full, ""))
+    a, b = PortSet.parse("1-100,200-300"), PortSet.parse("50-250,400")
+    out.append(("portset |", str(a | b) == "1-300,400", str(a | b)))
+    out.append(("portset -", str(a - b) == "1-49,251-300" and str(b - a) == "101-199,400", f"{a - b} / {b - a}"))
+    out.append(("portset &", str(a & b) == "50-100,200-250" and (a & b) == (b & a), str(a & b)))
+    out.append(("portset - biên", str(full - PortSet.parse("1,65535")) == "2-65534"
+                and not (full - full) and (full - PortSet()) == full, ""))
+
+    # so với set Python trên dải ngẫu nhiên (gồm cả biên và ngoài biên)
+    rng, bad = random.Random(5), []
+    def rand_spec() -> str:
+        parts = []
+        for _ in range(rng.randint(0, 6)):
+            lo = rng.choice((rng.randint(-5, 70000), rng.randint(1, 60), rng.randint(65480, 65540)))
+            parts.append(str(lo) if rng.random() < 0.3 else f"{lo}-{lo + rng.randint(-40, 200)}")
+        return ",".join(parts)
+    def model(spec: str) -> set:
+        ports = set()
+        for part in spec.split(","):
+            if not part:
+                continue
+            lo, _, hi = part.partition("-") if not part.startswith("-") else ("x", "", "")
+            try:
+                lo, hi = int(lo), int(hi or lo)
+            except ValueError:
+                continue
+            ports.update(range(max(min(lo, hi), PORT_MIN), min(max(lo, hi), PORT_MAX) + 1))
+        return ports
+    for i in range(300):
+        sa, sb = rand_spec(), rand_spec()
+        pa, pb, ma, mb = PortSet.parse(sa), PortSet.parse(sb), model(sa), model(sb)
+        probes = {0, 1, 2, 65534, 65535, 65536} | {rng.randint(-10, 66000) for _ in range(20)}
+        ok = (set(pa) == ma and len(pa) == len(ma) and list(pa) == sorted(ma)
+              and set(pa | pb) == ma | mb and set(pa - pb) == ma - mb and set(pa & pb) == ma & mb
+              and all((p in pa) == (p in ma) for p in probes | ma)
+              and all(lo2 > hi1 + 1 for (_, hi1), (lo2, _) in zip(pa.ranges, pa.ranges[1:])))
+        if not ok:
+            bad.append((sa, sb))
+    out.append(("portset so với set (300 cặp)", not bad, str(bad[:2])))
+
+    ranked = list(RankedPorts(PortSet.parse("1-1024")))
+    out.append(("ranked: top trước, không trùng", ranked[:3] == [80, 23, 443] and len(ranked) == 1024
+                and sorted(ranked) == list(range(1, 1025)), str(ranked[:5])))
+    out.append(("ranked: top_n", list(RankedPorts(PortSet.parse("1-30"), top_n=5)) == [23, 21, 22, 25, 26],
+                str(list(RankedPorts(PortSet.parse("1-30"), top_n=5)))))
+    return out
+
+def check_banners() -> List[Check]:
+    out: List[Check] = []
+    with BannerFarm() as farm:
+        # stand-in TLS chạy ở port ngẫu nhiên: đánh dấu tạm là port TLS để đi nhánh handshake
+        nu._TLS_PORTS.add(farm.ports["tls"])
+        try:
+            t0 = time.perf_counter()
+            got = {r.port: r for r in nu.iter_port_scan("127.0.0.1", PortSet.from_iterable(farm.ports.values()),
+                                                        timeout=1.0, banners=True)}
+            elapsed = time.perf_counter() - t0
+        finally:
+            nu._TLS_PORTS.discard(farm.ports["tls"])
+        expect = {"ssh": "SSH-2.0-OpenSSH", "smtp": "220 mail.standin.test", "ftp": "220 standin FTP",
+                  "http": "Server: standin-http", "tls": "TLS"}
+        for kind, port in farm.ports.items():
+            r = got.get(port)
+            detail = r.detail if r else None
+            if kind == "silent":
+                ok = r is not None and r.state == "open" and not detail
+            else:
+                ok = r is not None and r.state == "open" and expect[kind] in (detail or "")
+            out.append((f"banner {kind}", ok, repr(detail)))
+        # silent chờ hết timeout banner; các port khác chạy song song -> không cộng dồn
+        out.append(("banner song song", elapsed < nu._BANNER_TIMEOUT + 1.5, f"{elapsed:.2f}s"))
+    return out
+
+def check_public_ip() -> List[Check]:
+    out: List[Check] = []
+    timeout = 2.0
+    with IPSource("dead") as dead, IPSource("slow", ip="198.51.100.9", delay=0.2) as slow, \
+            IPSource("bad") as bad, IPSource("ok", kind="text") as txt:
+        nu._PUBLIC_IP_CACHE.clear()
+        t0 = time.perf_counter()
+        info = nu.get_public_ip_info([dead.source, slow.source], timeout=timeout)
+        elapsed = time.perf_counter() - t0
+        out.append(("race: blackhole không chặn", info is not None and info.ip == "198.51.100.9"
+                    and info.source == slow.source[0] and elapsed < timeout, f"{info} {elapsed:.2f}s"))
+
+        hits = slow.hits
+        again = nu.get_public_ip_info([dead.source, slow.source], timeout=timeout)
+        out.append(("race: cache hit", again is not None and again.cached and slow.hits == hits
+                    and again.ip == info.ip, f"{again} hits={slow.hits}"))
+
+        info = nu.get_public_ip_info([bad.source, slow.source], timeout=timeout)
+        out.append(("race: bỏ câu trả lời không phải IP", info is not None and info.source == slow.source[0],
+                    str(info)))
+
+        info = nu.get_public_ip_info([dead.source, txt.source], timeout=timeout)
+        out.append(("race: nguồn dạng text", info is not None and info.ip == "203.0.113.7", str(info)))
+
+        nu._PUBLIC_IP_CACHE.clear()
+        t0 = time.perf_counter()
+        info = nu.get_public_ip_info([dead.source, bad.source], timeout=0.5)
+        elapsed = time.perf_counter() - t0
+        out.append(("race: mọi nguồn hỏng -> None", info is None and elapsed < 0.5 + 1.5, f"{info} {elapsed:.2f}s"))
+        nu._PUBLIC_IP_CACHE.clear()
+    return out
+
+def _openssl_dates(cert: Path) -> Tuple[str, str]:
+    text = subprocess.run(["openssl", "x509", "-noout", "-startdate", "-enddate", "-in", str(cert)],
+                          check=True, capture_output=True, text=True, timeout=30).stdout
+    dates = dict(line.split("=", 1) for line in text.splitlines() if "=" in line)
+    return dates["notBefore"], dates["notAfter"]
+
+def check_der_parser() -> List[Check]:
+    out: List[Check] = []
+    sans = "DNS:a.standin.test,DNS:*.b.standin.test,IP:127.0.0.1,IP:2001:db8::1,email:ops@standin.test"
+    expect_sans = (("DNS", "a.standin.test"), ("DNS", "*.b.standin.test"), ("IP Address", "127.0.0.1"),
+                   ("IP Address", "2001:DB8:0:0:0:0:0:1"), ("email", "ops@standin.test"))
+    subj = "/C=VN/O=Standin Org/CN=der.standin.test"
+    reference = getattr(ssl._ssl, "_test_decode_cert", None)   # bộ giải mã của CPython (API test)
+    der = b""
+    for label, days in (("UTCTime", 30), ("GeneralizedTime", 36500)):
+        with TLSFarm(1, cn="der.standin.test", days=days, sans=sans, subj=subj) as farm:
+            # đầu-cuối: chứng chỉ tự ký -> handshake không verify -> _decode_der_cert
+            info = nu.ssl_inventory(farm.endpoints, timeout=5.0, cache_ttl=0)[0]
+            der = ssl.PEM_cert_to_DER_cert(farm.cert.read_text())
+            parsed = nu._parse_der_cert(der)
+            before, after = _openssl_dates(farm.cert)
+            out.append((f"der {label}: ngày hiệu lực", parsed["notBefore"] == before and parsed["notAfter"] == after
+                        and info.not_after == after and info.days_left in (days - 1, days),
+                        f"{parsed['notAfter']} / openssl {after} / days_left={info.days_left}"))
+            out.append((f"der {label}: SAN", parsed.get("subjectAltName") == expect_sans
+                        and info.sans == tuple(v for k, v in expect_sans if k != "email"),
+                        str(parsed.get("subjectAltName"))))
+            out.append((f"der {label}: subject/issuer",
+                        parsed["subject"] == ((("countryName", "VN"),), (("organizationName", "Standin Org"),),
+                                              (("commonName", "der.standin.test"),))
+                        and parsed["issuer"] == parsed["subject"] and info.subject == "der.standin.test"
+                        and info.verified is False, str(parsed["subject"])))
+            if reference is not None:
+                ref = reference(str(farm.cert))
+                keys = ("subject", "issuer", "notBefore", "notAfter", "subjectAltName")
+                diff = [k for k in keys if ref.get(k) != parsed.get(k)]
+                out.append((f"der {label}: khớp getpeercert()", not diff, f"khác: {diff}" if diff else "5 trường"))
+
+    cuts = sorted({1, 2, 10, len(der) // 2, len(der) - 1})
+    bad = [n for n in cuts if nu._decode_der_cert(der[:n]) != {}]
+    out.append(("der: cắt cụt -> {}", not bad, f"cắt tại {cuts}" + (f", sai: {bad}" if bad else "")))
+
+    rng, crashed = random.Random(7), []
+    for i in range(300):
+        buf = bytearray(der)
+        for _ in range(rng.randint(1, 4)):
+            buf[rng.randrange(len(buf))] = rng.randrange(256)
+        try:
+            if not isinstance(nu._decode_der_cert(bytes(buf)), dict):
+                crashed.append(i)
+        except Exception as e:
+            crashed.append(f"{i}: {type(e).__name__}")
+    out.append(("der: sửa ngẫu nhiên không văng", not crashed, f"300 mẫu" + (f", lỗi: {crashed[:5]}" if crashed else "")))
+    return out
+
+def check_wordlist() -> List[Check]:
+    from core import encryption_utils as eu
+    out: List[Check] = []
+    wl_dir = ROOT / "assets" / "wordlists"
+    for txt in sorted(wl_dir.glob("*.txt")):
+        idx = txt.with_suffix(".wlx")
+        if not idx.exists():
+            continue
+        words = eu.parse_wordlist(txt.read_text(encoding="utf-8"))
+        wl = eu.Wordlist(idx, idx.stem)
+        out.append((f"wordlist {idx.name} khớp {txt.name}", list(wl) == words and len(wl) == len(words),
+                    f"{len(wl)} / {len(words)} từ"))
+    sources = eu.wordlist_sources()
+    out.append(("wordlist: có sẵn, 1 mục mỗi list", bool(sources) and len({p.stem for p in sources}) == len(sources),
+                ", ".join(p.name for p in sources)))
+    if sources:
+        wl = eu.load_wordlist(sources[0])
+        pp = eu.generate_passphrase(wl, words=6, separators=" ")
+        out.append(("wordlist: passphrase mặc định", len(pp.split(" ")) == 6 and all(w in set(wl) for w in pp.split(" ")),
+                    f"{pp} ({eu.passphrase_bits(len(wl), 6, ' '):.1f} bit)"))
+    return out
+
+def check_bulk_dns() -> List[Check]:
+    out: List[Check] = []
+    timeout = 1.0
+    with StubDNS() as stub:
+        nu._DNS_CACHE.clear()
+        names = ["ok.test", "nxhost.test", "cname.test", "drophost.test"]
+        t0 = time.perf_counter()
+        got = {r.name: r for r in nu.iter_bulk_dns(names, ("A", "AAAA", "MX", "CNAME"), workers=8,
+                                                   nameservers=["127.0.0.1"], port=stub.port, timeout=timeout)}
+        elapsed = time.perf_counter() - t0
+        out.append(("dns: đủ kết quả", sorted(got) == sorted(names), str(sorted(got))))
+
+        r = got.get("ok.test")
+        h = sum(b"ok") % 250 + 1
+        out.append(("dns: A/AAAA/MX", r is not None and r.status == "OK" and r.values("A") == (f"10.{h}.0.1",)
+                    and r.values("AAAA") == (f"fd00::{h:x}",) and r.values("MX") == ("10 mail.ok.test.",),
+                    str(r and r.row())))
+
+        r = got.get("nxhost.test")
+        out.append(("dns: NXDOMAIN", r is not None and r.status == "NXDOMAIN" and not r.records,
+                    str(r and r.row())))
+
+        r = got.get("cname.test")
+        h = sum(b"target") % 250 + 1
+        out.append(("dns: CNAME theo tới đích", r is not None and r.status == "OK"
+                    and r.values("CNAME") == ("target.test.",) and r.values("A") == (f"10.{h}.0.1",),
+                    str(r and r.row())))
+
+        r = got.get("drophost.test")
+        out.append(("dns: timeout -> lỗi", r is not None and r.status.startswith("Lỗi")
+                    and "Timeout" in r.status and not r.records, str(r and r.row())))
+        # 4 loại bản ghi hỏi song song: tên bị drop chỉ tốn ~1 lần timeout, không cộng dồn
+        out.append(("dns: timeout đúng hạn", elapsed < timeout + 1.0, f"{elapsed:.2f}s"))
+
+        queries = stub.queries
+        again = list(nu.iter_bulk_dns(["ok.test", "nxhost.test", "cname.test"], ("A", "AAAA", "MX", "CNAME"),
+                                      nameservers=["127.0.0.1"], port=stub.port, timeout=timeout))
+        out.append(("dns: cache hit (cả NXDOMAIN)", stub.queries == queries
+                    and {r.name: r.status for r in again} == {"ok.test": "OK", "nxhost.test": "NXDOMAIN",
+                                                              "cname.test": "OK"},
+                    f"queries {queries} -> {stub.queries}"))
+        nu._DNS_CACHE.clear()
+    return out
+
+CHECKS: Tuple[Tuple[str, Callable[[], List[Check]]], ...] = (
+    ("portset", check_portset),
+    ("banner", check_banners),
+    ("public_ip", check_public_ip),
+    ("der_parser", check_der_parser),
+    ("wordlist", check_wordlist),
+    ("bulk_dns", check_bulk_dns),
+)
+
+def main() -> int:
+    failed = 0
+    for name, fn in CHECKS:
+        try:
+            results = fn()
+        except Exception as e:   # vd. thiếu openssl cho stand-in TLS
+            results = [(name, False, f"{type(e).__name__}: {e}")]
+        for label, ok, info in results:
+            failed += not ok
+            print(f"{'PASS' if ok else 'FAIL'}  {label:<38} {info}")
+    print(f"{failed} kiểm tra lỗi" if failed else "Tất cả PASS")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+# bench/standins.py
+"""
+Dịch vụ giả chạy trên 127.0.0.1 cho benchmark (không cần mạng ngoài, chạy lại được y hệt):
+
+- ListenerFarm: N socket TCP đang listen trên các port ngẫu nhiên (mục tiêu cho port scan).
+- StubDNS: DNS server UDP trả A/AAAA/MX cho mọi tên, NXDOMAIN cho tên bắt đầu bằng "nx",
+  CNAME (kèm bản ghi của đích trong cùng phản hồi) cho "cname...", không trả lời (timeout)
+  cho "drop..."; 'delay' giả lập độ trễ của resolver thật (cần dnspython, như bulk DNS của app).
+- TLSFarm: N endpoint TLS dùng chứng chỉ tự ký tạo bằng lệnh openssl.
+- BannerFarm: dịch vụ cho banner grab: ssh/smtp/ftp (chào ngay khi kết nối), http (trả lời
+  HEAD), tls (tự ký), silent (nhận kết nối nhưng không bao giờ gửi gì).
+- IPSource: nguồn "IP public" qua HTTP: ok | slow (trả lời sau 'delay') | dead (nhận kết nối,
+  không trả lời = bị blackhole) | bad (trả chuỗi không phải IP).
+
+Mỗi lớp là context manager; DNS/TLS/banner/IP chạy trên 1 event loop riêng ở thread nền.
+"""
+from __future__ import annotations
+import asyncio
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+class _LoopThread:
+    """Event loop asyncio chạy ở thread daemon; run() gọi coroutine từ thread khác."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="bench-standin", daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout: float = 30.0):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+        self.loop.close()
+
+# --------- TCP ---------
+class ListenerFarm:
+    def __init__(self, n: int, host: str = "127.0.0.1", backlog: int = 64):
+        self.host = host
+        self._socks: List[socket.socket] = []
+        try:
+            for _ in range(n):
+                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                s.bind((host, 0))
+                s.listen(backlog)
+                self._socks.append(s)
+        except OSError:
+            self.close()
+            raise
+        self.ports = sorted(s.getsockname()[1] for s in self._socks)
+
+    @property
+    def span(self) -> range:
+        """Dải port liền bao trùm mọi listener (phần còn lại là port đóng -> RST ngay)."""
+        return range(self.ports[0], self.ports[-1] + 1) if self.ports else range(0)
+
+    def close(self) -> None:
+        for s in self._socks:
+            s.close()
+        self._socks.clear()
+
+    def __enter__(self) -> ListenerFarm:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+# --------- DNS ---------
+class _DnsProtocol(asyncio.DatagramProtocol):
+    def __init__(self, stub: StubDNS):
+        self.stub = stub
+        self.transport = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        reply = self.stub.answer(data)
+        if reply is None:
+            return
+        if self.stub.delay > 0:
+            asyncio.get_running_loop().call_later(self.stub.delay, self.transport.sendto, reply, addr)
+        else:
+            self.transport.sendto(reply, addr)
+
+class StubDNS:
+    def __init__(self, delay: float = 0.0, ttl: int = 300, host: str = "127.0.0.1"):
+        import dns.message, dns.rcode, dns.rdatatype, dns.rrset  # noqa: F401  (lỗi sớm nếu thiếu dnspython)
+        self.delay, self.ttl, self.host = delay, ttl, host
+        self.queries = 0
+        self._lt = _LoopThread()
+        self._transport, _ = self._lt.run(self._lt.loop.create_datagram_endpoint(
+            lambda: _DnsProtocol(self), local_addr=(host, 0)))
+        sock = self._transport.get_extra_info("socket")
+        try:   # burst vài trăm truy vấn cùng lúc: buffer mặc định làm rơi gói -> timeout giả
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+        except OSError:
+            pass
+        self.port: int = sock.getsockname()[1]
+
+    def answer(self, data: bytes) -> bytes | None:
+        import dns.message, dns.name, dns.rcode, dns.rdatatype, dns.rrset
+        try:
+            q = dns.message.from_wire(data)
+        except Exception:
+            return None
+        self.queries += 1
+        r = dns.message.make_response(q)
+        name, rtype = q.question[0].name, q.question[0].rdtype
+        label = name.labels[0] if name.labels else b""
+        if label.startswith(b"drop"):
+            return None
+        if label.startswith(b"cname"):   # cname.x -> target.x, rồi trả lời tiếp cho đích
+            target = dns.name.Name((b"target",) + name.labels[1:])
+            r.answer.append(dns.rrset.from_text(name, self.ttl, "IN", "CNAME", target.to_text()))
+            if rtype == dns.rdatatype.CNAME:
+                return r.to_wire()
+            name, label = target, b"target"
+        h = sum(label) % 250 + 1
+        if label.startswith(b"nx"):
+            r.set_rcode(dns.rcode.NXDOMAIN)
+        elif rtype == dns.rdatatype.A:
+            r.answer.append(dns.rrset.from_text(name, self.ttl, "IN", "A", f"10.{h}.0.1"))
+        elif rtype == dns.rdatatype.AAAA:
+            r.answer.append(dns.rrset.from_text(name, self.ttl, "IN", "AAAA", f"fd00::{h:x}"))
+        elif rtype == dns.rdatatype.MX:
+            r.answer.append(dns.rrset.from_text(name, self.ttl, "IN", "MX", f"10 mail.{name}"))
+        return r.to_wire()
+
+    def close(self) -> None:
+        if self._lt is not None:
+            self._lt.loop.call_soon_threadsafe(self._transport.close)
+            self._lt.stop()
+            self._lt = None
+
+    def __enter__(self) -> StubDNS:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+# --------- TLS ---------
+def self_signed_cert(directory: Path, cn: str = "localhost", days: int = 30,
+                     sans: str | None = None, subj: str | None = None) -> Tuple[Path, Path]:
+    """
+    Tạo (cert.pem, key.pem) tự ký bằng openssl (EC P-256: nhanh, handshake nhẹ).
+    sans: chuỗi subjectAltName kiểu openssl ("DNS:a,IP:1.2.3.4,email:x@y"), mặc định tên cn + 127.0.0.1.
+    """
+    if not shutil.which("openssl"):
+        raise RuntimeError("Cần lệnh 'openssl' để tạo chứng chỉ tự ký cho TLSFarm.")
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1",
+         "-nodes", "-days", str(days), "-subj", subj or f"/CN={cn}",
+         "-addext", f"subjectAltName={sans or f'DNS:{cn},IP:127.0.0.1'}",
+         "-keyout", str(key), "-out", str(cert)],
+        check=True, capture_output=True, timeout=30,
+    )
+    return cert, key
+
+async def _tls_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    # handshake đã xong khi callback được gọi; client chỉ đọc chứng chỉ rồi đóng
+    try:
+        await reader.read(1)
+    except Exception:
+        pass
+    finally:
+        writer.close()
+
+class TLSFarm:
+    def __init__(self, n: int, host: str = "127.0.0.1", **cert_opts):
+        """cert_opts: truyền thẳng cho self_signed_cert (cn, days, sans, subj)."""
+        self.host = host
+        self._tmp = tempfile.TemporaryDirectory(prefix="vlabs-bench-")
+        self.cert, self.key = self_signed_cert(Path(self._tmp.name), **cert_opts)
+        ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ctx.load_cert_chain(self.cert, self.key)
+        self._lt = _LoopThread()
+
+        async def start():
+            return [await asyncio.start_server(_tls_client, host, 0, ssl=ctx, backlog=256) for _ in range(n)]
+        self._servers = self._lt.run(start())
+        self.ports = sorted(s.sockets[0].getsockname()[1] for s in self._servers)
+
+    @property
+    def endpoints(self) -> List[Tuple[str, int]]:
+        return [(self.host, p) for p in self.ports]
+
+    def close(self) -> None:
+        if self._lt is None:
+            return
+        async def stop():
+            for s in self._servers:
+                s.close()
+        try:
+            self._lt.run(stop(), timeout=5)
+        finally:
+            self._lt.stop()
+            self._lt = None
+            self._tmp.cleanup()
+
+    def __enter__(self) -> TLSFarm:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+# --------- Banner ---------
+_GREETINGS = {
+    "ssh": b"SSH-2.0-OpenSSH_9.6 standin\r\n",
+    "smtp": b"220 mail.standin.test ESMTP ready\r\n",
+    "ftp": b"220 standin FTP server ready\r\n",
+}
+_HTTP_REPLY = b"HTTP/1.0 200 OK\r\nServer: standin-http\r\nContent-Length: 0\r\n\r\n"
+
+def _banner_handler(kind: str, held: list):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        held.append(writer)
+        try:
+            if kind in _GREETINGS:
+                writer.write(_GREETINGS[kind])
+                await writer.drain()
+                await reader.read(1024)
+            elif kind in ("http", "tls"):
+                await reader.readuntil(b"\r\n\r\n")
+                writer.write(_HTTP_REPLY)
+                await writer.drain()
+            else:                       # silent: giữ kết nối tới khi client tự bỏ
+                await reader.read()
+        except Exception:
+            pass
+        finally:
+            writer.close()
+    return handle
+
+class BannerFarm:
+    KINDS = ("ssh", "smtp", "ftp", "http", "tls", "silent")
+
+    def __init__(self, kinds: Iterable[str] = KINDS, host: str = "127.0.0.1"):
+        self.host = host
+        kinds = tuple(kinds)
+        self._tmp = None
+        ctx = None
+        if "tls" in kinds:
+            self._tmp = tempfile.TemporaryDirectory(prefix="vlabs-bench-")
+            cert, key = self_signed_cert(Path(self._tmp.name))
+            ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            ctx.load_cert_chain(cert, key)
+        self._held: list = []
+        self._lt = _LoopThread()
+
+        async def start():
+            return {k: await asyncio.start_server(_banner_handler(k, self._held), host, 0,
+                                                  ssl=ctx if k == "tls" else None) for k in kinds}
+        self._servers = self._lt.run(start())
+        self.ports: Dict[str, int] = {k: s.sockets[0].getsockname()[1] for k, s in self._servers.items()}
+
+    def close(self) -> None:
+        if self._lt is None:
+            return
+        async def stop():
+            for s in self._servers.values():
+                s.close()
+            for w in self._held:
+                w.close()
+        try:
+            self._lt.run(stop(), timeout=5)
+        finally:
+            self._lt.stop()
+            self._lt = None
+            if self._tmp is not None:
+                self._tmp.cleanup()
+
+    def __enter__(self) -> BannerFarm:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+# --------- Nguồn IP public ---------
+class IPSource:
+    MODES = ("ok", "slow", "dead", "bad")
+
+    def __init__(self, mode: str = "ok", ip: str = "203.0.113.7", delay: float = 0.5,
+                 kind: str = "json", host: str = "127.0.0.1"):
+        if mode not in self.MODES:
+            raise ValueError(f"mode phải là một trong {self.MODES}")
+        self.mode, self.ip, self.delay, self.kind, self.host = mode, ip, delay, kind, host
+        self.hits = 0                   # số request nhận được (kiểm tra cache)
+        self._held: list = []
+        self._lt = _LoopThread()
+        self._server = self._lt.run(asyncio.start_server(self._handle, host, 0))
+        self.port: int = self._server.sockets[0].getsockname()[1]
+
+    @property
+    def source(self) -> Tuple[str, str, str | None]:
+        """Bộ (url, kind, key) theo định dạng _PUBLIC_IP_SOURCES của core.network_utils."""
+        return (f"http://{self.host}:{self.port}/{self.mode}", self.kind, "ip" if self.kind == "json" else None)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.hits += 1
+        self._held.append(writer)
+        try:
+            if self.mode == "dead":
+                await reader.read()     # không trả lời; client tự timeout
+                return
+            await reader.readuntil(b"\r\n\r\n")
+            if self.mode == "slow":
+                await asyncio.sleep(self.delay)
+            value = "not-an-ip" if self.mode == "bad" else self.ip
+            body = (f'{{"ip": "{value}"}}' if self.kind == "json" else value).encode()
+            writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: text/plain\r\n"
+                         + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+        except Exception:
+            pass
+        finally:
+            writer.close()
+
+    def close(self) -> None:
+        if self._lt is None:
+            return
+        async def stop():
+            self._server.close()
+            for w in self._held:
+                w.close()
+        try:
+            self._lt.run(stop(), timeout=5)
+        finally:
+            self._lt.stop()
+            self._lt = None
+
+    def __enter__(self) -> IPSource:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
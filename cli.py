@@ -0,0 +1,442 @@
+# cli.py
+"""
+Dùng các công cụ trong core/ không cần Streamlit: dòng lệnh + HTTP JSON API (chỉ stdlib).
+
+    python cli.py dns example.com
+    python cli.py scan 10.0.0.0/24 --top 100 -o ndjson
+    python cli.py password -l 24 -n 5 --symbols -o json
+    python cli.py password -l 20 --min 2 --max-repeat 2 --max-sequential 3 --forbid admin --forbid 1234
+    python cli.py passphrase -w eff_large_wordlist -k 6 -n 3 --sep="-_."
+    python cli.py serve --port 8765        # GET /api/<lệnh>?<tham số>, vd. /api/scan?targets=10.0.0.1&ports=1-1024
+                                           # GET /metrics: counter/histogram dạng Prometheus
+
+Chỉ import module core cần cho lệnh được gọi (không bao giờ import streamlit/ui)
+-> khởi động nhanh cho script/cron. Đầu ra: text (như UI) | json | ndjson (stream từng bản ghi).
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator, List
+
+# ==== Paths & sys.path ====
+ROOT = Path(__file__).resolve().parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+FORMATS = ("text", "json", "ndjson")
+_HTTP_MAX_COUNT = 1000   # số bản ghi sinh ra mỗi request HTTP (json gom cả vào 1 phản hồi)
+
+class CliError(Exception):
+    """Lỗi tham số/đầu vào: CLI in ra stderr (exit 2), HTTP trả 400."""
+
+class _Parser(argparse.ArgumentParser):
+    # argparse mặc định sys.exit() khi sai tham số -> HTTP server cần exception thay vì thoát
+    def error(self, message: str):
+        raise CliError(message)
+
+def _net():
+    from core import network_utils
+    return network_utils
+
+def _read_lines(path: str | None) -> List[str]:
+    """Đọc danh sách từ file ('-' = stdin), bỏ dòng trống và chú thích '#'."""
+    if not path:
+        return []
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with f:
+        return [t for line in f for t in line.split("#", 1)[0].replace(",", " ").split()]
+
+def _items(args, name: str) -> List[str]:
+    items = list(getattr(args, name) or []) + _read_lines(getattr(args, "file", None))
+    if not items:
+        raise CliError(f"thiếu {name} (tham số hoặc -f FILE)")
+    return items
+
+# --------- Lệnh: mỗi lệnh trả iterator bản ghi (NamedTuple của core hoặc dict) ---------
+def cmd_ip(args) -> Iterator[Any]:
+    nu = _net()
+    if args.local:
+        yield from nu.interface_addresses(refresh=True)
+        return
+    info = nu.get_public_ip_info(timeout=args.timeout)
+    if info is None:
+        raise CliError("Không lấy được IP public (không ra được internet hoặc bị chặn)")
+    yield info
+
+def cmd_ssl(args) -> Iterator[Any]:
+    eps = _net().parse_endpoints(_items(args, "endpoints"), default_port=args.port)
+    yield from _net().ssl_inventory(eps, workers=args.workers, timeout=args.timeout)
+
+def cmd_dns(args) -> Iterator[Any]:
+    nu = _net()
+    names = _items(args, "names")
+    if args.type is None and not args.server and len(names) == 1:
+        yield nu.dns_query(names[0])   # 1 tên: resolver hệ thống + đủ loại bản ghi, như tab DNS
+        return
+    rtypes = [t.strip().upper() for t in (args.type or "A,AAAA").split(",") if t.strip()]
+    yield from nu.iter_bulk_dns(names, rtypes, args.workers, args.server, args.dns_port, args.timeout)
+
+def cmd_whois(args) -> Iterator[Any]:
+    yield from _net().iter_bulk_whois(_items(args, "domains"), workers=args.workers, refresh=args.refresh)
+
+def cmd_ping(args) -> Iterator[Any]:
+    yield from _net().ping_many(_items(args, "hosts"), count=args.count, interval=args.interval,
+                                timeout=args.timeout, method=args.method)
+
+def cmd_trace(args) -> Iterator[Any]:
+    hops: list = []
+    for hops in _net().iter_path_monitor(args.host, rounds=args.rounds, interval=args.interval,
+                                         max_hops=args.max_hops, timeout=args.timeout):
+        pass
+    yield from hops
+
+def cmd_scan(args) -> Iterator[Any]:
+    """Stream ProbeResult khi có (mặc định chỉ port mở + host lỗi); --budget: dừng sau N giây."""
+    from core.port_utils import PortSet, RankedPorts
+    ports = PortSet.parse(args.ports) if args.ports else PortSet.full()
+    if not ports:
+        raise CliError(f"dải port không hợp lệ: {args.ports!r}")
+    if args.top:
+        ports = RankedPorts(ports, args.top)
+    scan = _net().iter_sweep(_items(args, "targets"), ports, args.timeout, args.workers,
+                             args.per_host, adaptive=not args.no_adaptive, banners=args.banners)
+    deadline = time.monotonic() + args.budget if args.budget else None
+    try:
+        for r in scan:
+            if args.all or r.state in ("open", "error"):
+                yield r
+            if deadline and time.monotonic() >= deadline:
+                break
+    finally:
+        scan.close()
+
+def cmd_password(args) -> Iterator[Any]:
+    from core.encryption_utils import (MAX_MIN_PER_GROUP, build_charsets, compile_policy, coverage_bits,
+                                       iter_passwords, strength_label)
+    if not 0 <= args.min <= MAX_MIN_PER_GROUP:
+        raise CliError(f"--min phải trong 0..{MAX_MIN_PER_GROUP}")
+    groups, combined = build_charsets(not args.no_lower, not args.no_upper, not args.no_digits,
+                                      args.symbols, not args.allow_similar, args.exclude_ambiguous)
+    try:
+        # entropy luôn tính chính xác trên không gian thỏa policy (mặc định: >= 1 ký tự mỗi nhóm)
+        constrained = args.min != 1 or args.max_repeat or args.max_sequential or args.forbid
+        if constrained:
+            policy = compile_policy(args.length, groups, [args.min] * len(groups), args.max_repeat,
+                                    args.max_sequential, args.forbid or ())
+            bits, source = policy.bits, policy.iter(args.count)
+        else:
+            # không ràng buộc thêm: bits theo bao hàm-loại trừ, sinh theo lô, stream từng cái
+            # -> -n 1000000 -o ndjson vẫn chạy với bộ nhớ cố định, không cần dựng automaton
+            source = iter_passwords(args.count, args.length, groups, combined)
+            bits = coverage_bits(args.length, groups)
+        label = strength_label(bits)
+        for pw in source:
+            yield {"password": pw, "bits": round(bits, 1), "strength": label}
+    except ValueError as e:
+        raise CliError(str(e)) from None
+
+def _wordlist(name: str | None, remote: bool):
+    from core.encryption_utils import load_wordlist, wordlist_sources
+    sources = {k: p for p in wordlist_sources() for k in (p.stem, p.name)}
+    if name is None:
+        if not sources:
+            raise CliError("chưa có wordlist: dùng -w FILE hoặc đặt file vào assets/wordlists ($VLABS_WORDLIST_DIR)")
+        return load_wordlist(next(iter(sources.values())))
+    if name in sources:
+        return load_wordlist(sources[name])
+    if remote:   # qua HTTP không cho đọc file tùy ý trên máy chủ
+        raise CliError(f"wordlist không có sẵn: {name} (có: {', '.join(sorted({p.stem for p in sources.values()})) or '-'})")
+    try:
+        return load_wordlist(name)
+    except OSError as e:
+        raise CliError(f"không đọc được wordlist: {e}") from None
+
+def cmd_passphrase(args) -> Iterator[Any]:
+    from core.encryption_utils import iter_passphrases, passphrase_bits, strength_label
+    try:
+        wl = _wordlist(args.wordlist, getattr(args, "remote", False))
+        bits = passphrase_bits(len(wl), args.words, args.sep)
+        info = {"bits": round(bits, 1), "strength": strength_label(bits),
+                "wordlist": wl.name, "list_size": len(wl), "exact": wl.unambiguous(args.sep)}
+        for pp in iter_passphrases(wl, args.count, words=args.words, separators=args.sep,
+                                   capitalize=args.capitalize):
+            yield {"passphrase": pp, **info}
+    except ValueError as e:
+        raise CliError(str(e)) from None
+
+# --------- Đầu ra ---------
+def _row(rec: Any) -> dict:
+    if isinstance(rec, dict):
+        return rec
+    return _net().record_row(rec)
+
+def _text(rec: Any) -> str:
+    if isinstance(rec, dict):
+        for key in ("password", "passphrase"):
+            if key in rec:
+                return rec[key]
+        return json.dumps(rec, ensure_ascii=False, default=str)
+    return _net().render_record(rec)
+
+def _dumps(rec: Any, **kw) -> str:
+    return json.dumps(_row(rec), ensure_ascii=False, default=str, **kw)
+
+def write_records(records: Iterator[Any], fmt: str, write: Callable[[str], Any],
+                  flush: Callable[[], Any] = lambda: None) -> int:
+    """Ghi bản ghi theo định dạng; ndjson/text ghi + flush từng bản ghi (stream). Trả số bản ghi."""
+    n = 0
+    if fmt == "json":
+        rows = [_row(r) for r in records]
+        write(json.dumps(rows, ensure_ascii=False, default=str, indent=2) + "\n")
+        return len(rows)
+    for rec in records:
+        write((_dumps(rec) if fmt == "ndjson" else _text(rec)) + "\n")
+        flush()
+        n += 1
+    return n
+
+# --------- Parser ---------
+def _add(sub, name: str, fn: Callable, help: str, items: str | None = None,
+         network: bool = True) -> argparse.ArgumentParser:
+    p = sub.add_parser(name, help=help, description=help)
+    p.set_defaults(run=fn, network=network)
+    if items:
+        p.add_argument(items, nargs="*", help="nhiều giá trị được; dùng kèm -f FILE")
+        f = p.add_argument("-f", "--file", help="đọc thêm từ file (mỗi dòng/dấu phẩy 1 mục, '-' = stdin)")
+        f.cli_only = True   # đọc file/stdin của máy chủ -> không nhận qua HTTP
+    p.add_argument("-o", "--output", choices=FORMATS, default="text", help="định dạng đầu ra (mặc định text)")
+    return p
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = _Parser(prog="cli.py", description="VLabsTools không giao diện: network + password/passphrase.")
+    sub = parser.add_subparsers(dest="command", metavar="<lệnh>", required=True)
+
+    p = _add(sub, "ip", cmd_ip, "IP public (nhiều nguồn, nhanh nhất thắng) hoặc --local: IP các interface")
+    p.add_argument("--local", action="store_true")
+    p.add_argument("--timeout", type=float, default=5.0)
+
+    p = _add(sub, "ssl", cmd_ssl, "Kiểm tra / kiểm kê chứng chỉ TLS (host, host:port, URL)", "endpoints")
+    p.add_argument("--port", type=int, default=443, help="port mặc định khi không ghi")
+    p.add_argument("--workers", type=int, default=100)
+    p.add_argument("--timeout", type=float, default=5.0)
+
+    p = _add(sub, "dns", cmd_dns, "Tra DNS; nhiều tên hoặc --type/--server -> resolver async hàng loạt", "names")
+    p.add_argument("--type", help="loại bản ghi, vd. A,AAAA,MX (mặc định A,AAAA khi tra hàng loạt)")
+    p.add_argument("--server", action="append", help="nameserver (lặp lại được)")
+    p.add_argument("--dns-port", type=int, default=53)
+    p.add_argument("--workers", type=int, default=200)
+    p.add_argument("--timeout", type=float, default=5.0)
+
+    p = _add(sub, "whois", cmd_whois, "WHOIS (cache SQLite, giới hạn tốc độ theo server)", "domains")
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--refresh", action="store_true", help="bỏ qua cache")
+
+    p = _add(sub, "ping", cmd_ping, "Ping ICMP (nếu được phép) hoặc TCP, nhiều host song song", "hosts")
+    p.add_argument("-c", "--count", type=int, default=4).http_max = 100
+    p.add_argument("--interval", type=float, default=0.2)
+    p.add_argument("--timeout", type=float, default=1.0)
+    p.add_argument("--method", choices=("auto", "icmp", "tcp"), default="auto")
+
+    p = _add(sub, "trace", cmd_trace, "Path monitor kiểu mtr (Linux): loss/RTT từng hop")
+    p.add_argument("host")
+    p.add_argument("--rounds", type=int, default=3)
+    p.add_argument("--interval", type=float, default=0.2)
+    p.add_argument("--max-hops", type=int, default=30)
+    p.add_argument("--timeout", type=float, default=1.0)
+
+    p = _add(sub, "scan", cmd_scan, "Quét port TCP 1 hoặc nhiều host (CIDR / dải / danh sách)", "targets")
+    p.add_argument("-p", "--ports", help="vd. 22,80,443,8000-8100 (mặc định 1-65535)")
+    p.add_argument("--top", type=int, help="chỉ quét N port phổ biến nhất trong dải")
+    p.add_argument("--timeout", type=float, default=0.3)
+    p.add_argument("--workers", type=int, default=1000)
+    p.add_argument("--per-host", type=int, default=100)
+    p.add_argument("--budget", type=float, help="dừng sau N giây")
+    p.add_argument("--banners", action="store_true", help="đọc banner dịch vụ của port mở")
+    p.add_argument("--no-adaptive", action="store_true", help="tắt timeout theo RTT")
+    p.add_argument("--all", action="store_true", help="in cả port closed/filtered")
+
+    p = _add(sub, "password", cmd_password, "Sinh mật khẩu ngẫu nhiên (secrets)", network=False)
+    p.add_argument("-l", "--length", type=int, default=16).http_max = 1024
+    p.add_argument("-n", "--count", type=int, default=1).http_max = _HTTP_MAX_COUNT
+    p.add_argument("--symbols", action="store_true")
+    p.add_argument("--no-lower", action="store_true")
+    p.add_argument("--no-upper", action="store_true")
+    p.add_argument("--no-digits", action="store_true")
+    p.add_argument("--allow-similar", action="store_true", help="giữ ký tự dễ nhầm (I l 1 O 0 …)")
+    p.add_argument("--exclude-ambiguous", action="store_true", help="bỏ ký hiệu dễ nhầm ({ } [ ] …)")
+    p.add_argument("--min", type=int, default=1, help="số ký tự tối thiểu mỗi nhóm đang bật (0..4)")
+    p.add_argument("--max-repeat", type=int, help="tối đa N ký tự giống nhau liên tiếp")
+    p.add_argument("--max-sequential", type=int, help="tối đa N ký tự liên tiếp kiểu abc / 321")
+    p.add_argument("--forbid", action="append", metavar="CHUỖI", help="chuỗi cấm (lặp lại được, không phân biệt hoa thường)")
+
+    p = _add(sub, "passphrase", cmd_passphrase, "Sinh passphrase kiểu diceware từ wordlist", network=False)
+    p.add_argument("-w", "--wordlist", help="file wordlist (txt / diceware / .wlx) hoặc tên trong assets/wordlists")
+    p.add_argument("-k", "--words", type=int, default=6, help="số từ (mặc định 6)").http_max = 64
+    p.add_argument("-n", "--count", type=int, default=1).http_max = _HTTP_MAX_COUNT
+    p.add_argument("--sep", default="-", help="ký tự phân cách; nhiều ký tự -> chọn ngẫu nhiên mỗi chỗ nối")
+    p.add_argument("--capitalize", action="store_true", help="viết hoa chữ đầu mỗi từ (không tăng entropy)")
+
+    p = sub.add_parser("serve", help="HTTP JSON API (stdlib) cho các lệnh trên",
+                       description="GET /api/<lệnh>?<tham số>; format=json (mặc định) | ndjson (stream). "
+                                   "GET /metrics: metrics dạng Prometheus.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.set_defaults(run=None, network=False)
+    return parser
+
+# --------- HTTP JSON API ---------
+_TRUE = ("", "1", "true", "yes", "on")
+
+def query_argv(parser: argparse.ArgumentParser, command: str, query: dict[str, List[str]]) -> List[str]:
+    """
+    Query string -> argv của lệnh, để HTTP dùng chung parser (kiểu, mặc định, kiểm tra) với CLI.
+    Tham số vị trí: lặp key (?names=a.com&names=b.com); cờ: ?banners=1; còn lại: ?ports=1-1024.
+    Action có cli_only (vd. -f FILE) bị từ chối; action có http_max (vd. -n) không nhận giá trị lớn hơn.
+    """
+    sub = _commands(parser).get(command)
+    if sub is None:
+        raise CliError(f"lệnh không tồn tại: {command}")
+    argv: List[str] = [command]
+    positional: List[str] = []
+    actions = {a.dest: a for a in sub._actions if a.dest not in ("help", "output")}
+    for key, values in query.items():
+        a = actions.get(key.replace("-", "_"))
+        if a is None:
+            raise CliError(f"tham số không hỗ trợ: {key}")
+        if getattr(a, "cli_only", False):
+            raise CliError(f"tham số chỉ dùng từ dòng lệnh: {key}")
+        limit = getattr(a, "http_max", None)
+        if limit is not None and any(_int_or(v, 0) > limit for v in values):
+            raise CliError(f"{key} tối đa {limit} qua HTTP")
+        if not a.option_strings:
+            positional.extend(values)
+        elif a.nargs == 0:
+            if values[-1].lower() in _TRUE:
+                argv.append(a.option_strings[-1])
+        else:
+            for v in values:
+                argv += [a.option_strings[-1], v]
+    return argv + ["--"] + positional if positional else argv
+
+def _int_or(v: str, default: int) -> int:
+    try:
+        return int(v)   # như type=int của argparse (nhận "+5", " 5", "5_000")
+    except ValueError:
+        return default  # argparse tự báo lỗi kiểu
+
+def _commands(parser: argparse.ArgumentParser) -> dict[str, argparse.ArgumentParser]:
+    """Các lệnh gọi được qua HTTP (trừ serve)."""
+    return {name: p for a in parser._actions if isinstance(a, argparse._SubParsersAction)
+            for name, p in a.choices.items() if name != "serve"}
+
+def serve(host: str, port: int) -> None:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlsplit
+    parser = build_parser()
+    commands = list(_commands(parser))
+
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "vlabstools"
+
+        def _send(self, code: int, body: Any, ctype: str = "application/json") -> None:
+            data = (json.dumps(body, ensure_ascii=False, default=str) + "\n").encode()
+            self.send_response(code)
+            self.send_header("Content-Type", f"{ctype}; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _metrics(self) -> None:
+            from core.metrics_utils import metrics
+            _net()   # nạp network_utils -> đăng ký gauge governor/cache
+            data = metrics().render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            url = urlsplit(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            if parts in ([], ["api"]):
+                return self._send(200, {"commands": commands, "formats": ["json", "ndjson"], "metrics": "/metrics"})
+            if parts == ["metrics"]:
+                return self._metrics()
+            if len(parts) != 2 or parts[0] != "api":
+                return self._send(404, {"error": "not found"})
+            query = parse_qs(url.query, keep_blank_values=True)
+            fmt = (query.pop("format", None) or ["json"])[-1]
+            try:
+                if fmt not in ("json", "ndjson"):
+                    raise CliError("format phải là json hoặc ndjson")
+                args = parser.parse_args(query_argv(parser, parts[1], query))
+                args.remote = True
+                if args.network:
+                    # mỗi client 1 owner -> governor chia đều socket giữa các client đồng thời
+                    _net().set_network_owner(f"http:{self.client_address[0]}")
+                records = args.run(args)
+                if fmt == "json":
+                    return self._send(200, [_row(r) for r in records])
+            except CliError as e:
+                return self._send(400, {"error": str(e)})
+            except Exception as e:
+                return self._send(500, {"error": f"{type(e).__name__}: {e}"})
+            # ndjson: không biết trước độ dài -> stream rồi đóng kết nối (HTTP/1.0)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+            self.end_headers()
+            try:
+                write_records(records, "ndjson", lambda s: self.wfile.write(s.encode()), self.wfile.flush)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client ngắt giữa chừng: đóng generator -> huỷ scan phía sau
+            except Exception as e:
+                self.wfile.write((json.dumps({"error": f"{type(e).__name__}: {e}"}, ensure_ascii=False)
+                                  + "\n").encode())
+            finally:
+                records.close()
+
+        def log_message(self, fmt: str, *args) -> None:
+            sys.stderr.write(f"{self.address_string()} - {fmt % args}\n")
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    print(f"Serving on http://{host}:{httpd.server_address[1]}/api", file=sys.stderr, flush=True)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+# --------- main ---------
+def main(argv: List[str] | None = None) -> int:
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+        if args.command == "serve":
+            serve(args.host, args.port)
+            return 0
+        if args.network:
+            _net().set_network_owner("cli")
+        records = args.run(args)
+        out = sys.stdout
+        try:
+            write_records(records, args.output, out.write, out.flush)
+        finally:
+            records.close()
+    except CliError as e:
+        print(f"{parser.prog}: lỗi: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:   # vd. `| head`
+        sys.stderr.close()
+        return 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+# core/cache_utils.py
+"""
+Thư mục cache bền vững dùng chung cho các module core (WHOIS SQLite, index wordlist .wlx, ...).
+"""
+from __future__ import annotations
+import os
+from pathlib import Path
+
+def cache_dir() -> Path:
+    """$VLABS_CACHE_DIR hoặc ~/.cache/vlabstools (tạo nếu chưa có)."""
+    d = Path(os.environ.get("VLABS_CACHE_DIR") or Path.home() / ".cache" / "vlabstools")
+    d.mkdir(parents=True, exist_ok=True)
+    return d
@@ -1,11 +1,22 @@
 from __future__ import annotations
-import math, secrets, string, random
-from typing import List, Tuple
+import hashlib, math, mmap, os, secrets, string, struct, sys, random, threading
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+from core.cache_utils import cache_dir
 
 # Characters often confused visually
 _SIMILAR = set("Il1O0oS5Z2B8G6")
 # Punctuation that could be ambiguous in some contexts
 _AMBIGUOUS = set("{}[]()/\\'\"`~,;:.<>")
+# Bytes of OS randomness pulled per os.urandom() call in the batch generator
+_BLOCK = 1 << 16
+
+_SYSRAND = random.SystemRandom()
 
 def build_charsets(
     use_lower: bool = True,
@@ -51,13 +62,594 @@ def generate_one(length: int, groups: List[list[str]], combined: list[str]) -> s
     if length < len(groups):
         raise ValueError("Length too short for the required groups.")
 
-    sysrand = random.SystemRandom()
     pw_chars = [secrets.choice(grp) for grp in groups]  # guarantee coverage
     for _ in range(length - len(groups)):
         pw_chars.append(secrets.choice(combined))
-    sysrand.shuffle(pw_chars)
+    _SYSRAND.shuffle(pw_chars)
     return "".join(pw_chars)
 
+def _byte_tables(alphabet: list[str]) -> Tuple[bytes, bytes, dict | None]:
+    """
+    Tables for bytes.translate(): accepted bytes (b < limit, limit = largest multiple
+    of len(alphabet) <= 256) map to alphabet[b % n]; the rest are deleted. Rejecting
+    the tail keeps every symbol equally likely (no modulo bias).
+    Alphabets beyond Latin-1 map to indices first, then to chars via str.translate.
+    """
+    n = len(alphabet)
+    limit = 256 - 256 % n
+    wide = any(ord(c) > 255 for c in alphabet)
+    table = bytes((b % n) if wide else ord(alphabet[b % n]) for b in range(256))
+    delete = bytes(range(limit, 256))
+    return table, delete, ({i: c for i, c in enumerate(alphabet)} if wide else None)
+
+def iter_passwords(
+    count: int | None,
+    length: int,
+    groups: List[list[str]],
+    combined: list[str],
+    block_size: int = _BLOCK,
+) -> Iterator[str]:
+    """
+    Stream `count` passwords (None = endless) at constant memory.
+
+    Random bytes come from os.urandom() in large blocks and are mapped to the alphabet
+    in C via bytes.translate() with rejection sampling. Passwords missing a group are
+    discarded and redrawn, so output is uniform over all valid passwords (generate_one
+    instead forces one char per group into the mix).
+    """
+    if not groups or not combined:
+        raise ValueError("No character sets selected.")
+    if length < len(groups):
+        raise ValueError("Length too short for the required groups.")
+    if len(combined) > 256:
+        while count is None or count > 0:   # beyond one byte per draw: per-char fallback
+            yield generate_one(length, groups, combined)
+            if count is not None:
+                count -= 1
+        return
+    table, delete, wide = _byte_tables(combined)
+    group_sets = [frozenset(g) for g in groups] if len(groups) > 1 else []
+    accept = (256 - 256 % len(combined)) / 256
+    if count is not None:   # small requests: read only about what they need
+        block_size = max(64, min(block_size, int(count * length * 1.25 / accept) + 64))
+    pending = ""
+    left = count
+    while left is None or left > 0:
+        chars = os.urandom(block_size).translate(table, delete).decode("latin-1")
+        if wide is not None:
+            chars = chars.translate(wide)
+        chars = pending + chars
+        end = len(chars) - len(chars) % length
+        for i in range(0, end, length):
+            pw = chars[i:i + length]
+            if group_sets and not all(not g.isdisjoint(pw) for g in group_sets):
+                continue
+            yield pw
+            if left is not None:
+                left -= 1
+                if not left:
+                    return
+        pending = chars[end:]
+
+def generate_batch(count: int, length: int, groups: List[list[str]], combined: list[str]) -> List[str]:
+    """`count` passwords at once via iter_passwords()."""
+    return list(islice(iter_passwords(count, length, groups, combined), max(count, 0)))
+
+# Policy engine: constraints compiled into a small automaton + exact counting tables.
+_MAX_POLICY_STATES = 1 << 16
+_MAX_POLICY_CELLS = 1 << 22     # counting table: (length + 1) x states x per-group progress
+MAX_MIN_PER_GROUP = 4           # UI / CLI bound for min_counts (progress states = prod(min + 1))
+
+def coverage_bits(length: int, groups: List[list[str]]) -> float:
+    """
+    Exact entropy of iter_passwords() output (uniform over passwords using every group),
+    by inclusion-exclusion over the groups left out: no automaton needed.
+    """
+    sizes = [len(g) for g in groups if g]
+    total = sum(sizes)
+    space = 0
+    for mask in range(1 << len(sizes)):
+        left = total - sum(n for i, n in enumerate(sizes) if mask >> i & 1)
+        space += (-1) ** bin(mask).count("1") * left ** length
+    return math.log2(space) if space > 1 else 0.0
+
+def _aho_corasick(words: List[str]) -> Tuple[List[dict], List[int], List[bool]]:
+    """Trie of forbidden words with failure links; out[n] = some word ends at node n."""
+    goto: List[dict] = [{}]
+    out = [False]
+    for w in words:
+        n = 0
+        for ch in w:
+            if ch not in goto[n]:
+                goto.append({})
+                out.append(False)
+                goto[n][ch] = len(goto) - 1
+            n = goto[n][ch]
+        out[n] = True
+    fail = [0] * len(goto)
+    queue = list(goto[0].values())
+    for n in queue:            # BFS order: fail[] of shallower nodes is final before use
+        for ch, child in goto[n].items():
+            f = fail[n]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[child] = goto[f].get(ch, 0)
+            out[child] = out[child] or out[fail[child]]
+            queue.append(child)
+    return goto, fail, out
+
+class PasswordPolicy:
+    """
+    Password constraints compiled once, then sampled directly (no generate-and-reject):
+
+      - min_counts: minimum chars per group (default 1 per group, as generate_one)
+      - max_repeat: longest run of one character ("aaa" = 3)
+      - max_sequential: longest run of consecutive code points within a group ("abcd", "4321" = 4)
+      - forbidden: substrings that must not appear (Aho-Corasick; case-insensitive by default)
+
+    Compiling builds an automaton over (last char, repeat run, sequential run, matcher node)
+    and counts valid completions exactly for every (position, state, per-group progress).
+    Sampling walks those counts with secrets.randbelow(), so every valid password is equally
+    likely and `bits` = log2(space) is the exact entropy of the output.
+    Groups must be disjoint (as returned by build_charsets). Use compile_policy() to reuse
+    compiled policies across calls.
+    """
+
+    def __init__(
+        self,
+        length: int,
+        groups: List[list[str]],
+        min_counts: List[int] | None = None,
+        max_repeat: int | None = None,
+        max_sequential: int | None = None,
+        forbidden: List[str] = (),
+        ignore_case: bool = True,
+    ):
+        groups = [sorted(set(g)) for g in groups if g]
+        if not groups:
+            raise ValueError("No character sets selected.")
+        alphabet = sorted({c for g in groups for c in g})
+        if len(alphabet) != sum(len(g) for g in groups):
+            raise ValueError("Character groups must not overlap.")
+        mins = [1] * len(groups) if min_counts is None else [int(m) for m in min_counts]
+        if len(mins) != len(groups) or any(m < 0 for m in mins):
+            raise ValueError("min_counts must give one non-negative count per group.")
+        if length < sum(mins):
+            raise ValueError("Length too short for the required groups.")
+        for name, v in (("max_repeat", max_repeat), ("max_sequential", max_sequential)):
+            if v is not None and v < 1:
+                raise ValueError(f"{name} must be at least 1.")
+        self.length, self.groups, self.alphabet, self.min_counts = length, groups, alphabet, tuple(mins)
+        self.max_repeat, self.max_sequential = max_repeat, max_sequential
+        self.ignore_case = ignore_case
+
+        index = {c: i for i, c in enumerate(alphabet)}
+        self._index = index
+        self._group_of = [0] * len(alphabet)
+        for gi, g in enumerate(groups):
+            for c in g:
+                self._group_of[index[c]] = gi
+        fold = (lambda s: s.lower()) if ignore_case else (lambda s: s)
+        self._key = [fold(c) for c in alphabet]
+        # words using chars outside the alphabet can never occur: skip them
+        keys = set(self._key)
+        words = sorted({fold(w) for w in forbidden if w and all(ch in keys for ch in fold(w))})
+        self.forbidden = tuple(words)
+        self._goto, self._fail, self._out = _aho_corasick(words)
+        self._delta: dict = {}
+        self._track_last = max_repeat is not None or max_sequential is not None
+        self._neighbours = [[j for j in (index.get(chr(ord(c) - 1)), index.get(chr(ord(c) + 1)))
+                             if j is not None and self._group_of[j] == self._group_of[i]]
+                            for i, c in enumerate(alphabet)]
+        by_key: dict = {}
+        for i, k in enumerate(self._key):
+            by_key.setdefault(k, []).append(i)
+        self._by_key = by_key
+
+        # per-group progress: counts capped at the minimum, mixed-radix encoded
+        radix, n_cv = [], 1
+        for m in mins:
+            radix.append(n_cv)
+            n_cv *= m + 1
+        if (length + 1) * n_cv > _MAX_POLICY_CELLS:
+            raise ValueError("Policy too complex (minimum counts too high).")
+        self._n_cv = n_cv
+        self._cv_next = [[0] * len(groups) for _ in range(n_cv)]
+        for cv in range(n_cv):
+            for gi, m in enumerate(mins):
+                have = cv // radix[gi] % (m + 1)
+                self._cv_next[cv][gi] = cv + radix[gi] if have < m else cv
+        self._cv_full = sum(m * r for m, r in zip(mins, radix))
+
+        self._build_states()
+        if (length + 1) * self._n_states * n_cv > _MAX_POLICY_CELLS:
+            raise ValueError("Policy too complex (too many automaton states).")
+        self._count()
+        self._prefix: dict = {}
+        self.space: int = self._v[0][0]     # start state, no group progress yet
+        if not self.space:
+            raise ValueError("No password satisfies this policy.")
+        self.bits: float = math.log2(self.space)
+
+    # ---- automaton ----
+    def _next_node(self, node: int, key: str) -> int:
+        hit = self._delta.get((node, key))
+        if hit is None:
+            n = node
+            while n and key not in self._goto[n]:
+                n = self._fail[n]
+            hit = self._delta[(node, key)] = self._goto[n].get(key, 0)
+        return hit
+
+    def _step(self, state: tuple, ci: int) -> tuple | None:
+        """Next state after char index ci, or None when a constraint breaks."""
+        last, rep, sdir, srun, node = state
+        node2 = 0
+        if self.forbidden:
+            node2 = self._next_node(node, self._key[ci])
+            if self._out[node2]:
+                return None
+        rep2 = sdir2 = srun2 = 0
+        if self.max_repeat is not None:
+            rep2 = rep + 1 if ci == last else 1
+            if rep2 > self.max_repeat:
+                return None
+        if self.max_sequential is not None:
+            if last is not None and ci in self._neighbours[last]:
+                sdir2 = ci - last
+                srun2 = srun + 1 if sdir2 == sdir else 2
+            else:
+                srun2 = 1
+            if srun2 > self.max_sequential:
+                return None
+        return (ci if self._track_last else None, rep2, sdir2, srun2, node2)
+
+    def _specials(self, state: tuple) -> List[int]:
+        """Chars whose transition from 'state' may differ from the transition from the start."""
+        last, node = state[0], state[4]
+        out = set()
+        if last is not None:
+            out.add(last)
+            out.update(self._neighbours[last])
+        n = node
+        while n:
+            for k in self._goto[n]:
+                out.update(self._by_key[k])
+            n = self._fail[n]
+        return sorted(out)
+
+    def _build_states(self) -> None:
+        start = (None, 0, 0, 0, 0)
+        ids = {start: 0}
+        states = [start]
+
+        def sid(st: tuple | None) -> int:
+            if st is None:
+                return -1
+            i = ids.get(st)
+            if i is None:
+                if len(states) >= _MAX_POLICY_STATES:
+                    raise ValueError("Policy too complex (too many automaton states).")
+                i = ids[st] = len(states)
+                states.append(st)
+            return i
+
+        self._fresh = [sid(self._step(start, ci)) for ci in range(len(self.alphabet))]
+        # per state: (char, target state, group, fresh target) for chars that are not "fresh"
+        self._special = []
+        i = 0
+        while i < len(states):       # states grows while we walk it (BFS)
+            self._special.append([(ci, sid(self._step(states[i], ci)), self._group_of[ci], self._fresh[ci])
+                                  for ci in self._specials(states[i])])
+            i += 1
+        self._n_states = len(states)
+        self._group_chars = [[self._index[c] for c in g] for g in self.groups]
+
+    # ---- exact counting ----
+    def _count(self) -> None:
+        """_v[pos][s*n_cv + cv] = number of valid completions from 'pos' in state s with progress cv."""
+        n_cv, ng = self._n_cv, len(self.groups)
+        nx_by_group = [[self._cv_next[cv][g] for cv in range(n_cv)] for g in range(ng)]
+        fresh_by_group = [[self._fresh[ci] * n_cv for ci in chars if self._fresh[ci] >= 0]
+                          for chars in self._group_chars]
+        vn = [0] * (self._n_states * n_cv)
+        for s in range(self._n_states):
+            vn[s * n_cv + self._cv_full] = 1
+        v = [vn]
+        for _ in range(self.length):
+            # mass of "fresh" transitions (same target as from the start state) per progress cv
+            fresh = [0] * n_cv
+            for g, bases in enumerate(fresh_by_group):
+                nxs = nx_by_group[g]
+                fresh = [a + sum(vn[b + nx] for b in bases) for a, nx in zip(fresh, nxs)]
+            cur: List[int] = []
+            for special in self._special:
+                row = fresh
+                for _, to, g, f in special:   # swap the fresh target for the real one
+                    nxs, tb, fb = nx_by_group[g], to * n_cv, f * n_cv
+                    if to >= 0 and f >= 0:
+                        row = [a + vn[tb + nx] - vn[fb + nx] for a, nx in zip(row, nxs)]
+                    elif to >= 0:
+                        row = [a + vn[tb + nx] for a, nx in zip(row, nxs)]
+                    elif f >= 0:
+                        row = [a - vn[fb + nx] for a, nx in zip(row, nxs)]
+                cur.extend(row)
+            v.append(cur)
+            vn = cur
+        v.reverse()
+        self._v = v                       # index by position 0..length
+
+    def _fresh_prefix(self, pos: int, cv: int) -> List[int]:
+        """Cumulative mass of fresh transitions over the alphabet (cached per pos/cv)."""
+        p = self._prefix.get((pos, cv))
+        if p is None:
+            vn, n_cv, nx_row = self._v[pos + 1], self._n_cv, self._cv_next[cv]
+            acc, p = 0, []
+            for ci, f in enumerate(self._fresh):
+                if f >= 0:
+                    acc += vn[f * n_cv + nx_row[self._group_of[ci]]]
+                p.append(acc)
+            self._prefix[(pos, cv)] = p
+        return p
+
+    # ---- sampling ----
+    def generate(self) -> str:
+        n_cv, alphabet, group_of = self._n_cv, self.alphabet, self._group_of
+        s, cv, out = 0, 0, []
+        for pos in range(self.length):
+            vn = self._v[pos + 1]
+            r = secrets.randbelow(self._v[pos][s * n_cv + cv])
+            nx_row = self._cv_next[cv]
+            special = self._special[s]
+            for ci, to, g, _ in special:
+                w = vn[to * n_cv + nx_row[g]] if to >= 0 else 0
+                if r < w:
+                    pick, s = ci, to
+                    break
+                r -= w
+            else:
+                prefix = self._fresh_prefix(pos, cv)
+                for ci, *_ in special:       # specials (ascending) are cut out of the fresh prefix
+                    start = prefix[ci - 1] if ci else 0
+                    if r >= start:
+                        r += prefix[ci] - start
+                pick = bisect_right(prefix, r)
+                s = self._fresh[pick]
+            out.append(alphabet[pick])
+            cv = nx_row[group_of[pick]]
+        return "".join(out)
+
+    def iter(self, count: int | None = None) -> Iterator[str]:
+        """Stream `count` passwords (None = endless) at constant memory."""
+        while count is None or count > 0:
+            yield self.generate()
+            if count is not None:
+                count -= 1
+
+    def allows(self, password: str) -> bool:
+        """True when 'password' satisfies every constraint of this policy."""
+        if len(password) != self.length:
+            return False
+        counts = [0] * len(self.groups)
+        state = (None, 0, 0, 0, 0)
+        for c in password:
+            ci = self._index.get(c)
+            if ci is None:
+                return False
+            state = self._step(state, ci)
+            if state is None:
+                return False
+            counts[self._group_of[ci]] += 1
+        return all(n >= m for n, m in zip(counts, self.min_counts))
+
+@lru_cache(maxsize=32)
+def _compile_policy(length, groups, min_counts, max_repeat, max_sequential, forbidden, ignore_case) -> PasswordPolicy:
+    return PasswordPolicy(length, [list(g) for g in groups], min_counts, max_repeat, max_sequential,
+                          forbidden, ignore_case)
+
+def compile_policy(
+    length: int,
+    groups: List[list[str]],
+    min_counts: List[int] | None = None,
+    max_repeat: int | None = None,
+    max_sequential: int | None = None,
+    forbidden: List[str] = (),
+    ignore_case: bool = True,
+) -> PasswordPolicy:
+    """PasswordPolicy(...) memoised per process (compiling dominates; sampling is cheap)."""
+    return _compile_policy(length, tuple("".join(g) for g in groups),
+                           None if min_counts is None else tuple(min_counts),
+                           max_repeat, max_sequential, tuple(forbidden), ignore_case)
+
+# --------- Diceware passphrases ---------
+# Wordlists are compiled once into an offset-indexed file (.wlx) and memory-mapped:
+#   header  : magic, word count, byte length of the charset string
+#   charset : every distinct char used by the words (UTF-8), padded to 4 bytes
+#   offsets : uint32 little-endian x (count + 1), relative to the blob
+#   blob    : words as UTF-8, back to back
+# Opening is O(1) (no parsing) and pages are shared by every session / process.
+_WL_MAGIC = b"VLWLX\x00\x00\x01"
+_WL_HEADER = struct.Struct("<8sII")
+_WORDLIST_DIR = Path(__file__).resolve().parents[1] / "assets" / "wordlists"
+_WORDLISTS: dict = {}
+_WORDLISTS_LOCK = threading.Lock()
+
+def parse_wordlist(text: str) -> List[str]:
+    """
+    Words from a plain list (one per line) or a diceware list ("11111<TAB>abacus").
+    Blank lines and '#' comments are skipped; duplicates are dropped since they
+    would silently lower the entropy.
+    """
+    seen, words = set(), []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split()
+        word = " ".join(parts[1:]) if len(parts) > 1 and parts[0].isdigit() else line
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+def build_wordlist_index(words: List[str], dst: Path) -> Path:
+    """Write 'words' to a .wlx index at 'dst' (atomically, via a temp file + rename)."""
+    if len(words) < 2:
+        raise ValueError("Wordlist needs at least 2 distinct words.")
+    blob = [w.encode("utf-8") for w in words]
+    offsets = array("I", [0])
+    for b in blob:
+        offsets.append(offsets[-1] + len(b))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    charset = "".join(sorted({c for w in words for c in w})).encode("utf-8")
+    charset += b"\x00" * (-len(charset) % 4)
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f"{dst.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(_WL_HEADER.pack(_WL_MAGIC, len(words), len(charset)))
+        f.write(charset)
+        f.write(offsets.tobytes())
+        f.writelines(blob)
+    os.replace(tmp, dst)
+    return dst
+
+class Wordlist:
+    """Read-only view of a memory-mapped .wlx index; words are decoded on access only."""
+
+    def __init__(self, path: Path, name: str | None = None):
+        self.path = Path(path)
+        self.name = name or self.path.stem
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, n_charset = _WL_HEADER.unpack_from(self._mm, 0)
+        if magic != _WL_MAGIC:
+            raise ValueError(f"Not a wordlist index: {self.path}")
+        start = _WL_HEADER.size
+        self.chars = frozenset(bytes(self._mm[start:start + n_charset]).rstrip(b"\x00").decode("utf-8"))
+        start += n_charset
+        end = start + 4 * (count + 1)
+        if sys.byteorder == "little":
+            self._offsets = memoryview(self._mm)[start:end].cast("I")
+        else:                          # rare: copy + swap instead of a zero-copy view
+            self._offsets = array("I", self._mm[start:end])
+            self._offsets.byteswap()
+        self._blob = end
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> str:
+        if not -self._count <= i < self._count:
+            raise IndexError("wordlist index out of range")
+        i %= self._count
+        b = self._blob
+        return self._mm[b + self._offsets[i]:b + self._offsets[i + 1]].decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(self._count))
+
+    def unambiguous(self, separators: str) -> bool:
+        """True when every passphrase splits back into its words (no separator char inside words)."""
+        return bool(separators) and self.chars.isdisjoint(separators)
+
+def load_wordlist(path: str | Path) -> Wordlist:
+    """
+    Open a wordlist (plain / diceware text, or a .wlx index), cached process-wide.
+    Text sources are indexed once into the cache dir; the index is rebuilt when
+    the source file changes.
+    """
+    src = Path(path).expanduser().resolve()
+    st = src.stat()
+    key = (str(src), st.st_mtime_ns, st.st_size)
+    with _WORDLISTS_LOCK:
+        wl = _WORDLISTS.get(key)
+        if wl is None:
+            if src.suffix == ".wlx":
+                idx = src
+            else:
+                tag = hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+                idx = cache_dir() / "wordlists" / f"{src.stem}-{tag}.wlx"
+                if not idx.exists():
+                    build_wordlist_index(parse_wordlist(src.read_text(encoding="utf-8")), idx)
+            wl = _WORDLISTS[key] = Wordlist(idx, src.stem)
+        return wl
+
+def load_wordlist_bytes(data: bytes, name: str = "uploaded") -> Wordlist:
+    """Same as load_wordlist() for in-memory content (e.g. an upload), keyed by its hash."""
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    key = ("sha256", digest)
+    with _WORDLISTS_LOCK:
+        wl = _WORDLISTS.get(key)
+        if wl is None:
+            idx = cache_dir() / "wordlists" / f"{digest}.wlx"
+            if not idx.exists():
+                build_wordlist_index(parse_wordlist(data.decode("utf-8-sig")), idx)
+            wl = _WORDLISTS[key] = Wordlist(idx, name)
+        return wl
+
+def wordlist_sources() -> List[Path]:
+    """
+    Wordlist files found in $VLABS_WORDLIST_DIR and assets/wordlists (the EFF large list ships
+    there). A text list next to its prebuilt index (same stem) is listed once, as the .wlx.
+    """
+    dirs = [Path(d) for d in (os.environ.get("VLABS_WORDLIST_DIR"),) if d] + [_WORDLIST_DIR]
+    found = []
+    for d in dirs:
+        if d.is_dir():
+            by_stem: dict = {}
+            for p in sorted(d.iterdir()):
+                if p.suffix in (".txt", ".wlx") and p.is_file() and (p.stem not in by_stem or p.suffix == ".wlx"):
+                    by_stem[p.stem] = p
+            found += sorted(by_stem.values())
+    return found
+
+def generate_passphrase(
+    wordlist: Wordlist,
+    words: int = 6,
+    separators: str = "-",
+    capitalize: bool = False,
+) -> str:
+    """
+    'words' uniformly chosen words (secrets.randbelow). With several separator
+    characters, each gap gets a random one (counted in passphrase_bits).
+    """
+    if words < 1:
+        raise ValueError("At least 1 word is required.")
+    n = len(wordlist)
+    picked = [wordlist[secrets.randbelow(n)] for _ in range(words)]
+    if capitalize:
+        picked = [w[:1].upper() + w[1:] for w in picked]
+    separators = "".join(dict.fromkeys(separators))    # duplicates would bias the draw
+    if len(separators) <= 1:
+        return separators.join(picked)
+    out = [picked[0]]
+    for w in picked[1:]:
+        out.append(secrets.choice(separators))
+        out.append(w)
+    return "".join(out)
+
+def iter_passphrases(wordlist: Wordlist, count: int | None = None, **kw) -> Iterator[str]:
+    """Stream `count` passphrases (None = endless)."""
+    while count is None or count > 0:
+        yield generate_passphrase(wordlist, **kw)
+        if count is not None:
+            count -= 1
+
+def passphrase_bits(list_size: int, words: int, separators: str = "-") -> float:
+    """
+    log2 of the number of distinct draws: list_size ** words, times
+    len(separators) ** (words - 1) when the separator is random per gap.
+    Fixed capitalisation / a single separator add nothing. Exact when the
+    wordlist is unambiguous() for these separators, an upper bound otherwise.
+    """
+    if words <= 0 or list_size <= 1:
+        return 0.0
+    seps = len(set(separators))
+    return words * math.log2(list_size) + (max(words - 1, 0) * math.log2(seps) if seps > 1 else 0.0)
+
 def entropy_bits(length: int, alphabet_size: int) -> float:
     if length <= 0 or alphabet_size <= 1:
         return 0.0
@@ -0,0 +1,199 @@
+# core/job_utils.py
+"""
+Chạy các thao tác mạng dài (port scan, WHOIS hàng loạt, path monitor, ...) nền trên
+1 executor dùng chung cho cả tiến trình, tách khỏi vòng đời script Streamlit:
+rerun/đổi widget không làm mất việc đang chạy, gắn lại được theo job id.
+Mỗi job thuộc 1 owner (UI: token trên URL, sống qua reload): chỉ owner đó thấy / gắn lại / huỷ.
+"""
+from __future__ import annotations
+import contextvars
+import itertools
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List
+
+QUEUED, RUNNING, DONE, ERROR, CANCELLED = "queued", "running", "done", "error", "cancelled"
+_ACTIVE = (QUEUED, RUNNING)
+
+_MAX_WORKERS = 8
+_MAX_ACTIVE_PER_OWNER = 4   # job đang chờ/chạy mỗi owner -> 1 session không chiếm hết worker
+_MAX_DEDICATED = 16         # job không giới hạn thời gian (monitor) chạy thread riêng, ngoài pool
+_KEEP_FINISHED = 3600.0   # giữ job đã xong 1 giờ để gắn lại / xem kết quả
+_MAX_JOBS = 200
+
+class JobLimit(RuntimeError):
+    """Owner đã có quá nhiều job đang chạy (hoặc quá nhiều monitor chạy thread riêng)."""
+
+class JobContext:
+    """Truyền vào hàm của job: báo tiến độ, đẩy kết quả dần, kiểm tra yêu cầu huỷ."""
+    __slots__ = ("_job",)
+
+    def __init__(self, job: Job):
+        self._job = job
+
+    @property
+    def cancel_event(self) -> threading.Event:
+        return self._job._cancel
+
+    @property
+    def cancelled(self) -> bool:
+        return self._job._cancel.is_set()
+
+    def progress(self, done: int, total: int) -> None:
+        with self._job._lock:
+            self._job.done, self._job.total = int(done), int(total)
+
+    def emit(self, *items: Any) -> None:
+        with self._job._lock:
+            self._job._items.extend(items)
+
+    def publish(self, value: Any) -> None:
+        """Thay snapshot mới nhất (vd. bảng hop của path monitor) thay vì cộng dồn như emit."""
+        self._job.snapshot = value
+
+    def note(self, text: str) -> None:
+        with self._job._lock:
+            self._job.message = text
+
+class Job:
+    """Trạng thái 1 job; chỉ đọc từ phía UI (ghi qua JobContext trong thread của job)."""
+    __slots__ = ("id", "kind", "title", "owner", "dedicated", "status", "created", "started", "finished",
+                 "done", "total", "message", "snapshot", "result", "error", "_items", "_cancel", "_lock")
+
+    def __init__(self, job_id: str, kind: str, title: str, owner: str = "default", dedicated: bool = False):
+        self.id = job_id
+        self.kind = kind
+        self.title = title
+        self.owner = owner
+        self.dedicated = dedicated
+        self.status = QUEUED
+        self.created = time.time()
+        self.started: float | None = None
+        self.finished: float | None = None
+        self.done = 0
+        self.total = 0
+        self.message = ""
+        self.snapshot: Any = None
+        self.result: Any = None
+        self.error: str | None = None
+        self._items: list = []
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.status in _ACTIVE
+
+    @property
+    def percent(self) -> int:
+        return min(self.done * 100 // self.total, 100) if self.total else 0
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def items(self, start: int = 0) -> list:
+        """Kết quả từng phần đã emit (từ vị trí 'start' -> UI chỉ lấy phần mới)."""
+        with self._lock:
+            return self._items[start:]
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+class JobManager:
+    def __init__(self, max_workers: int = _MAX_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vlabs-job")
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+
+    def submit(self, fn: Callable[..., Any], *args, kind: str = "job", title: str = "",
+               owner: str = "default", dedicated: bool = False, **kwargs) -> str:
+        """
+        Chạy fn(ctx, *args, **kwargs) nền, trả job id ngay. Giá trị trả về của fn là job.result;
+        fn nên kiểm tra ctx.cancelled (hoặc truyền ctx.cancel_event xuống) để dừng sớm.
+        dedicated=True: job không có điểm dừng (vd. monitor tới khi huỷ) -> thread riêng thay vì
+        giữ 1 worker của pool mãi. JobLimit nếu owner đã có _MAX_ACTIVE_PER_OWNER job đang chạy.
+        """
+        self._purge()
+        job = Job(f"{kind}-{next(self._seq)}-{int(time.time()) % 100000:05d}", kind, title or kind,
+                  owner, dedicated)
+        with self._lock:
+            active = [j for j in self._jobs.values() if j.active]
+            if sum(j.owner == owner for j in active) >= _MAX_ACTIVE_PER_OWNER:
+                raise JobLimit(f"Đã có {_MAX_ACTIVE_PER_OWNER} job đang chạy; huỷ bớt hoặc chờ xong.")
+            if dedicated and sum(j.dedicated for j in active) >= _MAX_DEDICATED:
+                raise JobLimit("Quá nhiều monitor đang chạy trên máy chủ; thử lại sau.")
+            self._jobs[job.id] = job
+        # copy context: owner của governor mạng (session) đi theo job sang thread nền
+        run = contextvars.copy_context().run
+        if dedicated:
+            threading.Thread(target=run, args=(self._run, job, fn, args, kwargs),
+                             name=f"vlabs-job-{job.id}", daemon=True).start()
+        else:
+            self._pool.submit(run, self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        if job._cancel.is_set():
+            job.status, job.finished = CANCELLED, time.time()
+            return
+        job.status, job.started = RUNNING, time.time()
+        try:
+            job.result = fn(JobContext(job), *args, **kwargs)
+            job.status = CANCELLED if job._cancel.is_set() else DONE
+        except Exception as e:
+            job.error = f"{e}\n{traceback.format_exc(limit=3)}"
+            job.status = ERROR
+        finally:
+            job.finished = time.time()
+
+    def get(self, job_id: str | None, owner: str | None = None) -> Job | None:
+        """owner: chỉ trả job của owner đó (None = không lọc, dùng nội bộ/CLI)."""
+        if not job_id:
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None and (owner is None or job.owner == owner) else None
+
+    def list(self, kind: str | None = None, owner: str | None = None) -> List[Job]:
+        """Mới nhất trước."""
+        with self._lock:
+            jobs = [j for j in self._jobs.values()
+                    if (kind is None or j.kind == kind) and (owner is None or j.owner == owner)]
+        return sorted(jobs, key=lambda j: j.created, reverse=True)
+
+    def cancel(self, job_id: str, owner: str | None = None) -> bool:
+        job = self.get(job_id, owner)
+        if job is None or not job.active:
+            return False
+        job.cancel()
+        return True
+
+    def _purge(self) -> None:
+        now = time.time()
+        with self._lock:
+            old = [k for k, j in self._jobs.items()
+                   if not j.active and j.finished and now - j.finished > _KEEP_FINISHED]
+            for k in old:
+                del self._jobs[k]
+            extra = len(self._jobs) - _MAX_JOBS
+            if extra > 0:
+                done = sorted((j for j in self._jobs.values() if not j.active), key=lambda j: j.created)
+                for j in done[:extra]:
+                    del self._jobs[j.id]
+
+_MANAGER: JobManager | None = None
+_MANAGER_LOCK = threading.Lock()
+
+def jobs() -> JobManager:
+    """JobManager dùng chung cho cả tiến trình (mọi session Streamlit)."""
+    global _MANAGER
+    with _MANAGER_LOCK:
+        if _MANAGER is None:
+            _MANAGER = JobManager()
+        return _MANAGER
@@ -0,0 +1,229 @@
+# core/metrics_utils.py
+"""
+Đo đạc nhẹ cho các thao tác mạng: bộ đếm, số lỗi và histogram độ trễ theo từng thao tác
+(op) + kết quả (outcome), gauge lấy giá trị lúc đọc (vd. tải governor). Dùng chung cả tiến
+trình; xuất dạng text Prometheus (cli.py serve -> /metrics) hoặc bảng cho trang chẩn đoán.
+
+Chi phí mỗi lần ghi: 1 bisect + 1 lock (~1 µs), đủ rẻ để đặt ở từng probe của port scan.
+"""
+from __future__ import annotations
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Tuple
+
+# Biên bucket (ms): 0.25 ms (loopback) .. 30 s (WHOIS chậm / timeout)
+_BOUNDS_MS: Tuple[float, ...] = (0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000,
+                                 10000, 30000)
+_ERROR_OUTCOMES = frozenset(("error", "timeout"))
+_PREFIX = "vlabs_"
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count", "max")
+
+    def __init__(self, bounds: Tuple[float, ...] = _BOUNDS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)    # ô cuối: > bound lớn nhất (+Inf)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+        if v > self.max:
+            self.max = v
+
+    def merge(self, other: Histogram) -> None:
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.sum += other.sum
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float | None:
+        """Ước lượng phân vị (nội suy tuyến tính trong bucket, như histogram_quantile)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lo = self.bounds[i - 1] if i else 0.0
+                hi = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(lo + (hi - lo) * (rank - seen) / c, self.max)
+            seen += c
+        return self.max
+
+class OpStat(NamedTuple):
+    op: str
+    calls: int
+    errors: int                  # outcome "error" | "timeout"
+    outcomes: str                # vd. "ok=120, nxdomain=3, timeout=2"
+    avg_ms: float | None
+    p50_ms: float | None
+    p90_ms: float | None
+    p99_ms: float | None
+    max_ms: float | None
+
+    @property
+    def error_pct(self) -> float:
+        return self.errors * 100.0 / self.calls if self.calls else 0.0
+
+class _Timer:
+    """Giá trị của 'with timed(op) as t': đặt t.outcome để ghi kết quả khác "ok"."""
+    __slots__ = ("outcome",)
+
+    def __init__(self):
+        self.outcome = "ok"
+
+def _fmt_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels) + "}"
+
+def _fmt_num(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+class Metrics:
+    def __init__(self, bounds: Tuple[float, ...] = _BOUNDS_MS):
+        self._bounds = bounds
+        self._lock = threading.Lock()
+        self._hists: Dict[Tuple[str, str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], float | Dict[Tuple[Tuple[str, str], ...], float]]]] = {}
+        self.started = time.time()
+
+    # ---- Ghi ----
+    def observe(self, op: str, ms: float, outcome: str = "ok", **labels: str) -> None:
+        """labels: chiều phụ ít giá trị (vd. server=TLD/nameserver), ops() gộp lại theo op."""
+        key = (op, outcome, tuple(sorted(labels.items())) if labels else ())
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None:
+                h = self._hists[key] = Histogram(self._bounds)
+            h.observe(ms)
+
+    def inc(self, name: str, n: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    @contextmanager
+    def timed(self, op: str, **labels: str) -> Iterator[_Timer]:
+        """Đo khối lệnh; exception -> outcome "error" (trừ khi đã đặt t.outcome khác "ok")."""
+        t = _Timer()
+        t0 = time.perf_counter()
+        try:
+            yield t
+        except BaseException:
+            if t.outcome == "ok":
+                t.outcome = "error"
+            raise
+        finally:
+            self.observe(op, (time.perf_counter() - t0) * 1000, t.outcome, **labels)
+
+    def gauge(self, name: str, fn: Callable[[], float | dict], help: str = "") -> None:
+        """fn() -> số, hoặc dict {((label, value), ...): số}; gọi lúc đọc/xuất, lỗi thì bỏ qua."""
+        with self._lock:
+            self._gauges[name] = (help, fn)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hists.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    # ---- Đọc ----
+    def ops(self) -> List[OpStat]:
+        merged: Dict[str, Histogram] = {}
+        outcomes: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            for (op, outcome, _), h in self._hists.items():
+                merged.setdefault(op, Histogram(self._bounds)).merge(h)
+                oc = outcomes.setdefault(op, {})
+                oc[outcome] = oc.get(outcome, 0) + h.count
+        out = []
+        for op in sorted(merged):
+            h, oc = merged[op], outcomes[op]
+            out.append(OpStat(
+                op, h.count, sum(n for o, n in oc.items() if o in _ERROR_OUTCOMES),
+                ", ".join(f"{o}={n}" for o, n in sorted(oc.items(), key=lambda x: -x[1])),
+                h.sum / h.count if h.count else None,
+                h.quantile(0.5), h.quantile(0.9), h.quantile(0.99), h.max if h.count else None,
+            ))
+        return out
+
+    def counters(self) -> List[Tuple[str, dict, float]]:
+        with self._lock:
+            return [(name, dict(labels), v) for (name, labels), v in sorted(self._counters.items())]
+
+    def gauges(self) -> List[Tuple[str, dict, float]]:
+        with self._lock:
+            gauges = list(self._gauges.items())
+        out = []
+        for name, (_, fn) in gauges:
+            try:
+                v = fn()
+            except Exception:
+                continue
+            if isinstance(v, dict):
+                out.extend((name, dict(labels), float(x)) for labels, x in sorted(v.items()))
+            else:
+                out.append((name, {}, float(v)))
+        return out
+
+    def render_prometheus(self) -> str:
+        """Text exposition format 0.0.4 (thời gian theo giây như quy ước Prometheus)."""
+        lines: List[str] = []
+        with self._lock:
+            hists = sorted(((k, h.counts[:], h.sum, h.count) for k, h in self._hists.items()), key=lambda x: x[0])
+            counters = sorted(self._counters.items())
+            gauge_help = {n: h for n, (h, _) in self._gauges.items()}
+        name = f"{_PREFIX}op_duration_seconds"
+        lines += [f"# HELP {name} Thời gian mỗi thao tác mạng theo op và outcome.", f"# TYPE {name} histogram"]
+        for (op, outcome, labels), counts, total, count in hists:
+            base = (("op", op), ("outcome", outcome)) + labels
+            acc = 0
+            for bound, c in zip(self._bounds + (math.inf,), counts):
+                acc += c
+                le = "+Inf" if bound == math.inf else repr(bound / 1000)
+                lines.append(f"{name}_bucket{_fmt_labels(base + (('le', le),))} {acc}")
+            lines.append(f"{name}_sum{_fmt_labels(base)} {total / 1000!r}")
+            lines.append(f"{name}_count{_fmt_labels(base)} {count}")
+        name = f"{_PREFIX}op_errors_total"
+        lines += [f"# HELP {name} Số thao tác kết thúc bằng lỗi/timeout.", f"# TYPE {name} counter"]
+        errors: Dict[str, int] = {}
+        for (op, outcome, _), _, _, count in hists:
+            errors[op] = errors.get(op, 0) + (count if outcome in _ERROR_OUTCOMES else 0)
+        for op, n in sorted(errors.items()):
+            lines.append(f"{name}{_fmt_labels((('op', op),))} {n}")
+        seen = set()
+        for (cname, labels), v in counters:
+            full = f"{_PREFIX}{cname}_total"
+            if full not in seen:
+                seen.add(full)
+                lines.append(f"# TYPE {full} counter")
+            lines.append(f"{full}{_fmt_labels(labels)} {_fmt_num(v)}")
+        seen = set()
+        for gname, labels, v in self.gauges():
+            full = f"{_PREFIX}{gname}"
+            if full not in seen:
+                seen.add(full)
+                if gauge_help.get(gname):
+                    lines.append(f"# HELP {full} {gauge_help[gname]}")
+                lines.append(f"# TYPE {full} gauge")
+            lines.append(f"{full}{_fmt_labels(tuple(sorted(labels.items())))} {_fmt_num(v)}")
+        return "\n".join(lines) + "\n"
+
+_METRICS = Metrics()
+
+def metrics() -> Metrics:
+    """Registry dùng chung cho cả tiến trình (mọi session Streamlit, CLI server)."""
+    return _METRICS
@@ -1,10 +1,20 @@
 # core/network_utils.py
 from __future__ import annotations
-import socket, ssl, subprocess, sys, os, urllib.request, json, shutil, time, ipaddress
-from typing import List, Tuple, Iterable, Callable
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import socket, ssl, subprocess, sys, os, json, shutil, time, ipaddress, struct
+import asyncio, threading, queue, errno, contextvars, logging
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Iterable, Iterator, AsyncIterator, Callable, NamedTuple
+
+from core.cache_utils import cache_dir
+from core.metrics_utils import metrics
+from core.port_utils import PortSet, RankedPorts
 
 # --------- Helpers ---------
+_METRICS = metrics()   # đo đạc dùng chung (core/metrics_utils.py)
+
 def _run_cmd(cmd: List[str], timeout: int = 60) -> str:
     try:
         cp = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
@@ -13,164 +23,999 @@ def _run_cmd(cmd: List[str], timeout: int = 60) -> str:
     except Exception as e:
         return f"Lỗi chạy lệnh: {e}"
 
-def _is_private_ipv4(ip: str) -> bool:
+class _TTLCache:
+    """
+    Cache trong tiến trình: mỗi mục có hạn (TTL) riêng, giới hạn kích thước, loại bỏ theo LRU.
+    An toàn đa luồng (dùng chung giữa các session Streamlit).
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self._data: OrderedDict = OrderedDict()
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+_IO_POOL: ThreadPoolExecutor | None = None
+_IO_POOL_LOCK = threading.Lock()
+
+def _io_pool() -> ThreadPoolExecutor:
+    """Pool thread dùng chung cho các thao tác I/O blocking (DNS, ...), tạo khi cần."""
+    global _IO_POOL
+    with _IO_POOL_LOCK:
+        if _IO_POOL is None:
+            _IO_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="vlabs-io")
+        return _IO_POOL
+
+# ---- Bản ghi kết quả -> bảng ----
+# Mọi thao tác trả NamedTuple (gọn, không __dict__); chuỗi hiển thị chỉ là 1 cách render.
+# Bản ghi có row() thì dùng row() (làm phẳng thống kê/trường lồng), còn lại dùng _asdict().
+# record_row() cũng là dạng JSON của bản ghi (cli.py xuất JSON/NDJSON qua hàm này).
+def record_row(rec) -> dict:
+    row = getattr(rec, "row", None)
+    if callable(row):
+        return row()
+    out = rec._asdict()
+    for k, v in out.items():
+        if isinstance(v, tuple) and all(isinstance(x, str) for x in v):
+            out[k] = ", ".join(v)
+    return out
+
+def to_dataframe(records: Iterable):
+    """List bản ghi (CertInfo, DnsResult, WhoisInfo, ProbeResult, PingStats, PathHop, ...) -> pandas.DataFrame."""
+    import pandas as pd
+    return pd.DataFrame([record_row(r) for r in records])
+
+# --------- Async helpers ---------
+_DONE = object()
+
+class _Failure(NamedTuple):
+    exc: BaseException
+
+def _iter_async(make_agen: Callable[[], AsyncIterator], want: int | None = None) -> Iterator:
+    """
+    Chạy một async generator trên event loop riêng (thread nền) và trả về iterator đồng bộ.
+    Dùng được trong thread script của Streamlit. Đóng iterator sớm -> huỷ task phía async.
+    want: số socket đồng thời mong muốn -> xin lease của governor (chờ/NetworkBusy khi quá tải).
+    """
+    lease = _GOVERNOR.acquire(want) if want else None
     try:
-        ipobj = ipaddress.ip_address(ip)
-        return ipobj.version == 4 and ipobj.is_private
-    except Exception:
-        return False
+        yield from _run_async(make_agen, lease)
+    finally:
+        if lease is not None:
+            _GOVERNOR.release(lease)
+
+def _run_async(make_agen: Callable[[], AsyncIterator], lease: _Lease | None) -> Iterator:
+    q: queue.Queue = queue.Queue()
+    loop = asyncio.new_event_loop()
+
+    async def _pump() -> None:
+        if lease is not None:
+            lease.bind()
+        try:
+            async for item in make_agen():
+                q.put(item)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            q.put(_Failure(e))
+        finally:
+            q.put(_DONE)
+
+    task = loop.create_task(_pump())
+
+    def _run() -> None:
+        try:
+            loop.run_until_complete(task)
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
 
-def _is_valid_ipv6(ip: str) -> bool:
+    t = threading.Thread(target=_run, name="vlabs-async", daemon=True)
+    t.start()
     try:
-        ipobj = ipaddress.ip_address(ip.split("%")[0])  # bỏ scope id nếu có, ví dụ fe80::1%eth0
-        return ipobj.version == 6 and not ipobj.is_loopback
-    except Exception:
-        return False
+        while True:
+            item = q.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        if t.is_alive():
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:  # loop vừa đóng xong
+                pass
+        t.join()
 
-# ---- TCP ping fallback (khi không có lệnh ping/ICMP bị chặn) ----
-def _tcp_ping_once(host: str, port: int, timeout: float = 1.5) -> Tuple[bool, float | None]:
-    start = time.perf_counter()
+def _fd_budget(want: int, reserve: int = 64) -> int:
+    """Giới hạn số socket mở đồng thời theo RLIMIT_NOFILE (nếu có)."""
     try:
-        with socket.create_connection((host, port), timeout=timeout):
-            elapsed = (time.perf_counter() - start) * 1000.0
-            return True, elapsed
+        import resource
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            want = min(want, soft - reserve)
     except Exception:
-        return False, None
+        pass
+    return max(1, int(want))
 
-def _tcp_ping(host: str, attempts: int = 3) -> str:
-    ports = [443, 80, 53]  # HTTPS/HTTP/DNS
-    lines = []
-    ok_any = False
-    for i in range(1, attempts + 1):
-        port = ports[(i - 1) % len(ports)]
-        ok, ms = _tcp_ping_once(host, port)
-        if ok:
-            ok_any = True
-            lines.append(f"TCP ping to {host}:{port}  time={ms:.1f} ms")
+# --------- Governor: ngân sách socket/thread dùng chung cả tiến trình ---------
+# Mọi engine async (scan, sweep, bulk DNS, SSL, ping, path) chạy qua _iter_async xin 1 lease:
+# số thao tác đồng thời bị chặn (mỗi thao tác = 1 thread + event loop), còn số socket in-flight
+# được chia công bằng (max-min) giữa các owner (session), rồi giữa các thao tác của cùng owner.
+# Khi có người mới vào, lease đang chạy bị thu hẹp ngay (cổng _Gate đổi sức chứa tại chỗ).
+_MAX_SOCKETS = 4096
+_MAX_OPS = 16
+_MIN_SHARE = 16           # dưới mức này thì bắt chờ thay vì chia nhỏ thêm
+_LEASE_WAIT = 30.0        # chờ tối đa trước khi báo NetworkBusy
+
+_OWNER: contextvars.ContextVar[str] = contextvars.ContextVar("vlabs_owner", default="default")
+_LEASE: contextvars.ContextVar["_Lease | None"] = contextvars.ContextVar("vlabs_lease", default=None)
+
+class NetworkBusy(RuntimeError):
+    """Governor hết chỗ (quá nhiều thao tác mạng đồng thời) sau khi đã chờ _LEASE_WAIT giây."""
+
+def set_network_owner(owner: str) -> None:
+    """Gắn các thao tác mạng tiếp theo trong context hiện tại với 1 owner (vd. session Streamlit)."""
+    _OWNER.set(owner or "default")
+
+class _Gate:
+    """Giới hạn in-flight theo lease.limit trên 1 event loop; limit đổi được từ thread khác."""
+    __slots__ = ("_lease", "_loop", "inflight", "_waiters")
+
+    def __init__(self, lease: _Lease, loop: asyncio.AbstractEventLoop):
+        self._lease = lease
+        self._loop = loop
+        self.inflight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        if self.inflight < self._lease.limit and not self._waiters:
+            self.inflight += 1
+            return
+        fut = self._loop.create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # đã được cấp chỗ nhưng bị huỷ trước khi dùng
+            raise
+
+    def release(self) -> None:
+        self.inflight -= 1
+        self.wake()
+
+    def wake(self) -> None:
+        while self._waiters and self.inflight < self._lease.limit:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.inflight += 1
+                fut.set_result(None)
+
+class _Lease:
+    __slots__ = ("owner", "want", "limit", "gate", "started")
+
+    def __init__(self, owner: str, want: int):
+        self.owner = owner
+        self.want = max(1, int(want))
+        self.limit = 0
+        self.gate: _Gate | None = None
+        self.started = time.monotonic()
+
+    def bind(self) -> _Gate:
+        """Gọi trong event loop của thao tác: tạo cổng và đặt lease làm lease hiện tại."""
+        self.gate = _Gate(self, asyncio.get_running_loop())
+        _LEASE.set(self)
+        return self.gate
+
+def _fair_shares(demands: List[int], capacity: int) -> List[int]:
+    """Chia 'capacity' kiểu max-min (water-filling): ai cần ít được đủ, phần dư chia đều cho còn lại."""
+    out = [0] * len(demands)
+    left, todo = capacity, sorted(range(len(demands)), key=demands.__getitem__)
+    while todo:
+        share = left // len(todo)
+        i = todo[0]
+        if demands[i] <= share:
+            out[i] = demands[i]
+            left -= demands[i]
+            todo.pop(0)
         else:
-            lines.append(f"TCP ping to {host}:{port}  timeout")
-        time.sleep(0.2)
-    if not ok_any:
-        lines.append("Không thể ping (không mở port phổ biến hoặc bị chặn).")
-    return "\n".join(lines)
+            for j in todo:
+                out[j] = share
+            break
+    return out
 
-# --------- Public / Local IP (giữ để dùng khi cần) ---------
-def get_public_ip() -> str:
-    sources = [
-        ("https://api.ipify.org?format=json", "json", "ip"),
-        ("https://ifconfig.co/json", "json", "ip"),
-        ("https://ident.me", "text", None),
-    ]
-    for url, kind, key in sources:
+class _Governor:
+    def __init__(self, max_sockets: int = _MAX_SOCKETS, max_ops: int = _MAX_OPS):
+        self.capacity = _fd_budget(max_sockets, reserve=256)
+        self.max_ops = max_ops
+        self._leases: List[_Lease] = []
+        self._cond = threading.Condition()
+        self.waiting = 0
+        self.rejected = 0
+
+    def _admissible(self) -> bool:
+        return (len(self._leases) < self.max_ops
+                and self.capacity // (len(self._leases) + 1) >= min(_MIN_SHARE, self.capacity))
+
+    def acquire(self, want: int, timeout: float = _LEASE_WAIT) -> _Lease:
+        lease = _Lease(_OWNER.get(), want)
+        with self._cond:
+            self.waiting += 1
+            try:
+                if not self._cond.wait_for(self._admissible, timeout):
+                    self.rejected += 1
+                    raise NetworkBusy(
+                        f"Hệ thống đang bận: {len(self._leases)} thao tác mạng đang chạy "
+                        f"({self.in_flight()}/{self.capacity} socket). Vui lòng thử lại sau.")
+            finally:
+                self.waiting -= 1
+            self._leases.append(lease)
+            self._rebalance()
+        return lease
+
+    def release(self, lease: _Lease) -> None:
+        with self._cond:
+            if lease in self._leases:
+                self._leases.remove(lease)
+                self._rebalance()
+            self._cond.notify_all()
+
+    def _rebalance(self) -> None:
+        owners: dict[str, List[_Lease]] = {}
+        for ls in self._leases:
+            owners.setdefault(ls.owner, []).append(ls)
+        names = list(owners)
+        per_owner = _fair_shares([sum(ls.want for ls in owners[o]) for o in names], self.capacity)
+        for o, cap in zip(names, per_owner):
+            group = owners[o]
+            for ls, lim in zip(group, _fair_shares([ls.want for ls in group], cap)):
+                if lim != ls.limit:
+                    grew = lim > ls.limit
+                    ls.limit = max(1, lim)
+                    if grew and ls.gate is not None:
+                        try:
+                            ls.gate._loop.call_soon_threadsafe(ls.gate.wake)
+                        except RuntimeError:  # loop đã đóng
+                            pass
+
+    def in_flight(self) -> int:
+        return sum(ls.gate.inflight for ls in self._leases if ls.gate is not None)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "in_flight": self.in_flight(),
+                "ops": len(self._leases),
+                "max_ops": self.max_ops,
+                "waiting": self.waiting,
+                "rejected": self.rejected,
+                "owners": len({ls.owner for ls in self._leases}),
+                "leases": [(ls.owner, ls.want, ls.limit) for ls in self._leases],
+            }
+
+_GOVERNOR = _Governor()
+
+# Gauge đọc lúc xuất metrics: độ bão hoà của governor + kích thước cache
+_METRICS.gauge("governor_capacity_sockets", lambda: _GOVERNOR.capacity, "Ngân sách socket chung.")
+_METRICS.gauge("governor_in_flight_sockets", lambda: _GOVERNOR.in_flight(), "Socket đang mở qua governor.")
+_METRICS.gauge("governor_ops", lambda: len(_GOVERNOR._leases), "Thao tác mạng đang giữ lease.")
+_METRICS.gauge("governor_waiting_ops", lambda: _GOVERNOR.waiting, "Thao tác đang chờ lease.")
+_METRICS.gauge("governor_rejected_ops", lambda: _GOVERNOR.rejected, "Số lần NetworkBusy từ lúc khởi động.")
+
+def governor_stats() -> dict:
+    """Tình trạng governor (capacity, socket in-flight, số thao tác, đang chờ, bị từ chối)."""
+    return _GOVERNOR.stats()
+
+def _gate() -> _Gate | None:
+    """Cổng của thao tác hiện tại (None khi engine async được gọi trực tiếp, không qua governor)."""
+    lease = _LEASE.get()
+    return lease.gate if lease is not None else None
+
+async def _amap_unordered(fn: Callable, items: Iterable, concurrency: int) -> AsyncIterator:
+    """
+    Chạy 'await fn(item)' với tối đa 'concurrency' coroutine cùng kéo từ 1 iterator chung
+    (không tạo Task cho mỗi item); yield kết quả theo thứ tự hoàn thành.
+    """
+    it = iter(items)
+    results: asyncio.Queue = asyncio.Queue()
+    _end = object()
+    gate = _gate()
+
+    async def worker() -> None:
         try:
-            req = urllib.request.Request(url, headers={"User-Agent": "vlabstools/1.0"})
-            with urllib.request.urlopen(req, timeout=5) as r:
-                raw = r.read().decode("utf-8", errors="ignore").strip()
-                if kind == "json":
-                    data = json.loads(raw)
-                    ip = data.get(key)
-                else:
-                    ip = raw
-                if ip:
-                    return ip
-        except Exception:
-            continue
-    return "Không lấy được (server không ra internet hoặc bị chặn)"
+            for item in it:
+                if gate is None:
+                    results.put_nowait(await fn(item))
+                    continue
+                await gate.acquire()
+                try:
+                    results.put_nowait(await fn(item))
+                finally:
+                    gate.release()
+        finally:
+            results.put_nowait(_end)
 
-def get_private_ipv4s() -> List[str]:
+    n = max(1, concurrency)
+    tasks = [asyncio.create_task(worker()) for _ in range(n)]
+    try:
+        running = n
+        while running:
+            item = await results.get()
+            if item is _end:
+                running -= 1
+            else:
+                yield item
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+# --------- Public / Local IP (giữ để dùng khi cần) ---------
+_PUBLIC_IP_SOURCES: Tuple[Tuple[str, str, str | None], ...] = (
+    ("https://api.ipify.org?format=json", "json", "ip"),
+    ("https://ifconfig.co/json", "json", "ip"),
+    ("https://ident.me", "text", None),
+)
+_PUBLIC_IP_TTL = 60.0
+_PUBLIC_IP_CACHE = _TTLCache(16)
+_PUBLIC_IP_LOCK = threading.Lock()
+
+class PublicIP(NamedTuple):
+    ip: str
+    source: str          # URL đã trả lời
+    elapsed_ms: float    # thời gian của lần hỏi thực tế (không tính lần lấy từ cache)
+    cached: bool = False
+
+def _fetch_public_ip(url: str, kind: str, key: str | None, timeout: float) -> str:
+    import urllib.request  # ~15 ms lúc import, chỉ cần khi hỏi IP public
+    req = urllib.request.Request(url, headers={"User-Agent": "vlabstools/1.0"})
+    with _METRICS.timed("public_ip", source=url.split("/")[2]):
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            raw = r.read(4096).decode("utf-8", errors="ignore").strip()
+    ip = json.loads(raw).get(key) if kind == "json" else raw
+    return str(ipaddress.ip_address(str(ip).strip()))  # ValueError nếu không phải IP
+
+def get_public_ip_info(
+    sources: Iterable[Tuple[str, str, str | None]] | None = None,
+    timeout: float = 5.0,
+    ttl: float = _PUBLIC_IP_TTL,
+) -> PublicIP | None:
     """
-    Trả về danh sách IPv4 nội bộ (RFC1918) của *server*.
-    Ưu tiên dùng psutil; fallback socket.getaddrinfo. Loại bỏ loopback/169.254.*.
+    Hỏi đồng thời các nguồn (url, "json"|"text", key); câu trả lời hợp lệ đầu tiên thắng.
+    Request chưa chạy bị huỷ; request đang chạy bị bỏ (tự kết thúc sau 'timeout').
+    Kết quả cache 'ttl' giây; None nếu không nguồn nào trả lời.
     """
-    ips: set[str] = set()
+    from concurrent.futures import wait, FIRST_COMPLETED
+    sources = tuple(sources or _PUBLIC_IP_SOURCES)
+    hit = _PUBLIC_IP_CACHE.get(sources)
+    if hit is not None:
+        return hit._replace(cached=True)
+    with _PUBLIC_IP_LOCK:  # nhiều session cùng lúc -> chỉ 1 lượt hỏi, còn lại lấy cache
+        hit = _PUBLIC_IP_CACHE.get(sources)
+        if hit is not None:
+            return hit._replace(cached=True)
+        t0 = time.perf_counter()
+        pool = _io_pool()
+        futs = {pool.submit(_fetch_public_ip, url, kind, key, timeout): url for url, kind, key in sources}
+        pending, deadline = set(futs), time.monotonic() + timeout + 1.0
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0),
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for f in done:
+                    if f.exception() is None:
+                        info = PublicIP(f.result(), futs[f], (time.perf_counter() - t0) * 1000)
+                        _PUBLIC_IP_CACHE.set(sources, info, ttl)
+                        return info
+        finally:
+            for f in pending:
+                f.cancel()
+    return None
+
+def get_public_ip() -> str:
+    info = get_public_ip_info()
+    return info.ip if info else "Không lấy được (server không ra internet hoặc bị chặn)"
+
+# ---- Snapshot interface: liệt kê 1 lần, phân loại sẵn, dùng chung cho các helper IP ----
+_IF_TTL = 30.0
+_ULA_NET = ipaddress.ip_network("fc00::/7")
+
+class IfAddr(NamedTuple):
+    iface: str
+    ip: str        # không kèm scope id (%eth0)
+    version: int
+    scope: str     # loopback | link-local | private | ula | global | other
 
-    # psutil (nếu có)
+class _IfSnapshot(NamedTuple):
+    addrs: Tuple[IfAddr, ...]
+    private_ipv4s: Tuple[str, ...]
+    preferred_ipv6: str | None
+
+_IF_STATE: Tuple[float, tuple, _IfSnapshot] | None = None   # (hết hạn, if_nameindex, snapshot)
+_IF_LOCK = threading.Lock()
+
+def _ip_scope(ip: ipaddress.IPv4Address | ipaddress.IPv6Address) -> str:
+    if ip.is_loopback:
+        return "loopback"
+    if ip.is_link_local:
+        return "link-local"
+    if ip.version == 6 and ip in _ULA_NET:
+        return "ula"
+    if ip.is_global:
+        return "global"
+    if ip.is_private:
+        return "private"
+    return "other"
+
+def _enum_if_addrs() -> List[Tuple[str, str]]:
+    """(iface, ip) của server. Ưu tiên psutil; fallback không cần DNS: route UDP (không gửi gói)."""
+    out: List[Tuple[str, str]] = []
     try:
         import psutil
-        for _, addrs in psutil.net_if_addrs().items():
+        for name, addrs in psutil.net_if_addrs().items():
             for a in addrs:
-                if a.family == socket.AF_INET:
-                    ip = a.address
-                    if _is_private_ipv4(ip) and not ip.startswith("169.254.") and not ip.startswith("127."):
-                        ips.add(ip)
+                if a.family in (socket.AF_INET, socket.AF_INET6):
+                    out.append((name, a.address))
     except Exception:
         pass
-
-    # fallback: socket.getaddrinfo
-    if not ips:
+    if out:
+        return out
+    for af, probe in ((socket.AF_INET, "192.0.2.1"), (socket.AF_INET6, "2001:db8::1")):
         try:
-            host = socket.gethostname()
-            for af, _, _, _, sockaddr in socket.getaddrinfo(host, None):
-                ip = sockaddr[0]
-                if ":" in ip:
-                    continue
-                if _is_private_ipv4(ip) and not ip.startswith("169.254.") and not ip.startswith("127."):
-                    ips.add(ip)
+            with socket.socket(af, socket.SOCK_DGRAM) as s:
+                s.connect((probe, 9))
+                out.append(("?", s.getsockname()[0]))
+        except OSError:
+            pass
+    if not any(_ip_scope(ipaddress.ip_address(ip)) != "loopback" for _, ip in out):
+        try:  # cuối cùng mới dùng hostname (có thể chờ DNS)
+            for af, _, _, _, sockaddr in socket.getaddrinfo(socket.gethostname(), None):
+                out.append(("?", sockaddr[0]))
         except Exception:
             pass
+    return out
+
+def _build_if_snapshot() -> _IfSnapshot:
+    addrs: dict[Tuple[str, str], IfAddr] = {}
+    for name, raw in _enum_if_addrs():
+        try:
+            ip = ipaddress.ip_address(raw.split("%")[0])
+        except ValueError:
+            continue
+        addrs.setdefault((name, str(ip)), IfAddr(name, str(ip), ip.version, _ip_scope(ip)))
+    items = tuple(addrs.values())
+    v4 = tuple(sorted({a.ip for a in items if a.version == 4 and a.scope == "private"},
+                      key=ipaddress.ip_address))
+    # IPv6 ưu tiên: global -> ULA/private -> link-local
+    rank = {"global": 0, "ula": 1, "private": 1, "link-local": 2}
+    v6 = sorted((rank[a.scope], a.ip) for a in items if a.version == 6 and a.scope in rank)
+    return _IfSnapshot(items, v4, v6[0][1] if v6 else None)
+
+def _if_names() -> tuple:
+    try:
+        return tuple(socket.if_nameindex())
+    except (OSError, AttributeError):
+        return ()
 
-    return sorted(ips)
+def _if_snapshot(refresh: bool = False) -> _IfSnapshot:
+    """Snapshot được cache _IF_TTL giây, hoặc tới khi danh sách interface thay đổi."""
+    global _IF_STATE
+    names = _if_names()
+    state = _IF_STATE
+    if not refresh and state and state[0] > time.monotonic() and state[1] == names:
+        return state[2]
+    with _IF_LOCK:
+        state = _IF_STATE
+        if refresh or not state or state[0] <= time.monotonic() or state[1] != names:
+            _IF_STATE = state = (time.monotonic() + _IF_TTL, names, _build_if_snapshot())
+        return state[2]
+
+def interface_addresses(refresh: bool = False) -> List[IfAddr]:
+    """Mọi địa chỉ IP của server kèm interface và phân loại (loopback/link-local/private/ula/global)."""
+    return list(_if_snapshot(refresh).addrs)
+
+def get_private_ipv4s() -> List[str]:
+    """
+    Trả về danh sách IPv4 nội bộ (RFC1918) của *server*, loại bỏ loopback/169.254.*.
+    Lấy từ snapshot interface (cache), không gọi lại psutil/DNS mỗi lần.
+    """
+    return list(_if_snapshot().private_ipv4s)
 
 def get_preferred_ipv6() -> str | None:
     """
     Trả về 1 IPv6 của server (nếu có).
     Ưu tiên: global (2000::/3) -> unique-local (fc00::/7) -> link-local (fe80::/10).
     """
-    candidates: dict[str, int] = {}  # ip -> priority (thấp hơn = ưu tiên hơn)
-    # psutil
+    return _if_snapshot().preferred_ipv6
+
+# --------- Ping / Traceroute ---------
+# Ping trong tiến trình: ICMP datagram socket (Linux/macOS, không cần root nếu
+# net.ipv4.ping_group_range cho phép), fallback TCP connect (SYN-ACK hay RST đều tính là trả lời).
+_TCP_PING_PORTS = (443, 80, 22, 53)
+
+class PingStats(NamedTuple):
+    host: str
+    addr: str | None
+    method: str                            # "icmp" | "tcp:<port>" | "tcp"
+    rtts: Tuple[float | None, ...]         # ms theo từng lượt; None = mất
+    error: str | None = None
+
+    @property
+    def sent(self) -> int:
+        return len(self.rtts)
+
+    @property
+    def received(self) -> int:
+        return sum(r is not None for r in self.rtts)
+
+    @property
+    def loss_pct(self) -> float:
+        return 100.0 * (1 - self.received / self.sent) if self.sent else 100.0
+
+    def _ok(self) -> List[float]:
+        return [r for r in self.rtts if r is not None]
+
+    @property
+    def min_ms(self) -> float | None:
+        ok = self._ok()
+        return min(ok) if ok else None
+
+    @property
+    def avg_ms(self) -> float | None:
+        ok = self._ok()
+        return sum(ok) / len(ok) if ok else None
+
+    @property
+    def max_ms(self) -> float | None:
+        ok = self._ok()
+        return max(ok) if ok else None
+
+    @property
+    def jitter_ms(self) -> float | None:
+        """Trung bình |chênh lệch| giữa 2 RTT liên tiếp nhận được (kiểu RFC 3550)."""
+        ok = self._ok()
+        if len(ok) < 2:
+            return 0.0 if ok else None
+        return sum(abs(b - a) for a, b in zip(ok, ok[1:])) / (len(ok) - 1)
+
+    def row(self) -> dict:
+        return {
+            "host": self.host, "addr": self.addr, "method": self.method,
+            "sent": self.sent, "received": self.received, "loss_pct": round(self.loss_pct, 1),
+            "min_ms": self.min_ms, "avg_ms": self.avg_ms, "max_ms": self.max_ms,
+            "jitter_ms": self.jitter_ms, "error": self.error,
+        }
+
+_ICMP_OK: dict[int, bool] = {}
+
+def _icmp_permitted(family: int) -> bool:
+    """Thử mở ICMP datagram socket 1 lần cho mỗi family (bị từ chối -> dùng TCP)."""
+    if family not in _ICMP_OK:
+        proto = socket.IPPROTO_ICMP if family == socket.AF_INET else socket.IPPROTO_ICMPV6
+        try:
+            socket.socket(family, socket.SOCK_DGRAM, proto).close()
+            _ICMP_OK[family] = True
+        except (OSError, AttributeError):
+            _ICMP_OK[family] = False
+    return _ICMP_OK[family]
+
+def _icmp_checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(int.from_bytes(data[i:i + 2], "big") for i in range(0, len(data), 2))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+async def _aping_icmp(family: int, sockaddr: tuple, count: int, interval: float, timeout: float
+                      ) -> List[float | None]:
+    """Gửi 'count' echo request cách nhau 'interval', nhận reply qua add_reader, ghép theo seq."""
+    loop = asyncio.get_running_loop()
+    v4 = family == socket.AF_INET
+    req_type, rep_type = (8, 0) if v4 else (128, 129)
+    sent: dict[int, float] = {}
+    rtts: List[float | None] = [None] * count
+    all_in = asyncio.Event()
+    sock = socket.socket(family, socket.SOCK_DGRAM, socket.IPPROTO_ICMP if v4 else socket.IPPROTO_ICMPV6)
+    sock.setblocking(False)
+
+    def on_readable() -> None:
+        while True:
+            try:
+                data = sock.recv(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            now = time.perf_counter()
+            if v4 and data and data[0] >> 4 == 4:  # macOS trả kèm IP header
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < 8 or data[0] != rep_type:
+                continue
+            seq = int.from_bytes(data[6:8], "big")
+            if seq in sent and seq < count and rtts[seq] is None:
+                rtts[seq] = (now - sent[seq]) * 1000.0
+                if all(r is not None for r in rtts):
+                    all_in.set()
+
     try:
-        import psutil
-        for _, addrs in psutil.net_if_addrs().items():
-            for a in addrs:
-                if getattr(a, "family", None) == socket.AF_INET6 and _is_valid_ipv6(a.address):
-                    ip = a.address.split("%")[0]
-                    ipobj = ipaddress.ip_address(ip)
-                    if ipobj.is_global:
-                        candidates[ip] = min(candidates.get(ip, 99), 0)
-                    elif ipobj.is_private:  # ULA fc00::/7
-                        candidates[ip] = min(candidates.get(ip, 99), 1)
-                    elif ip.startswith("fe80:"):  # link-local
-                        candidates[ip] = min(candidates.get(ip, 99), 2)
-    except Exception:
-        pass
+        sock.connect(sockaddr)
+        loop.add_reader(sock.fileno(), on_readable)
+        try:
+            payload = b"vlabstools-ping\0" * 2
+            for seq in range(count):
+                if seq:
+                    await asyncio.sleep(interval)
+                # identifier do kernel gán (theo port của socket)
+                hdr = bytes((req_type, 0, 0, 0, 0, 0)) + seq.to_bytes(2, "big")
+                csum = _icmp_checksum(hdr + payload) if v4 else 0  # ICMPv6: kernel tự tính
+                pkt = hdr[:2] + csum.to_bytes(2, "big") + hdr[4:] + payload
+                sent[seq] = time.perf_counter()
+                try:
+                    sock.send(pkt)
+                except OSError:
+                    pass
+            try:
+                await asyncio.wait_for(all_in.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            loop.remove_reader(sock.fileno())
+    finally:
+        sock.close()
+    return rtts
 
-    # fallback: socket.getaddrinfo
-    if not candidates:
+async def _aping_tcp(host: str, family: int, sockaddr: tuple, count: int, interval: float,
+                     timeout: float, ports: Tuple[int, ...]) -> Tuple[int | None, List[float | None]]:
+    """
+    Lượt đầu thử song song mọi port, chọn port trả lời (open/closed) sớm nhất để dùng tiếp;
+    chưa port nào trả lời thì lượt sau lại thử tất cả.
+    """
+    port: int | None = None
+    rtts: List[float | None] = []
+    for seq in range(count):
+        if seq:
+            await asyncio.sleep(interval)
+        if port is not None:
+            r = await _aprobe(host, family, sockaddr, port, timeout)
+            rtts.append(r.rtt_ms if r.state != "filtered" else None)
+            continue
+        tasks = [asyncio.ensure_future(_aprobe(host, family, sockaddr, p, timeout)) for p in ports]
         try:
-            host = socket.gethostname()
-            infos = socket.getaddrinfo(host, None, socket.AF_INET6)
-            for _, _, _, _, sockaddr in infos:
-                ip = sockaddr[0]
-                if not _is_valid_ipv6(ip):
-                    continue
-                ip = ip.split("%")[0]
-                ipobj = ipaddress.ip_address(ip)
-                if ipobj.is_global:
-                    candidates[ip] = min(candidates.get(ip, 99), 0)
-                elif ipobj.is_private:
-                    candidates[ip] = min(candidates.get(ip, 99), 1)
-                elif ip.startswith("fe80:"):
-                    candidates[ip] = min(candidates.get(ip, 99), 2)
-        except Exception:
-            pass
+            for fut in asyncio.as_completed(tasks):
+                r = await fut
+                if r.state != "filtered":
+                    port = r.port
+                    rtts.append(r.rtt_ms)
+                    break
+            else:
+                rtts.append(None)
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    return port, rtts
 
-    if not candidates:
-        return None
-    # chọn ip có priority nhỏ nhất
-    return sorted(candidates.items(), key=lambda kv: kv[1])[0][0]
+async def _aping_one(host: str, count: int, interval: float, timeout: float, method: str,
+                     tcp_ports: Tuple[int, ...]) -> PingStats:
+    try:
+        family, sockaddr = await _resolve_target(host)
+    except (OSError, UnicodeError) as e:
+        return PingStats(host, None, method, (None,) * count, error=str(e) or "resolve failed")
+    addr = sockaddr[0]
+    if method in ("auto", "icmp") and _icmp_permitted(family):
+        rtts = await _aping_icmp(family, sockaddr, count, interval, timeout)
+        return PingStats(host, addr, "icmp", tuple(rtts))
+    if method == "icmp":
+        return PingStats(host, addr, "icmp", (None,) * count, error="ICMP socket không được phép")
+    port, rtts = await _aping_tcp(host, family, sockaddr, count, interval, timeout, tcp_ports)
+    return PingStats(host, addr, f"tcp:{port}" if port else "tcp", tuple(rtts))
 
-# --------- Ping / Traceroute ---------
-def ping_host(host: str) -> str:
-    exe = "ping.exe" if sys.platform.startswith("win") else "ping"
-    if shutil.which(exe) or shutil.which("ping"):
-        if sys.platform.startswith("win"):
-            return _run_cmd(["ping", "-n", "4", host])
+def _ping_metrics(st: PingStats, timeout: float) -> None:
+    """Mỗi gói ping 1 mẫu: RTT nếu có trả lời, gói mất ghi 'timeout' với thời gian = timeout."""
+    if st.error:
+        _METRICS.observe("ping", 0.0, "error", method=st.method)
+        return
+    method = st.method.split(":", 1)[0]
+    for r in st.rtts:
+        if r is None:
+            _METRICS.observe("ping", timeout * 1000, "timeout", method=method)
+        else:
+            _METRICS.observe("ping", r, "ok", method=method)
+
+async def aiter_ping(
+    hosts: Iterable[str],
+    count: int = 4,
+    interval: float = 0.2,
+    timeout: float = 1.0,
+    concurrency: int = 256,
+    method: str = "auto",
+    tcp_ports: Iterable[int] = _TCP_PING_PORTS,
+) -> AsyncIterator[PingStats]:
+    """Ping nhiều host song song; method: "auto" (ICMP nếu được, không thì TCP) | "icmp" | "tcp"."""
+    tcp_ports = tuple(tcp_ports) or _TCP_PING_PORTS
+    count = max(1, int(count))
+    async for st in _amap_unordered(
+        lambda h: _aping_one(h, count, interval, timeout, method, tcp_ports), hosts, concurrency
+    ):
+        _ping_metrics(st, timeout)
+        yield st
+
+def ping_many(
+    hosts: Iterable[str] | str,
+    count: int = 4,
+    interval: float = 0.2,
+    timeout: float = 1.0,
+    workers: int = 256,
+    method: str = "auto",
+) -> List[PingStats]:
+    """Bản đồng bộ của aiter_ping; nhận cùng cú pháp mục tiêu với port scan (CIDR/dải/danh sách)."""
+    targets = list(parse_targets(hosts))
+    got = {st.host: st for st in _iter_async(
+        lambda: aiter_ping(targets, count, interval, timeout, workers, method), want=workers)}
+    return [got[h] for h in targets if h in got]
+
+def _fmt_ms(v: float | None) -> str:
+    return "-" if v is None else f"{v:.2f}"
+
+def _render_ping(st: PingStats) -> str:
+    if st.error:
+        return f"PING {st.host}: {st.error}"
+    lines = [f"PING {st.host} ({st.addr}) qua {st.method}"]
+    for i, r in enumerate(st.rtts, 1):
+        lines.append(f"seq={i}  " + (f"time={r:.2f} ms" if r is not None else "timeout"))
+    lines.append(f"--- {st.host} ping statistics ---")
+    lines.append(f"{st.sent} sent, {st.received} received, {st.loss_pct:.0f}% loss")
+    if st.received:
+        lines.append("rtt min/avg/max/jitter = " + "/".join(
+            _fmt_ms(v) for v in (st.min_ms, st.avg_ms, st.max_ms, st.jitter_ms)) + " ms")
+    else:
+        lines.append("Không thể ping (ICMP bị chặn và không port TCP phổ biến nào trả lời).")
+    return "\n".join(lines)
+
+def ping_host(host: str, count: int = 4) -> str:
+    res = ping_many([host.strip()], count=count)
+    return _render_ping(res[0]) if res else f"PING {host}: host không hợp lệ"
+
+# ---- Path monitor kiểu mtr: UDP + IP_RECVERR (Linux, không cần root) ----
+# Mỗi TTL 1 socket UDP riêng gửi cùng lúc; ICMP Time Exceeded / Port Unreachable
+# được kernel đưa vào error queue của socket -> đọc bằng recvmsg(MSG_ERRQUEUE).
+_IP_RECVERR = getattr(socket, "IP_RECVERR", 11)
+_IPV6_RECVERR = getattr(socket, "IPV6_RECVERR", 25)
+_SO_EE_ORIGIN_ICMP, _SO_EE_ORIGIN_ICMP6 = 2, 3
+_TRACE_BASE_PORT = 33434
+
+def _recverr_supported() -> bool:
+    return sys.platform.startswith("linux") and hasattr(socket, "MSG_ERRQUEUE")
+
+def _parse_recverr(anc: list, v4: bool) -> Tuple[str | None, bool] | None:
+    """sock_extended_err -> (địa chỉ router/đích trả lời, đã tới đích?) hoặc None nếu không phải ICMP."""
+    want = (socket.SOL_IP, _IP_RECVERR) if v4 else (socket.IPPROTO_IPV6, _IPV6_RECVERR)
+    for level, ctype, data in anc:
+        if (level, ctype) != want or len(data) < 16:
+            continue
+        _errno, origin, etype, _code = struct.unpack_from("=IBBB", data)
+        if origin not in (_SO_EE_ORIGIN_ICMP, _SO_EE_ORIGIN_ICMP6):
+            return None
+        off, addr = data[16:], None
+        if len(off) >= 8 and struct.unpack_from("=H", off)[0] == socket.AF_INET:
+            addr = socket.inet_ntop(socket.AF_INET, off[4:8])
+        elif len(off) >= 24 and struct.unpack_from("=H", off)[0] == socket.AF_INET6:
+            addr = socket.inet_ntop(socket.AF_INET6, off[8:24])
+        # v4: 11 = Time Exceeded, 3 = Unreachable; v6: 3 = Time Exceeded, 1 = Unreachable
+        exceeded = 11 if v4 else 3
+        return addr, etype != exceeded
+    return None
+
+async def _aprobe_hop(family: int, sockaddr: tuple, ttl: int, timeout: float
+                      ) -> Tuple[str | None, float | None, bool]:
+    """1 probe UDP với TTL cho trước -> (địa chỉ trả lời, rtt ms, tới đích?)."""
+    loop = asyncio.get_running_loop()
+    v4 = family == socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    fut = loop.create_future()
+    start = 0.0
+
+    def on_error() -> None:
+        try:
+            _, anc, _, _ = sock.recvmsg(512, 1024, socket.MSG_ERRQUEUE)
+        except OSError:
+            return
+        got = _parse_recverr(anc, v4)
+        if got is not None:
+            _settle(fut, (got[0], (time.perf_counter() - start) * 1000.0, got[1]))
+
+    try:
+        if v4:
+            sock.setsockopt(socket.SOL_IP, socket.IP_TTL, ttl)
+            sock.setsockopt(socket.SOL_IP, _IP_RECVERR, 1)
         else:
-            return _run_cmd(["ping", "-c", "4", host])
-    # Fallback TCP ping
-    return _tcp_ping(host)
+            sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_UNICAST_HOPS, ttl)
+            sock.setsockopt(socket.IPPROTO_IPV6, _IPV6_RECVERR, 1)
+        sock.connect((sockaddr[0], _TRACE_BASE_PORT + ttl - 1) + tuple(sockaddr[2:]))
+        fd = sock.fileno()
+        loop.add_reader(fd, on_error)  # epoll báo EPOLLERR như sự kiện đọc
+        handle = loop.call_later(timeout, _settle, fut, (None, None, False))
+        try:
+            start = time.perf_counter()
+            sock.send(b"vlabstools-trace")
+            return await fut
+        finally:
+            handle.cancel()
+            loop.remove_reader(fd)
+    except OSError:
+        return None, None, False
+    finally:
+        sock.close()
+
+class PathHop(NamedTuple):
+    ttl: int
+    addr: str | None            # địa chỉ trả lời gần nhất
+    addrs: Tuple[str, ...]      # mọi địa chỉ đã thấy ở hop này (ECMP/đổi tuyến)
+    stats: PingStats            # thống kê trên cửa sổ mẫu gần nhất
+
+    def row(self) -> dict:
+        st = self.stats.row()
+        return {
+            "ttl": self.ttl, "host": self.addr or "*", "loss_pct": st["loss_pct"], "sent": st["sent"],
+            "avg_ms": st["avg_ms"], "best_ms": st["min_ms"], "worst_ms": st["max_ms"],
+            "jitter_ms": st["jitter_ms"], "other_addrs": ", ".join(a for a in self.addrs if a != self.addr),
+        }
+
+class _HopRing:
+    __slots__ = ("samples", "addrs", "last_addr")
+
+    def __init__(self, window: int):
+        self.samples: deque = deque(maxlen=window)  # rtt ms hoặc None (mất)
+        self.addrs: dict[str, None] = {}
+        self.last_addr: str | None = None
+
+class PathMonitor:
+    """
+    Theo dõi liên tục đường đi tới 1 host: mỗi lượt gửi probe cho mọi TTL song song,
+    cộng dồn vào ring buffer cố định 'window' mẫu mỗi hop (loss/latency kiểu mtr).
+    """
+
+    def __init__(self, host: str, max_hops: int = 30, timeout: float = 1.0, window: int = 100):
+        self.host = host
+        self.max_hops = max(1, min(int(max_hops), 64))
+        self.timeout = timeout
+        self.window = max(1, int(window))
+        self.addr: str | None = None
+        self.rounds = 0
+        self._target: Tuple[int, tuple] | None = None
+        self._hops: dict[int, _HopRing] = {}
+        self._path_len: int | None = None  # TTL nhỏ nhất tới được đích
+
+    async def around(self) -> List[PathHop]:
+        """Chạy 1 lượt probe (tất cả TTL cùng lúc) và trả snapshot các hop."""
+        if not _recverr_supported():
+            raise OSError("Path monitor cần Linux (IP_RECVERR/MSG_ERRQUEUE)")
+        if self._target is None:
+            self._target = await _resolve_target(self.host)
+            self.addr = self._target[1][0]
+        family, sockaddr = self._target
+        last = self._path_len or self.max_hops
+        gate = _gate()
+
+        async def hop(ttl: int) -> Tuple[str | None, float | None, bool]:
+            if gate is None:
+                return await _aprobe_hop(family, sockaddr, ttl, self.timeout)
+            await gate.acquire()
+            try:
+                return await _aprobe_hop(family, sockaddr, ttl, self.timeout)
+            finally:
+                gate.release()
 
-def traceroute_host(host: str) -> str:
+        res = await asyncio.gather(*(hop(ttl) for ttl in range(1, last + 1)))
+        reached = [ttl for ttl, (_, _, done) in enumerate(res, 1) if done]
+        if reached:
+            self._path_len = reached[0]  # tuyến ngắn lại -> cắt bớt hop thừa
+            for ttl in [t for t in self._hops if t > reached[0]]:
+                del self._hops[ttl]
+        for ttl, (addr, rtt, _) in enumerate(res[:self._path_len or last], 1):
+            ring = self._hops.get(ttl)
+            if ring is None:
+                ring = self._hops[ttl] = _HopRing(self.window)
+            ring.samples.append(rtt)
+            if addr:
+                ring.addrs[addr] = None
+                ring.last_addr = addr
+        self.rounds += 1
+        return self.hops()
+
+    def hops(self) -> List[PathHop]:
+        out = [
+            PathHop(ttl, r.last_addr, tuple(r.addrs),
+                    PingStats(r.last_addr or "*", r.last_addr, "udp", tuple(r.samples)))
+            for ttl, r in sorted(self._hops.items())
+        ]
+        if self._path_len is None:  # chưa tới đích: bỏ đuôi toàn '*'
+            while out and not out[-1].addrs:
+                out.pop()
+        return out
+
+async def aiter_path_monitor(
+    host: str,
+    rounds: int | None = 10,
+    interval: float = 1.0,
+    max_hops: int = 30,
+    timeout: float = 1.0,
+    window: int = 100,
+) -> AsyncIterator[List[PathHop]]:
+    """Yield snapshot hop sau mỗi lượt; rounds=None -> chạy tới khi bị đóng."""
+    mon = PathMonitor(host, max_hops, timeout, window)
+    n = 0
+    while rounds is None or n < rounds:
+        t0 = time.monotonic()
+        yield await mon.around()
+        n += 1
+        if rounds is None or n < rounds:
+            await asyncio.sleep(max(interval - (time.monotonic() - t0), 0))
+
+def iter_path_monitor(host: str, rounds: int | None = 10, interval: float = 1.0, max_hops: int = 30,
+                      timeout: float = 1.0, window: int = 100) -> Iterator[List[PathHop]]:
+    """Bản đồng bộ (dùng cho Streamlit): cập nhật bảng hop sau mỗi lượt."""
+    return _iter_async(lambda: aiter_path_monitor(host.strip(), rounds, interval, max_hops, timeout, window),
+                       want=max_hops)
+
+def _render_hop(h: PathHop) -> str:
+    st = h.stats
+    return (f"{h.ttl:>3}  {(h.addr or '*'):<40} {st.loss_pct:>6.1f} {st.sent:>5} "
+            f"{_fmt_ms(st.avg_ms):>8} {_fmt_ms(st.min_ms):>8} {_fmt_ms(st.max_ms):>8} "
+            f"{_fmt_ms(st.jitter_ms):>8}")
+
+def _render_path(host: str, hops: List[PathHop], rounds: int) -> str:
+    lines = [f"Đường tới {host}, {rounds} lượt",
+             f"{'#':>3}  {'Host':<40} {'Loss%':>6} {'Sent':>5} {'Avg':>8} {'Best':>8} {'Worst':>8} {'Jitter':>8}"]
+    lines.extend(_render_hop(h) for h in hops)
+    if not hops:
+        lines.append("Không hop nào trả lời (ICMP bị chặn trên đường đi).")
+    return "\n".join(lines)
+
+def traceroute_host(host: str, rounds: int = 3) -> str:
+    """Linux: path monitor trong tiến trình (không spawn process); nơi khác dùng lệnh hệ thống."""
+    if _recverr_supported():
+        hops: List[PathHop] = []
+        try:
+            for hops in iter_path_monitor(host, rounds=rounds, interval=0.2):
+                pass
+            return _render_path(host.strip(), hops, rounds)
+        except OSError:
+            pass
     if sys.platform.startswith("win"):
         if shutil.which("tracert") or shutil.which("tracert.exe"):
             return _run_cmd(["tracert", "-d", host])
@@ -182,108 +1027,1615 @@ def traceroute_host(host: str) -> str:
     return "Môi trường không có lệnh traceroute/tracert/tracepath (Cloud thường chặn)."
 
 # --------- SSL ---------
+def ssl_check(host: str, port: int = 443, timeout: float = 5.0) -> CertInfo:
+    """Handshake có verify (như trình duyệt) -> CertInfo; lỗi kết nối/verify nằm ở .error."""
+    with _METRICS.timed("ssl_check") as t:
+        try:
+            ctx = ssl.create_default_context()
+            with socket.create_connection((host, port), timeout=timeout) as sock:
+                with ctx.wrap_socket(sock, server_hostname=host) as ssock:
+                    cert = ssock.getpeercert()
+            return _cert_info(host, port, cert, verified=True)
+        except Exception as e:
+            t.outcome = _ssl_outcome(e)
+            return CertInfo(host, port, error=str(e))
+
+def _render_cert(info: CertInfo) -> str:
+    if info.error and not info.verified:
+        return f"Lỗi kiểm tra SSL: {info.error}"
+    return "\n".join([
+        f"Subject: {info.subject}",
+        f"Issuer: {info.issuer}",
+        f"Valid from: {info.not_before}",
+        f"Valid until: {info.not_after}",
+    ])
+
 def check_ssl(host: str, port: int = 443) -> str:
+    return _render_cert(ssl_check(host, port))
+
+# ---- Bulk: kiểm kê chứng chỉ TLS ----
+class CertInfo(NamedTuple):
+    host: str
+    port: int
+    subject: str | None = None
+    issuer: str | None = None
+    sans: Tuple[str, ...] = ()
+    not_before: str | None = None
+    not_after: str | None = None
+    days_left: int | None = None
+    verified: bool = False
+    error: str | None = None       # lỗi kết nối/handshake, hoặc lý do không verify được
+
+_CERT_CACHE = _TTLCache(maxsize=4096)
+
+def parse_endpoints(text: str | Iterable[str], default_port: int = 443) -> List[Tuple[str, int]]:
+    """
+    'host', 'host:port', '[v6]:port', 'https://host:port/path' -> [(host, port)], bỏ trùng.
+    Phân cách bằng xuống dòng / dấu phẩy / khoảng trắng; '#' là chú thích.
+    """
+    lines = text.splitlines() if isinstance(text, str) else list(text)
+    out: dict[Tuple[str, int], None] = {}
+    for line in lines:
+        for tok in line.split("#", 1)[0].replace(",", " ").split():
+            if "://" in tok:
+                tok = tok.split("://", 1)[1]
+            tok = tok.split("/", 1)[0]
+            host, port = tok, default_port
+            if tok.startswith("["):
+                host, _, rest = tok[1:].partition("]")
+                if rest.startswith(":") and rest[1:].isdigit():
+                    port = int(rest[1:])
+            elif tok.count(":") == 1:
+                h, p = tok.split(":")
+                if not p.isdigit():
+                    continue
+                host, port = h, int(p)
+            if host and 1 <= port <= 65535:
+                out.setdefault((host.lower(), port), None)
+    return list(out)
+
+# Giải mã DER tối thiểu (chỉ các trường CertInfo cần), không cần temp file hay thư viện ngoài
+_X509_NAMES = {
+    "2.5.4.3": "commonName", "2.5.4.5": "serialNumber", "2.5.4.6": "countryName",
+    "2.5.4.7": "localityName", "2.5.4.8": "stateOrProvinceName", "2.5.4.9": "streetAddress",
+    "2.5.4.10": "organizationName", "2.5.4.11": "organizationalUnitName", "2.5.4.15": "businessCategory",
+    "2.5.4.4": "surname", "2.5.4.42": "givenName", "2.5.4.97": "organizationIdentifier",
+    "1.2.840.113549.1.9.1": "emailAddress", "0.9.2342.19200300.100.1.25": "domainComponent",
+    "1.3.6.1.4.1.311.60.2.1.3": "jurisdictionCountryName",
+}
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+def _der_tlv(buf: bytes, i: int) -> Tuple[int, int, int]:
+    """(tag, đầu nội dung, cuối nội dung) của phần tử DER tại i."""
+    tag, n = buf[i], buf[i + 1]
+    i += 2
+    if n & 0x80:
+        k = n & 0x7F
+        n = int.from_bytes(buf[i:i + k], "big")
+        i += k
+    if i + n > len(buf):
+        raise ValueError("DER bị cắt cụt")
+    return tag, i, i + n
+
+def _der_items(buf: bytes, start: int, end: int) -> List[Tuple[int, int, int]]:
+    out = []
+    while start < end:
+        item = _der_tlv(buf, start)
+        out.append(item)
+        start = item[2]
+    return out
+
+def _der_oid(b: bytes) -> str:
+    parts, v = [], 0
+    for byte in b[1:]:
+        v = (v << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            parts.append(v)
+            v = 0
+    return ".".join(map(str, [b[0] // 40, b[0] % 40] + parts))
+
+def _der_str(tag: int, b: bytes) -> str:
+    if tag == 0x1E:                              # BMPString
+        return b.decode("utf-16-be", errors="replace")
+    return b.decode("utf-8" if tag == 0x0C else "latin-1", errors="replace")
+
+def _der_name(buf: bytes, start: int, end: int) -> tuple:
+    """Name -> ((('commonName', 'x'),), ...) như getpeercert()."""
+    rdns = []
+    for _, s, e in _der_items(buf, start, end):            # SET
+        attrs = []
+        for _, s2, e2 in _der_items(buf, s, e):            # SEQ { OID, value }
+            (_, os_, oe), (vt, vs, ve) = _der_items(buf, s2, e2)[:2]
+            oid = _der_oid(buf[os_:oe])
+            attrs.append((_X509_NAMES.get(oid, oid), _der_str(vt, buf[vs:ve])))
+        rdns.append(tuple(attrs))
+    return tuple(rdns)
+
+def _der_time(tag: int, b: bytes) -> str:
+    """UTCTime/GeneralizedTime -> 'Jan  5 12:00:00 2030 GMT' (định dạng của getpeercert)."""
+    t = b.decode("ascii").rstrip("Z")
+    if tag == 0x17:                              # UTCTime: YY < 50 -> 20YY (RFC 5280)
+        yy = int(t[:2])
+        t = f"{2000 + yy if yy < 50 else 1900 + yy}{t[2:]}"
+    year, mon, day, hh, mm, ss = int(t[:4]), int(t[4:6]), int(t[6:8]), t[8:10], t[10:12], t[12:14] or "00"
+    return f"{_MONTHS[mon - 1]} {day:2d} {hh}:{mm}:{ss} {year} GMT"
+
+def _parse_der_cert(der: bytes) -> dict:
+    _, cs, ce = _der_tlv(der, 0)
+    _, ts, te = _der_items(der, cs, ce)[0]                 # tbsCertificate
+    fields = _der_items(der, ts, te)
+    if fields[0][0] == 0xA0:                               # [0] version
+        fields = fields[1:]
+    # serial, signature, issuer, validity, subject, spki, [1], [2], [3] extensions
+    out: dict = {"issuer": _der_name(der, fields[2][1], fields[2][2]),
+                 "subject": _der_name(der, fields[4][1], fields[4][2])}
+    (t1, s1, e1), (t2, s2, e2) = _der_items(der, fields[3][1], fields[3][2])
+    out["notBefore"], out["notAfter"] = _der_time(t1, der[s1:e1]), _der_time(t2, der[s2:e2])
+    for tag, s, e in fields[6:]:
+        if tag != 0xA3:
+            continue
+        _, xs, xe = _der_tlv(der, s)                       # SEQ of Extension
+        for _, es, ee in _der_items(der, xs, xe):
+            parts = _der_items(der, es, ee)
+            if _der_oid(der[parts[0][1]:parts[0][2]]) != "2.5.29.17":   # subjectAltName
+                continue
+            _, os_, oe = parts[-1]                         # OCTET STRING { SEQ of GeneralName }
+            _, gs, ge = _der_tlv(der, os_)
+            sans = []
+            for gt, vs, ve in _der_items(der, gs, ge):
+                if gt == 0x81:
+                    sans.append(("email", der[vs:ve].decode("latin-1")))
+                elif gt == 0x82:
+                    sans.append(("DNS", der[vs:ve].decode("latin-1")))
+                elif gt == 0x87 and ve - vs == 4:
+                    sans.append(("IP Address", str(ipaddress.ip_address(der[vs:ve]))))
+                elif gt == 0x87 and ve - vs == 16:           # như getpeercert: 8 nhóm hex hoa, không rút gọn
+                    sans.append(("IP Address", ":".join(f"{int.from_bytes(der[j:j + 2], 'big'):X}"
+                                                        for j in range(vs, ve, 2))))
+            out["subjectAltName"] = tuple(sans)
+    return out
+
+def _decode_der_cert(der: bytes) -> dict:
+    """
+    Giải mã chứng chỉ DER sang dict kiểu getpeercert() (dùng khi handshake không verify).
+    Dùng bộ giải mã DER ở trên; nếu nó không đọc được (chứng chỉ lạ) mới thử hook nội bộ
+    ssl._ssl._test_decode_cert của CPython (API test, không đảm bảo có; cần temp file).
+    Trả {} nếu không giải mã được -> CertInfo chỉ có lỗi.
+    """
     try:
-        ctx = ssl.create_default_context()
-        with socket.create_connection((host, port), timeout=5) as sock:
-            with ctx.wrap_socket(sock, server_hostname=host) as ssock:
-                cert = ssock.getpeercert()
-        subj = dict(x[0] for x in cert.get("subject", []))
-        issuer = dict(x[0] for x in cert.get("issuer", []))
-        not_before = cert.get("notBefore")
-        not_after = cert.get("notAfter")
-        res = [
-            f"Subject: {subj.get('commonName', subj)}",
-            f"Issuer: {issuer.get('commonName', issuer)}",
-            f"Valid from: {not_before}",
-            f"Valid until: {not_after}",
-        ]
-        return "\n".join(res)
-    except Exception as e:
-        return f"Lỗi kiểm tra SSL: {e}"
+        return _parse_der_cert(der)
+    except (ValueError, IndexError, UnicodeDecodeError):
+        pass
+    decode = getattr(ssl._ssl, "_test_decode_cert", None)
+    if decode is None:
+        return {}
+    import tempfile
+    fd, path = tempfile.mkstemp(suffix=".pem")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(ssl.DER_cert_to_PEM_cert(der))
+        return decode(path)
+    except Exception:
+        return {}
+    finally:
+        os.unlink(path)
+
+def _cert_info(host: str, port: int, cert: dict, verified: bool, error: str | None = None) -> CertInfo:
+    subj = dict(x[0] for x in cert.get("subject", []))
+    issuer = dict(x[0] for x in cert.get("issuer", []))
+    not_after = cert.get("notAfter")
+    days_left = None
+    if not_after:
+        days_left = int((ssl.cert_time_to_seconds(not_after) - time.time()) // 86400)
+    return CertInfo(
+        host, port,
+        subject=subj.get("commonName") or (str(subj) if subj else None),
+        issuer=issuer.get("commonName") or issuer.get("organizationName") or (str(issuer) if issuer else None),
+        sans=tuple(v for k, v in cert.get("subjectAltName", ()) if k in ("DNS", "IP Address")),
+        not_before=cert.get("notBefore"),
+        not_after=not_after,
+        days_left=days_left,
+        verified=verified,
+        error=error,
+    )
+
+def _ssl_outcome(e: BaseException) -> str:
+    if isinstance(e, ssl.SSLCertVerificationError):
+        return "unverified"
+    return "timeout" if isinstance(e, (TimeoutError, asyncio.TimeoutError)) else "error"
+
+async def _afetch_cert(host: str, port: int, timeout: float) -> CertInfo:
+    with _METRICS.timed("ssl_check") as t:
+        info = await _afetch_cert_once(host, port, timeout)
+        if info.error:
+            t.outcome = ("unverified" if info.not_after else
+                         "timeout" if info.error == "Timeout" else "error")
+        return info
+
+async def _afetch_cert_once(host: str, port: int, timeout: float) -> CertInfo:
+    """Handshake có verify; nếu chứng chỉ không hợp lệ (self-signed, hết hạn...) thì handshake lại không verify để vẫn đọc được thông tin."""
+    async def _handshake(ctx: ssl.SSLContext) -> Tuple[dict, bytes]:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=ctx, server_hostname=host), timeout)
+        try:
+            so = writer.get_extra_info("ssl_object")
+            return so.getpeercert() or {}, so.getpeercert(binary_form=True) or b""
+        finally:
+            writer.close()
 
-# --------- DNS ---------
-def dns_lookup(host: str) -> str:
-    lines = []
-    # A/AAAA bằng socket
     try:
-        infos = socket.getaddrinfo(host, None)
-        addrs = sorted({i[4][0] for i in infos})
-        lines.append("Địa chỉ:")
-        for a in addrs:
-            lines.append(f"  - {a}")
-    except Exception as e:
-        lines.append(f"Lỗi DNS (socket): {e}")
+        cert, _ = await _handshake(ssl.create_default_context())
+        return _cert_info(host, port, cert, verified=True)
+    except ssl.SSLCertVerificationError as e:
+        reason = e.verify_message or str(e)
+    except asyncio.TimeoutError:
+        return CertInfo(host, port, error="Timeout")
+    except (OSError, ssl.SSLError) as e:
+        return CertInfo(host, port, error=str(e) or e.__class__.__name__)
 
-    # Nếu có dnspython, tra cứu thêm bản ghi
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
     try:
-        import dns.resolver
-        for rtype in ["A", "AAAA", "MX", "NS", "TXT", "CNAME"]:
-            try:
-                answers = dns.resolver.resolve(host, rtype)
-                vals = [str(rdata).strip() for rdata in answers]
-                lines.append(f"{rtype}: " + ", ".join(vals))
-            except Exception:
-                pass
+        _, der = await _handshake(ctx)
+    except asyncio.TimeoutError:
+        return CertInfo(host, port, error="Timeout")
+    except (OSError, ssl.SSLError) as e:
+        return CertInfo(host, port, error=str(e) or e.__class__.__name__)
+    return _cert_info(host, port, _decode_der_cert(der), verified=False, error=f"Không verify được: {reason}")
+
+async def aiter_ssl_inventory(
+    endpoints: Iterable[Tuple[str, int]],
+    concurrency: int = 100,
+    timeout: float = 5.0,
+    cache_ttl: float = 300.0,
+) -> AsyncIterator[CertInfo]:
+    """Handshake song song tới nhiều (host, port); kết quả thành công được cache cache_ttl giây."""
+    async def one(ep: Tuple[str, int]) -> CertInfo:
+        hit = _CERT_CACHE.get(ep)
+        if hit is not None:
+            return hit
+        info = await _afetch_cert(ep[0], ep[1], timeout)
+        if info.not_after:
+            _CERT_CACHE.set(ep, info, cache_ttl)
+        return info
+
+    agen = _amap_unordered(one, dict.fromkeys(endpoints), concurrency)
+    try:
+        async for info in agen:
+            yield info
+    finally:
+        await agen.aclose()
+
+def _expiry_key(c: CertInfo) -> Tuple[int, int]:
+    return (0, c.days_left) if c.days_left is not None else (1, 0)
+
+def ssl_inventory(
+    endpoints: str | Iterable[Tuple[str, int]],
+    workers: int = 100,
+    timeout: float = 5.0,
+    cache_ttl: float = 300.0,
+    progress_cb: Callable[[int, int], None] | None = None,
+) -> List[CertInfo]:
+    """
+    Kiểm kê chứng chỉ hàng loạt. 'endpoints' là chuỗi (xem parse_endpoints) hoặc list (host, port).
+    Trả về CertInfo sắp theo số ngày còn lại (sắp hết hạn trước, lỗi ở cuối).
+    """
+    eps = parse_endpoints(endpoints) if isinstance(endpoints, str) else list(dict.fromkeys(endpoints))
+    channel = ProgressChannel(len(eps), progress_cb=progress_cb)
+    out: List[CertInfo] = []
+    for info in _iter_async(lambda: aiter_ssl_inventory(eps, workers, timeout, cache_ttl), want=workers):
+        out.append(info)
+        channel.update()
+    channel.close()
+    out.sort(key=_expiry_key)
+    return out
+
+# --------- DNS ---------
+_DNS_RTYPES = ("A", "AAAA", "MX", "NS", "TXT", "CNAME")
+_DNS_CACHE = _TTLCache(maxsize=4096)
+_METRICS.gauge("cache_entries", lambda: {(("cache", "dns"),): len(_DNS_CACHE), (("cache", "cert"),): len(_CERT_CACHE)},
+               "Số mục trong cache TTL trong tiến trình.")
+_DNS_NEG_TTL = 60.0        # NXDOMAIN / không có bản ghi
+_DNS_MAX_TTL = 3600.0
+_ADDRINFO_TTL = 60.0       # getaddrinfo không trả TTL
+
+_NXDOMAIN = object()        # đánh dấu NXDOMAIN trong cache
+
+def _dns_key(host: str) -> str:
+    return host.strip().rstrip(".").lower()
+
+def _answer_ttl(answers) -> float:
+    ttl = answers.rrset.ttl if answers.rrset is not None else _DNS_NEG_TTL
+    return min(max(ttl, 1), _DNS_MAX_TTL)
+
+def _cached_addrinfo(host: str) -> List[str]:
+    key = ("addrinfo", _dns_key(host))
+    hit = _DNS_CACHE.get(key)
+    if hit is not None:
+        return hit
+    addrs = sorted({i[4][0] for i in socket.getaddrinfo(host, None)})
+    _DNS_CACHE.set(key, addrs, _ADDRINFO_TTL)
+    return addrs
+
+def _cached_rr(host: str, rtype: str) -> List[str]:
+    """Tra 1 loại bản ghi bằng dnspython; cache theo TTL của RRset (phủ định: _DNS_NEG_TTL)."""
+    import dns.resolver
+    key = (rtype, _dns_key(host), None)
+    hit = _DNS_CACHE.get(key)
+    if hit is not None:
+        _METRICS.inc("dns_cache", result="hit")
+        return [] if hit is _NXDOMAIN else hit
+    _METRICS.inc("dns_cache", result="miss")
+    with _METRICS.timed("dns_query", server="system") as t:
+        try:
+            answers = dns.resolver.resolve(host, rtype)
+        except dns.resolver.NXDOMAIN:
+            t.outcome = "nxdomain"
+            _DNS_CACHE.set(key, _NXDOMAIN, _DNS_NEG_TTL)
+            return []
+        except dns.resolver.NoAnswer:
+            t.outcome = "nodata"
+            _DNS_CACHE.set(key, [], _DNS_NEG_TTL)
+            return []
+        except dns.exception.Timeout:
+            t.outcome = "timeout"
+            raise
+    vals = [str(rdata).strip() for rdata in answers]
+    _DNS_CACHE.set(key, vals, _answer_ttl(answers))
+    return vals
+
+class DnsRecord(NamedTuple):
+    name: str
+    rtype: str
+    value: str
+
+class DnsResult(NamedTuple):
+    name: str
+    status: str                          # OK | NXDOMAIN | NODATA | Lỗi: ...
+    rtypes: Tuple[str, ...] = ()         # loại đã hỏi qua dnspython (rỗng = không có dnspython)
+    records: Tuple[DnsRecord, ...] = ()
+    addresses: Tuple[str, ...] = ()      # getaddrinfo của hệ điều hành (dns_lookup)
+    ms: float | None = None
+    error: str | None = None             # lỗi phân giải qua socket
+
+    def values(self, rtype: str) -> Tuple[str, ...]:
+        return tuple(r.value for r in self.records if r.rtype == rtype)
+
+    def row(self) -> dict:
+        out: dict = {"name": self.name}
+        for rt in self.rtypes or ("A", "AAAA"):
+            out[rt] = ", ".join(self.values(rt))
+        out["status"] = self.status
+        out["ms"] = self.ms
+        return out
+
+def _dns_status(records: Iterable[DnsRecord], nx: bool, errors: List[str]) -> str:
+    if nx:
+        return "NXDOMAIN"
+    if errors:
+        return "Lỗi: " + "; ".join(errors)
+    return "OK" if any(True for _ in records) else "NODATA"
+
+def dns_query(host: str) -> DnsResult:
+    """
+    A/AAAA qua socket + các bản ghi A/AAAA/MX/NS/TXT/CNAME qua dnspython,
+    tất cả gửi song song; kết quả cache theo TTL nên tra lại sẽ trả ngay.
+    """
+    start = time.perf_counter()
+    pool = _io_pool()
+    fut_addr = pool.submit(_cached_addrinfo, host)
+    try:
+        import dns.resolver  # noqa: F401
+        futs = [(rtype, pool.submit(_cached_rr, host, rtype)) for rtype in _DNS_RTYPES]
     except Exception:
+        futs = []
+
+    addrs: Tuple[str, ...] = ()
+    error = None
+    try:
+        addrs = tuple(fut_addr.result())
+    except Exception as e:
+        error = str(e)
+    records: List[DnsRecord] = []
+    errors: List[str] = []
+    for rtype, fut in futs:
+        try:
+            records.extend(DnsRecord(host, rtype, v) for v in fut.result())
+        except Exception as e:
+            errors.append(f"{rtype}: {e.__class__.__name__}")
+    if records or addrs:
+        status = "OK"
+    elif error or errors:
+        status = "Lỗi: " + "; ".join(([error] if error else []) + errors)
+    else:
+        status = "NODATA"
+    ms = (time.perf_counter() - start) * 1000.0
+    _METRICS.observe("dns_lookup", ms, "ok" if status == "OK" else "nodata" if status == "NODATA" else "error")
+    return DnsResult(host, status, tuple(r for r, _ in futs), tuple(records), addrs, round(ms, 1), error)
+
+def _render_dns(res: DnsResult) -> str:
+    lines = []
+    if res.error is None:
+        lines.append("Địa chỉ:")
+        lines.extend(f"  - {a}" for a in res.addresses)
+    else:
+        lines.append(f"Lỗi DNS (socket): {res.error}")
+    if not res.rtypes:
         lines.append("(Gợi ý: cài 'dnspython' để xem MX/NS/TXT chi tiết)")
+    for rtype in res.rtypes:
+        vals = res.values(rtype)
+        if vals:
+            lines.append(f"{rtype}: " + ", ".join(vals))
     return "\n".join(lines)
 
+def dns_lookup(host: str) -> str:
+    return _render_dns(dns_query(host))
+
+# ---- Bulk DNS ----
+def read_names(text: str) -> List[str]:
+    """Tách danh sách hostname dán/tải lên (mỗi dòng, dấu phẩy, khoảng trắng; '#' là chú thích). Bỏ trùng."""
+    seen: dict[str, None] = {}
+    for line in (text or "").splitlines():
+        line = line.split("#", 1)[0]
+        for tok in line.replace(",", " ").replace(";", " ").split():
+            seen.setdefault(_dns_key(tok), None)
+    seen.pop("", None)
+    return list(seen)
+
+def _make_async_resolver(nameservers: List[str] | None, port: int, timeout: float):
+    import dns.asyncresolver
+    if nameservers:
+        r = dns.asyncresolver.Resolver(configure=False)
+        r.nameservers = list(nameservers)
+        r.port = port
+    else:
+        r = dns.asyncresolver.Resolver()
+    r.lifetime = timeout
+    return r
+
+async def _aresolve_rr(resolver, name: str, rtype: str, tag) -> List[str] | object:
+    """Như _cached_rr nhưng async; trả _NXDOMAIN nếu tên không tồn tại."""
+    import dns.resolver
+    key = (rtype, name, tag)
+    hit = _DNS_CACHE.get(key)
+    if hit is not None:
+        _METRICS.inc("dns_cache", result="hit")
+        return hit
+    _METRICS.inc("dns_cache", result="miss")
+    with _METRICS.timed("dns_query", server=",".join(tag[0]) if tag else "system") as t:
+        try:
+            answers = await resolver.resolve(name, rtype)
+        except dns.resolver.NXDOMAIN:
+            t.outcome = "nxdomain"
+            _DNS_CACHE.set(key, _NXDOMAIN, _DNS_NEG_TTL)
+            return _NXDOMAIN
+        except dns.resolver.NoAnswer:
+            t.outcome = "nodata"
+            _DNS_CACHE.set(key, [], _DNS_NEG_TTL)
+            return []
+        except dns.exception.Timeout:
+            t.outcome = "timeout"
+            raise
+    vals = [str(rdata).strip() for rdata in answers]
+    _DNS_CACHE.set(key, vals, _answer_ttl(answers))
+    return vals
+
+async def aiter_bulk_dns(
+    names: Iterable[str],
+    rtypes: Iterable[str] = ("A", "AAAA"),
+    concurrency: int = 200,
+    nameservers: List[str] | None = None,
+    port: int = 53,
+    timeout: float = 5.0,
+) -> AsyncIterator[DnsResult]:
+    """
+    Phân giải hàng loạt: 'concurrency' coroutine kéo tên từ 1 iterator chung, mỗi tên
+    hỏi các loại bản ghi song song (dùng chung cache TTL với dns_lookup).
+    Yield DnsResult theo thứ tự hoàn thành (row() -> {name, <rtype>..., status, ms}).
+    """
+    rtypes = [r.upper() for r in rtypes]
+    try:
+        resolver = _make_async_resolver(nameservers, port, timeout)
+        tag = (tuple(nameservers), port) if nameservers else None
+    except ImportError:
+        resolver = tag = None  # không có dnspython -> chỉ A/AAAA qua getaddrinfo
+    loop = asyncio.get_running_loop()
+
+    async def one(name: str) -> DnsResult:
+        start = time.perf_counter()
+        records: List[DnsRecord] = []
+        errors: List[str] = []
+        nx = False
+        if resolver is None:
+            try:
+                infos = await loop.getaddrinfo(name, None, type=socket.SOCK_STREAM)
+                for a in sorted({i[4][0] for i in infos}):
+                    records.append(DnsRecord(name, "AAAA" if ":" in a else "A", a))
+            except OSError as e:
+                errors.append(str(e))
+            queried: Tuple[str, ...] = ("A", "AAAA")
+        else:
+            outs = await asyncio.gather(*(_aresolve_rr(resolver, name, rt, tag) for rt in rtypes),
+                                        return_exceptions=True)
+            for rt, out in zip(rtypes, outs):
+                if out is _NXDOMAIN:
+                    nx = True
+                elif isinstance(out, BaseException):
+                    errors.append(f"{rt}: {out.__class__.__name__}")
+                else:
+                    records.extend(DnsRecord(name, rt, v) for v in out)
+            queried = tuple(rtypes)
+        return DnsResult(name, _dns_status(records, nx, errors), queried, tuple(records),
+                         ms=round((time.perf_counter() - start) * 1000.0, 1))
+
+    unique = dict.fromkeys(_dns_key(n) for n in names if n and n.strip())
+    agen = _amap_unordered(one, unique, concurrency)
+    try:
+        async for row in agen:
+            yield row
+    finally:
+        await agen.aclose()
+
+def iter_bulk_dns(
+    names: Iterable[str],
+    rtypes: Iterable[str] = ("A", "AAAA"),
+    workers: int = 200,
+    nameservers: List[str] | None = None,
+    port: int = 53,
+    timeout: float = 5.0,
+) -> Iterator[DnsResult]:
+    """Bản đồng bộ của aiter_bulk_dns (chạy trên event loop nền, yield từng DnsResult khi xong)."""
+    names = list(names)
+    return _iter_async(lambda: aiter_bulk_dns(names, rtypes, workers, nameservers, port, timeout),
+                       want=workers)
+
 # --------- WHOIS ---------
-def whois_query(domain: str) -> str:
+_WHOIS_FIELDS = ["domain_name", "registrar", "creation_date", "expiration_date", "name_servers", "status"]
+_WHOIS_TTL = 7 * 86400.0           # dữ liệu WHOIS hiếm khi đổi
+_WHOIS_MIN_INTERVAL = 2.0          # giãn cách giữa 2 request tới cùng 1 server WHOIS
+
+class _WhoisStore:
+    """Cache WHOIS trên SQLite (domain là PRIMARY KEY), dùng chung giữa các session/tiến trình."""
+
+    def __init__(self, path: Path):
+        import sqlite3
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=10)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS whois ("
+                " domain TEXT PRIMARY KEY, fetched REAL NOT NULL, expires REAL NOT NULL, data TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS whois_expires ON whois(expires)")
+
+    def get(self, domain: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM whois WHERE domain = ? AND expires > ?", (domain, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, domain: str, data: dict, ttl: float) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO whois(domain, fetched, expires, data) VALUES (?, ?, ?, ?)",
+                (domain, now, now + ttl, json.dumps(data, ensure_ascii=False)),
+            )
+
+    def purge(self) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM whois WHERE expires <= ?", (time.time(),)).rowcount
+
+_WHOIS_STORE: _WhoisStore | None = None
+_WHOIS_STORE_FAILED = False
+_WHOIS_STORE_LOCK = threading.Lock()
+
+def _whois_store() -> _WhoisStore | None:
+    """Store dùng chung; None nếu không mở được (thư mục cache không ghi được...) -> chỉ hỏi live."""
+    global _WHOIS_STORE, _WHOIS_STORE_FAILED
+    with _WHOIS_STORE_LOCK:
+        if _WHOIS_STORE is None and not _WHOIS_STORE_FAILED:
+            try:
+                _WHOIS_STORE = _WhoisStore(cache_dir() / "whois.sqlite3")
+            except Exception as e:
+                _WHOIS_STORE_FAILED = True   # log 1 lần, không thử lại mỗi lần tra
+                logging.getLogger(__name__).warning("WHOIS cache disabled: %s", e)
+        return _WHOIS_STORE
+
+def _whois_cache_get(domain: str) -> dict | None:
+    store = _whois_store()
+    if store is None:
+        return None
+    try:
+        return store.get(domain)
+    except Exception:   # DB bị khoá/hỏng: coi như miss
+        return None
+
+def _whois_cache_put(domain: str, data: dict, ttl: float) -> None:
+    store = _whois_store()
+    if store is not None:
+        try:
+            store.put(domain, data, ttl)
+        except Exception:
+            pass
+
+# Pool riêng cho WHOIS: runner giữ thread suốt 1 nhóm TLD (kèm sleep giãn cách) -> nếu dùng
+# chung _io_pool sẽ chặn DNS / IP public. Bị giới hạn: job bulk dư sẽ xếp hàng tại đây.
+_WHOIS_POOL_SIZE = 8
+_WHOIS_POOL: ThreadPoolExecutor | None = None
+
+def _whois_pool() -> ThreadPoolExecutor:
+    global _WHOIS_POOL
+    with _WHOIS_STORE_LOCK:
+        if _WHOIS_POOL is None:
+            _WHOIS_POOL = ThreadPoolExecutor(max_workers=_WHOIS_POOL_SIZE, thread_name_prefix="vlabs-whois")
+        return _WHOIS_POOL
+
+class _ServerThrottle:
+    """
+    Giới hạn theo server: mỗi key tối đa 1 request đang chạy và cách request trước
+    ít nhất min_interval giây (tính từ lúc xong); các key khác nhau chạy song song.
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._locks: dict[str, threading.Lock] = {}
+        self._next: dict[str, float] = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def slot(self, key: str):
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            delay = self._next.get(key, 0.0) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                yield
+            finally:
+                self._next[key] = time.monotonic() + self.min_interval
+
+_WHOIS_THROTTLE = _ServerThrottle(_WHOIS_MIN_INTERVAL)
+
+def _whois_server_key(domain: str) -> str:
+    # python-whois hỏi registry theo TLD trước -> dùng TLD làm khoá giới hạn tốc độ
+    return domain.rsplit(".", 1)[-1]
+
+def _whois_value(v):
+    if isinstance(v, (list, tuple, set)):
+        return [_whois_value(x) for x in v]
+    if v is None or isinstance(v, (str, int, float, bool)):
+        return v
+    return str(v)  # datetime -> 'YYYY-MM-DD HH:MM:SS'
+
+def _whois_record(domain: str, ttl: float = _WHOIS_TTL, refresh: bool = False) -> Tuple[dict, bool]:
+    """Trả (record, from_cache). Chỉ cache kết quả thành công; lỗi được raise lên."""
+    domain = _dns_key(domain)
+    if not refresh:
+        hit = _whois_cache_get(domain)
+        if hit is not None:
+            _METRICS.inc("whois_cache", result="hit")
+            return hit, True
+        _METRICS.inc("whois_cache", result="miss")
+    import whois
+    server = _whois_server_key(domain)
+    t0 = time.perf_counter()
+    with _WHOIS_THROTTLE.slot(server):
+        # thời gian chờ lượt theo server: cao -> đang bị giới hạn tốc độ / hàng đợi dài
+        _METRICS.observe("whois_wait", (time.perf_counter() - t0) * 1000, server=server)
+        with _METRICS.timed("whois", server=server):
+            w = whois.whois(domain)
+    data = {k: _whois_value(w.get(k)) for k in _WHOIS_FIELDS}
+    _whois_cache_put(domain, data, ttl)
+    return data, False
+
+class WhoisInfo(NamedTuple):
+    domain: str
+    # registry có thể trả nhiều giá trị -> tuple; 1 giá trị -> str
+    domain_name: str | Tuple[str, ...] | None = None
+    registrar: str | Tuple[str, ...] | None = None
+    creation_date: str | Tuple[str, ...] | None = None
+    expiration_date: str | Tuple[str, ...] | None = None
+    name_servers: str | Tuple[str, ...] | None = None
+    status: str | Tuple[str, ...] | None = None
+    source: str = "live"           # "cache" | "live"
+    error: str | None = None
+
+def _whois_info(domain: str, data: dict | None, source: str, error: str | None = None) -> WhoisInfo:
+    vals = {k: tuple(map(str, v)) if isinstance(v, list) else v for k, v in (data or {}).items()
+            if k in _WHOIS_FIELDS}
+    return WhoisInfo(domain, **vals, source=source, error=error)
+
+def whois_info(domain: str, ttl: float = _WHOIS_TTL, refresh: bool = False) -> WhoisInfo:
+    """WHOIS 1 domain; kết quả lưu cache SQLite 'ttl' giây (refresh=True để bỏ qua cache)."""
     try:
-        import whois
-        w = whois.whois(domain)
-        parts = []
-        for k in ["domain_name", "registrar", "creation_date", "expiration_date", "name_servers", "status"]:
-            v = w.get(k)
-            parts.append(f"{k}: {v}")
-        return "\n".join(parts)
+        data, cached = _whois_record(domain, ttl, refresh)
+        return _whois_info(_dns_key(domain), data, "cache" if cached else "live")
     except Exception as e:
-        return f"Erro WHOIS (setup package 'python-whois'): {e}"
+        return _whois_info(_dns_key(domain), None, "live", str(e))
+
+def _render_whois(info: WhoisInfo) -> str:
+    if info.error:
+        return f"Erro WHOIS (setup package 'python-whois'): {info.error}"
+    parts = []
+    for k in _WHOIS_FIELDS:
+        v = getattr(info, k)
+        if isinstance(v, tuple):
+            v = ", ".join(v)
+        parts.append(f"{k}: {v}")
+    return "\n".join(parts)
+
+def whois_query(domain: str, ttl: float = _WHOIS_TTL, refresh: bool = False) -> str:
+    return _render_whois(whois_info(domain, ttl, refresh))
+
+def iter_bulk_whois(
+    domains: Iterable[str],
+    workers: int = 8,
+    ttl: float = _WHOIS_TTL,
+    refresh: bool = False,
+) -> Iterator[WhoisInfo]:
+    """
+    WHOIS hàng loạt. Domain có trong cache trả ngay; phần còn lại gom theo server (TLD):
+    mỗi server 1 luồng tuần tự theo _WHOIS_THROTTLE, tối đa 'workers' server chạy song song
+    (trên pool WHOIS riêng, giới hạn _WHOIS_POOL_SIZE thread cho cả tiến trình).
+    Yield WhoisInfo theo thứ tự hoàn thành (source = "cache" | "live", lỗi ở .error).
+    """
+    pending: dict[str, List[str]] = {}
+    for d in dict.fromkeys(_dns_key(x) for x in domains if x and x.strip()):
+        hit = None if refresh else _whois_cache_get(d)
+        if hit is not None:
+            yield _whois_info(d, hit, "cache")
+        else:
+            pending.setdefault(_whois_server_key(d), []).append(d)
+    if not pending:
+        return
+
+    out: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    groups: queue.SimpleQueue = queue.SimpleQueue()
+    for names in pending.values():
+        groups.put(names)
+
+    def runner() -> None:
+        # mỗi runner lần lượt nhận 1 nhóm server
+        while not stop.is_set():
+            try:
+                names = groups.get_nowait()
+            except queue.Empty:
+                return
+            for d in names:
+                if stop.is_set():
+                    return
+                try:
+                    data, cached = _whois_record(d, ttl, refresh)
+                    out.put(_whois_info(d, data, "cache" if cached else "live"))
+                except Exception as e:
+                    out.put(_whois_info(d, None, "live", str(e)))
+
+    total = sum(len(v) for v in pending.values())
+    pool = _whois_pool()
+    for _ in range(max(1, min(workers, _WHOIS_POOL_SIZE, len(pending)))):
+        pool.submit(runner)
+    try:
+        for _ in range(total):
+            yield out.get()
+    finally:
+        stop.set()
 
 # --------- Port scan ---------
-def _probe_port(host: str, port: int, timeout: float) -> tuple[int, bool]:
+class ProbeResult(NamedTuple):
+    host: str
+    port: int
+    state: str              # "open" | "closed" (bị từ chối) | "filtered" (timeout) | "error" (không resolve được)
+    rtt_ms: float | None
+    detail: str | None = None
+
+_MAX_SWEEP_HOSTS = 65536
+
+def _expand_target(tok: str) -> Iterator[str]:
+    if "/" in tok:
+        net = ipaddress.ip_network(tok, strict=False)
+        if net.num_addresses > _MAX_SWEEP_HOSTS:
+            raise ValueError(f"Dải {tok} quá lớn (tối đa {_MAX_SWEEP_HOSTS} địa chỉ).")
+        it = net.hosts() if net.num_addresses > 2 else iter(net)
+        yield from (str(ip) for ip in it)
+        return
+    if "-" in tok:
+        a, b = tok.split("-", 1)
+        try:
+            start = ipaddress.ip_address(a.strip())
+        except ValueError:
+            start = None  # hostname có dấu '-'
+        if start is not None:
+            b = b.strip()
+            try:
+                end = ipaddress.ip_address(b)
+            except ValueError:
+                # dạng rút gọn 10.0.0.1-50 (chỉ đổi octet cuối)
+                end = ipaddress.ip_address(a.strip().rsplit(".", 1)[0] + "." + b)
+            lo, hi = sorted((int(start), int(end)))
+            if hi - lo + 1 > _MAX_SWEEP_HOSTS:
+                raise ValueError(f"Dải {tok} quá lớn (tối đa {_MAX_SWEEP_HOSTS} địa chỉ).")
+            cls = type(start)
+            yield from (str(cls(i)) for i in range(lo, hi + 1))
+            return
+    yield tok
+
+def parse_targets(spec: str | Iterable[str]) -> Iterator[str]:
+    """
+    Tách danh sách mục tiêu: host/IP, CIDR (10.0.0.0/24), dải (10.0.0.1-10.0.0.50 hoặc 10.0.0.1-50).
+    Phân cách bằng dấu phẩy / khoảng trắng / xuống dòng. Bỏ trùng, giữ thứ tự.
+    """
+    items = [spec] if isinstance(spec, str) else spec
+    seen: set[str] = set()
+    for item in items:
+        for tok in item.replace(",", " ").split():
+            for host in _expand_target(tok):
+                if host not in seen:
+                    seen.add(host)
+                    yield host
+
+async def _resolve_target(host: str) -> tuple[int, tuple]:
+    """Phân giải host 1 lần cho cả phiên quét -> (family, sockaddr)."""
     try:
-        with socket.create_connection((host, port), timeout=timeout):
-            return port, True
-    except Exception:
-        return port, False
+        ip = ipaddress.ip_address(host)
+        if ip.version == 4:
+            return socket.AF_INET, (host, 0)
+        return socket.AF_INET6, (host, 0, 0, 0)
+    except ValueError:
+        pass
+    loop = asyncio.get_running_loop()
+    infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    if not infos:
+        raise OSError(f"Không phân giải được {host}")
+    family, _, _, _, sockaddr = infos[0]
+    return family, sockaddr
+
+_CONNECT_PENDING = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, 10035, 10037}  # WSAEWOULDBLOCK/WSAEALREADY
+_CONNECTED = {0, errno.EISCONN, 10056}  # 10056 = WSAEISCONN
+
+def _settle(fut: asyncio.Future, value: bool) -> None:
+    if not fut.done():
+        fut.set_result(value)
+
+async def _aprobe(host: str, family: int, sockaddr: tuple, port: int, timeout: float) -> ProbeResult:
+    """
+    1 lần connect non-blocking. Dùng connect_ex + add_writer + call_later thay vì
+    wait_for(sock_connect) để không phải tạo thêm Task cho mỗi port.
+    """
+    loop = asyncio.get_running_loop()
+    addr = (sockaddr[0], port) + tuple(sockaddr[2:])
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    start = time.perf_counter()
+    try:
+        err = sock.connect_ex(addr)
+        if err in _CONNECT_PENDING:
+            # loopback/LAN thường đã xong bắt tay ngay: gọi lại connect_ex lấy kết quả luôn,
+            # khỏi đăng ký selector + future + timer (phần lớn chi phí mỗi probe)
+            err = sock.connect_ex(addr)
+            if err in _CONNECTED:
+                err = 0
+        if err in _CONNECT_PENDING:
+            fd = sock.fileno()
+            fut = loop.create_future()
+            try:
+                loop.add_writer(fd, _settle, fut, True)
+            except NotImplementedError:  # ProactorEventLoop (Windows)
+                try:
+                    await asyncio.wait_for(loop.sock_connect(sock, addr), timeout)
+                    err = 0
+                except asyncio.TimeoutError:
+                    return ProbeResult(host, port, "filtered", None)
+                except OSError as e:
+                    err = e.errno or -1
+            else:
+                handle = loop.call_later(timeout, _settle, fut, False)
+                try:
+                    ready = await fut
+                finally:
+                    handle.cancel()
+                    loop.remove_writer(fd)
+                if not ready:
+                    return ProbeResult(host, port, "filtered", None)
+                err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+    except OSError:
+        err = -1
+    finally:
+        sock.close()
+    rtt = (time.perf_counter() - start) * 1000.0
+    return ProbeResult(host, port, "open" if err == 0 else "closed", rtt)
+
+# Timeout thích ứng theo RTT (kiểu RTO của TCP, RFC 6298)
+_MIN_TIMEOUT = 0.05
+_MAX_TIMEOUT = 3.0
+_RTT_PROBE_PORTS = (80, 443, 22, 53)
+_RTT_PROBE_TIMEOUT = 1.0
+_MAX_RETRY_PER_HOST = 2048  # host chặn toàn bộ -> không quét lại cả 65k port
+
+class _HostSlot:
+    __slots__ = ("host", "family", "sockaddr", "ports", "inflight", "next_at",
+                 "base", "srtt", "rttvar", "retry", "retrying")
+
+    def __init__(self, host: str, family: int, sockaddr: tuple, ports: Iterator[int], base: float):
+        self.host = host
+        self.family = family
+        self.sockaddr = sockaddr
+        self.ports = ports
+        self.inflight = 0
+        self.next_at = 0.0
+        self.base = base            # timeout khi chưa có mẫu RTT
+        self.srtt: float | None = None
+        self.rttvar = 0.0
+        self.retry: list[int] = []  # port bị timeout ở lượt chính
+        self.retrying = False
+
+    def observe(self, rtt_ms: float) -> None:
+        r = rtt_ms / 1000.0
+        if self.srtt is None:
+            self.srtt, self.rttvar = r, r / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - r)
+            self.srtt = 0.875 * self.srtt + 0.125 * r
+
+    def timeout(self) -> float:
+        if self.srtt is None:       # chưa có mẫu RTT (vd. host WAN toàn port filtered)
+            rto = self.base
+        else:
+            # sàn 2*SRTT: jitter thấp làm RTTVAR rất nhỏ, dễ cắt nhầm port phản hồi chậm hơn trung bình
+            rto = max(self.srtt + 4 * self.rttvar, 2 * self.srtt)
+        if self.retrying:  # lượt "filtered": nới rộng gấp đôi
+            rto *= 2
+        # trần không thấp hơn timeout người dùng chọn
+        return min(max(rto, _MIN_TIMEOUT), max(_MAX_TIMEOUT, self.base))
+
+class _SweepScheduler:
+    """
+    Phát (host, port) cho các worker dùng chung 1 ngân sách in-flight.
+    Xoay vòng giữa các host đang active; mỗi host bị giới hạn số probe đồng thời
+    (per_host) và tốc độ (host_rate probe/s) để 1 host chậm không chiếm hết worker.
+    Host mới chỉ được resolve/kích hoạt khi cửa sổ active còn chỗ.
+    """
+
+    def __init__(
+        self,
+        targets: Iterable[str],
+        ports: Iterable[int],
+        per_host: int,
+        host_rate: float | None,
+        max_active: int,
+        emit: Callable[[ProbeResult], None],
+        timeout: float,
+        adaptive: bool,
+        gate: _Gate | None = None,
+    ):
+        self._targets = iter(targets)
+        self._ports = ports
+        self._per_host = max(1, per_host)
+        self._interval = 1.0 / host_rate if host_rate else 0.0
+        self._max_active = max(1, max_active)
+        self._emit = emit
+        self._timeout = timeout
+        self._adaptive = adaptive
+        self._gate = gate
+        self._active: deque[_HostSlot] = deque()
+        self._pending: set[asyncio.Task] = set()
+        self._targets_done = False
+        self._wake = asyncio.Event()
+
+    def _refill(self) -> None:
+        while not self._targets_done and len(self._active) + len(self._pending) < self._max_active:
+            host = next(self._targets, None)
+            if host is None:
+                self._targets_done = True
+                break
+            self._pending.add(asyncio.create_task(self._activate(host)))
+
+    async def _activate(self, host: str) -> None:
+        try:
+            family, sockaddr = await _resolve_target(host)
+            slot = _HostSlot(host, family, sockaddr, iter(self._ports), self._timeout)
+            if self._adaptive:
+                # đo RTT trước bằng vài connect tới port phổ biến (open hay bị từ chối đều cho mẫu);
+                # không quá per_host probe cùng lúc và đi qua cổng governor như probe thường
+                probes = [self._seed(host, family, sockaddr, p) for p in _RTT_PROBE_PORTS[:self._per_host]]
+                for r in await asyncio.gather(*probes):
+                    if r.rtt_ms is not None:
+                        slot.observe(r.rtt_ms)
+            self._active.append(slot)
+        except Exception as e:
+            self._emit(ProbeResult(host, 0, "error", None, str(e)))
+        finally:
+            self._pending.discard(asyncio.current_task())
+            self._wake.set()
+
+    async def _seed(self, host: str, family: int, sockaddr: tuple, port: int) -> ProbeResult:
+        if self._gate is not None:
+            await self._gate.acquire()
+        try:
+            return await _aprobe(host, family, sockaddr, port, _RTT_PROBE_TIMEOUT)
+        finally:
+            if self._gate is not None:
+                self._gate.release()
+
+    async def next(self) -> tuple[_HostSlot, int] | None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._refill()
+            now = loop.time()
+            wait: float | None = None
+            for _ in range(len(self._active)):
+                slot = self._active[0]
+                self._active.rotate(-1)
+                if slot.inflight >= self._per_host:
+                    continue
+                if slot.next_at > now:
+                    wait = min(wait or slot.next_at - now, slot.next_at - now)
+                    continue
+                port = next(slot.ports, None)
+                if port is None:
+                    if slot.inflight:
+                        continue  # chờ lượt chính xong mới biết port nào cần quét lại
+                    if slot.retry and not slot.retrying:
+                        slot.retrying = True
+                        slot.ports, slot.retry = iter(slot.retry), []
+                        port = next(slot.ports)
+                    else:
+                        self._active.remove(slot)
+                        self._wake.set()  # có chỗ cho host kế tiếp
+                        continue
+                slot.inflight += 1
+                if self._interval:
+                    slot.next_at = max(slot.next_at, now) + self._interval
+                return slot, port
+            if not self._active and not self._pending and self._targets_done:
+                return None
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def hold(self, slot: _HostSlot, res: ProbeResult) -> bool:
+        """Cập nhật RTT; trả True nếu port timeout được giữ lại để quét lại ở lượt "filtered"."""
+        if res.rtt_ms is not None:
+            if self._adaptive:
+                slot.observe(res.rtt_ms)
+            return False
+        if self._adaptive and not slot.retrying and len(slot.retry) < _MAX_RETRY_PER_HOST:
+            slot.retry.append(res.port)
+            return True
+        return False
+
+    def release(self, slot: _HostSlot) -> None:
+        slot.inflight -= 1
+        self._wake.set()
+
+    def close(self) -> None:
+        for task in self._pending:
+            task.cancel()
+
+# ---- Banner / nhận diện dịch vụ (giai đoạn 2 của pipeline quét) ----
+_BANNER_MAX_BYTES = 1024
+_BANNER_TIMEOUT = 2.0
+_BANNER_GREETING_WAIT = 0.8  # SSH/SMTP/FTP... tự gửi lời chào ngay sau khi kết nối
+_TLS_PORTS = {443, 465, 636, 993, 995, 2376, 5986, 6443, 8443, 8883, 9443, 10443}
+_HTTPS_PORTS = {443, 6443, 8443, 9443, 10443}
+_HTTP_PORTS = {80, 81, 3000, 5000, 5601, 8000, 8008, 8080, 8081, 8086, 8090, 8161, 8181,
+               8200, 8500, 8880, 8888, 9000, 9090, 9200, 15672}
+
+def _banner_line(raw: bytes) -> str:
+    """Rút gọn phản hồi thành 1 dòng in được (HTTP: status + Server)."""
+    text = raw.decode("latin-1", errors="replace")
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    if not lines:
+        return ""
+    out = lines[0]
+    if out.startswith("HTTP/"):
+        server = next((ln for ln in lines[1:] if ln.lower().startswith("server:")), None)
+        if server:
+            out += " | " + server
+    out = "".join(ch if ch.isprintable() else "." for ch in out)
+    return out[:160]
+
+def _http_head(host: str) -> bytes:
+    return f"HEAD / HTTP/1.0\r\nHost: {host}\r\nUser-Agent: vlabstools/1.0\r\n\r\n".encode()
+
+async def _agrab_banner(host: str, sockaddr: tuple, port: int,
+                        timeout: float = _BANNER_TIMEOUT, max_bytes: int = _BANNER_MAX_BYTES) -> str:
+    """
+    Đọc banner 1 port đã mở: TLS handshake (ClientHello) cho port TLS, HEAD / cho port HTTP,
+    còn lại chờ lời chào (SSH/SMTP/FTP...) rồi mới thử HEAD. Đọc tối đa max_bytes.
+    """
+    tls = port in _TLS_PORTS
+    ctx = None
+    if tls:
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    try:
+        ipaddress.ip_address(host)
+        sni = None
+    except ValueError:
+        sni = host
+
+    async def _grab() -> str:
+        reader, writer = await asyncio.open_connection(
+            sockaddr[0], port, ssl=ctx, server_hostname=sni if tls else None, limit=max_bytes)
+        try:
+            parts = []
+            if tls:
+                so = writer.get_extra_info("ssl_object")
+                if so is not None:
+                    parts.append(f"{so.version()} {so.cipher()[0]}")
+            raw = b""
+            if port in _HTTP_PORTS or port in _HTTPS_PORTS:
+                writer.write(_http_head(host))
+                await writer.drain()
+                raw = await reader.read(max_bytes)
+            elif not tls:
+                try:
+                    raw = await asyncio.wait_for(reader.read(max_bytes), _BANNER_GREETING_WAIT)
+                except asyncio.TimeoutError:
+                    writer.write(_http_head(host))
+                    await writer.drain()
+                    raw = await reader.read(max_bytes)
+            line = _banner_line(raw)
+            if line:
+                parts.append(line)
+            return " | ".join(parts)
+        finally:
+            writer.close()
+
+    try:
+        return await asyncio.wait_for(_grab(), timeout)
+    except (asyncio.TimeoutError, OSError, ssl.SSLError, ValueError):
+        return ""
+
+async def aiter_sweep(
+    targets: Iterable[str],
+    ports: Iterable[int],
+    timeout: float = 0.3,
+    concurrency: int = 1000,
+    per_host: int = 100,
+    host_rate: float | None = None,
+    adaptive: bool = True,
+    banners: bool = False,
+    banner_workers: int = 128,
+) -> AsyncIterator[ProbeResult]:
+    """
+    Engine quét non-blocking cho nhiều host: N coroutine dùng chung 1 ngân sách in-flight
+    và kéo (host, port) từ _SweepScheduler, nên bộ nhớ không phụ thuộc số host x port.
+    Trả kết quả theo thứ tự hoàn thành.
+
+    adaptive=True: timeout mỗi host suy ra từ RTT đo trước khi quét và cập nhật liên tục
+    ('timeout' chỉ dùng khi chưa đo được RTT); port bị timeout được quét lại 1 lần ở cuối
+    với timeout rộng hơn trước khi kết luận "filtered".
+
+    banners=True: port mở được chuyển sang nhóm banner_workers coroutine riêng để đọc
+    banner song song với việc quét tiếp; kết quả "open" trả về kèm detail=banner.
+    """
+    if iter(ports) is ports:
+        ports = PortSet.from_iterable(ports)  # mỗi host cần duyệt lại danh sách port
+    results: asyncio.Queue = asyncio.Queue()
+    n = _fd_budget(concurrency)
+    per_host = min(per_host, n)
+    gate = _gate()
+    sched = _SweepScheduler(targets, ports, per_host, host_rate, 2 * -(-n // per_host),
+                            results.put_nowait, timeout, adaptive, gate)
+    nb = max(1, banner_workers) if banners else 0
+    banner_q: asyncio.Queue = asyncio.Queue()
+    probing = n
+    loop = asyncio.get_running_loop()
+
+    async def worker() -> None:
+        nonlocal probing
+        try:
+            while True:
+                nxt = await sched.next()
+                if nxt is None:
+                    return
+                slot, port = nxt
+                try:
+                    # phần socket governor chỉ giữ trong lúc probe: worker chờ host rate/kích hoạt
+                    # không chiếm chỗ của owner khác
+                    if gate is not None:
+                        await gate.acquire()
+                    try:
+                        t0 = loop.time()
+                        res = await _aprobe(slot.host, slot.family, slot.sockaddr, port, slot.timeout())
+                    finally:
+                        if gate is not None:
+                            gate.release()
+                    _METRICS.observe("tcp_probe", (loop.time() - t0) * 1000, res.state)
+                    if sched.hold(slot, res):
+                        continue
+                finally:
+                    sched.release(slot)
+                if nb and res.state == "open":
+                    banner_q.put_nowait((res, slot.sockaddr))
+                else:
+                    results.put_nowait(res)
+                # probe xong ngay (nhánh nhanh của _aprobe) không nhường event loop:
+                # nhường chủ động để kết quả được stream và việc huỷ có tác dụng
+                await asyncio.sleep(0)
+        finally:
+            results.put_nowait(None)
+            probing -= 1
+            if probing == 0:
+                for _ in range(nb):
+                    banner_q.put_nowait(None)
+
+    async def banner_worker() -> None:
+        try:
+            while True:
+                item = await banner_q.get()
+                if item is None:
+                    return
+                res, sockaddr = item
+                if gate is not None:
+                    await gate.acquire()
+                try:
+                    banner = await _agrab_banner(res.host, sockaddr, res.port)
+                finally:
+                    if gate is not None:
+                        gate.release()
+                results.put_nowait(res._replace(detail=banner or None))
+        finally:
+            results.put_nowait(None)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(n)]
+    tasks += [asyncio.create_task(banner_worker()) for _ in range(nb)]
+    try:
+        running = n + nb
+        while running or not results.empty():
+            item = await results.get()
+            if item is None:
+                running -= 1
+            else:
+                yield item
+    finally:
+        sched.close()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def aiter_port_scan(
+    host: str,
+    ports: Iterable[int],
+    timeout: float = 0.3,
+    concurrency: int = 1000,
+    adaptive: bool = True,
+    banners: bool = False,
+) -> AsyncIterator[ProbeResult]:
+    """Quét 1 host: trường hợp riêng của aiter_sweep, toàn bộ ngân sách dành cho host đó."""
+    agen = aiter_sweep([host], ports, timeout, concurrency, per_host=concurrency,
+                       adaptive=adaptive, banners=banners)
+    try:
+        async for res in agen:
+            if res.state == "error":
+                raise OSError(res.detail)
+            yield res
+    finally:
+        await agen.aclose()
+
+# --------- Progress events ---------
+class ScanEvent(NamedTuple):
+    total: int
+    done: int
+    new_open: list[ProbeResult]     # port mở mới tìm thấy kể từ event trước
+    final: bool = False
+
+class ProgressChannel:
+    """
+    Gom các cập nhật tiến độ theo từng port thành ít event: chỉ phát khi đã qua ít nhất
+    'interval' giây VÀ (tiến độ tăng thêm >= 'step' % HOẶC có port mở mới).
+    Số event vì vậy phụ thuộc thời gian quét chứ không phụ thuộc số port.
+    close() luôn phát event cuối (final=True) với phần còn lại.
+    """
+
+    def __init__(
+        self,
+        total: int,
+        event_cb: Callable[[ScanEvent], None] | None = None,
+        progress_cb: Callable[[int, int], None] | None = None,
+        interval: float = 0.25,
+        step: float = 1.0,
+    ):
+        self.total = max(int(total), 0)
+        self.done = 0
+        self._event_cb = event_cb
+        self._progress_cb = progress_cb
+        self._interval = interval
+        self._step = step * self.total / 100.0
+        self._last_t = 0.0
+        self._last_done = 0
+        self._pending: list[ProbeResult] = []
+
+    def update(self, res: ProbeResult | None = None, n: int = 1) -> None:
+        self.done += n
+        if res is not None and res.state == "open":
+            self._pending.append(res)
+        now = time.monotonic()
+        if now - self._last_t < self._interval:
+            return
+        if self.done - self._last_done < self._step and not self._pending:
+            return
+        self._flush(now, final=False)
+
+    def close(self) -> None:
+        self._flush(time.monotonic(), final=True)
+
+    def _flush(self, now: float, final: bool) -> None:
+        self._last_t, self._last_done = now, self.done
+        batch, self._pending = self._pending, []
+        if self._progress_cb:
+            self._progress_cb(self.total, self.done)
+        if self._event_cb:
+            self._event_cb(ScanEvent(self.total, self.done, batch, final))
+
+def _clean_ports(ports: Iterable[int] | None) -> PortSet | RankedPorts:
+    """None/rỗng -> toàn bộ 1..65535; PortSet/RankedPorts dùng lại nguyên, iterable khác gom thành PortSet."""
+    if not ports:
+        return PortSet.full()
+    if isinstance(ports, RankedPorts):
+        return ports
+    return PortSet.from_iterable(ports)
+
+def _plan_ports(ports: Iterable[int] | None, order: str, top_n: int | None) -> PortSet | RankedPorts:
+    """order="top" hoặc top_n -> port phổ biến trước (RankedPorts); mặc định tăng dần."""
+    ports = _clean_ports(ports)
+    if top_n or order == "top":
+        return RankedPorts(ports, top_n or None)
+    return ports
+
+def iter_port_scan(
+    host: str,
+    ports: Iterable[int] | None = None,
+    timeout: float = 0.3,
+    workers: int = 1000,
+    adaptive: bool = True,
+    banners: bool = False,
+) -> Iterator[ProbeResult]:
+    """Bản đồng bộ của aiter_port_scan: yield ProbeResult ngay khi từng port có kết quả."""
+    ports = _clean_ports(ports)
+    return _iter_async(lambda: aiter_port_scan(host, ports, timeout, workers, adaptive, banners), want=workers)
+
+def iter_sweep(
+    targets: str | Iterable[str],
+    ports: Iterable[int] | None = None,
+    timeout: float = 0.3,
+    workers: int = 1000,
+    per_host: int = 100,
+    host_rate: float | None = None,
+    adaptive: bool = True,
+    banners: bool = False,
+) -> Iterator[ProbeResult]:
+    """
+    Bản đồng bộ của aiter_sweep. 'targets' nhận chuỗi/danh sách theo cú pháp parse_targets.
+    Host không resolve được trả về ProbeResult(state="error", port=0, detail=lỗi).
+    """
+    ports = _clean_ports(ports)
+    hosts = parse_targets(targets)
+    return _iter_async(lambda: aiter_sweep(hosts, ports, timeout, workers, per_host, host_rate,
+                                             adaptive, banners), want=workers)
+
+class ScanReport(NamedTuple):
+    hosts: Tuple[str, ...]
+    open_ports: Tuple[ProbeResult, ...]     # kèm banner ở .detail nếu bật banners
+    errors: Tuple[ProbeResult, ...]         # host không resolve được (state="error")
+    total: int                              # số (host, port) dự kiến
+    done: int
+    stopped: str | None = None              # None | "budget" | "cancel" (dừng trước khi xong)
+    time_budget: float | None = None
+
+    @property
+    def complete(self) -> bool:
+        return self.done >= self.total
+
+    def by_host(self) -> dict[str, List[ProbeResult]]:
+        out: dict[str, List[ProbeResult]] = {h: [] for h in self.hosts}
+        for r in self.open_ports:
+            out.setdefault(r.host, []).append(r)
+        return out
+
+def _collect_scan(
+    scan: Iterator[ProbeResult],
+    hosts: List[str],
+    n_ports: int,
+    progress_cb: Callable[[int, int], None] | None,
+    event_cb: Callable[[ScanEvent], None] | None,
+    time_budget: float | None,
+    cancel: threading.Event | None,
+) -> ScanReport:
+    """Vòng tiêu thụ chung của port_scan/sweep_scan: gom kết quả, báo tiến độ, dừng theo budget/cancel."""
+    t0 = time.perf_counter()
+    deadline = time.monotonic() + time_budget if time_budget else None
+    found: List[ProbeResult] = []
+    errors: List[ProbeResult] = []
+    stopped = None
+    channel = ProgressChannel(len(hosts) * n_ports, event_cb, progress_cb)
+    try:
+        for res in scan:
+            if res.state == "error":
+                errors.append(res)
+                channel.update(n=n_ports)
+            else:
+                if res.state == "open":
+                    found.append(res)
+                channel.update(res)
+            if deadline and time.monotonic() >= deadline:
+                stopped = "budget"
+                break
+            if cancel is not None and cancel.is_set():
+                stopped = "cancel"
+                break
+    except BaseException:
+        _METRICS.observe("port_scan", (time.perf_counter() - t0) * 1000, "error")
+        raise
+    finally:
+        scan.close()
+    channel.close()
+    if channel.done >= channel.total:
+        stopped = None
+    _METRICS.observe("port_scan", (time.perf_counter() - t0) * 1000, stopped or "ok")
+    return ScanReport(tuple(hosts), tuple(found), tuple(errors), channel.total, channel.done,
+                      stopped, time_budget)
+
+def port_scan_report(
+    host: str,
+    ports: Iterable[int] | None = None,
+    timeout: float = 0.3,
+    workers: int = 1000,
+    progress_cb: Callable[[int, int], None] | None = None,
+    adaptive: bool = True,
+    event_cb: Callable[[ScanEvent], None] | None = None,
+    order: str = "numeric",
+    top_n: int | None = None,
+    time_budget: float | None = None,
+    banners: bool = False,
+    cancel: threading.Event | None = None,
+) -> ScanReport:
+    """Như port_scan nhưng trả ScanReport (lỗi resolve/kết nối được raise)."""
+    ports = _plan_ports(ports, order, top_n)
+    scan = iter_port_scan(host, ports, timeout, workers, adaptive, banners)
+    return _collect_scan(scan, [host], len(ports), progress_cb, event_cb, time_budget, cancel)
+
+def sweep_report(
+    targets: str | Iterable[str],
+    ports: Iterable[int] | None = None,
+    timeout: float = 0.3,
+    workers: int = 1000,
+    per_host: int = 100,
+    host_rate: float | None = None,
+    progress_cb: Callable[[int, int], None] | None = None,
+    adaptive: bool = True,
+    event_cb: Callable[[ScanEvent], None] | None = None,
+    order: str = "numeric",
+    top_n: int | None = None,
+    time_budget: float | None = None,
+    banners: bool = False,
+    cancel: threading.Event | None = None,
+) -> ScanReport:
+    """Như sweep_scan nhưng trả ScanReport; host lỗi nằm trong .errors."""
+    hosts = list(parse_targets(targets))
+    ports = _plan_ports(ports, order, top_n)
+    scan = iter_sweep(hosts, ports, timeout, workers, per_host, host_rate, adaptive, banners)
+    return _collect_scan(scan, hosts, len(ports), progress_cb, event_cb, time_budget, cancel)
+
+def _stop_note(rep: ScanReport) -> str:
+    if rep.stopped == "cancel":
+        return f"\n(Đã huỷ: mới quét {rep.done}/{rep.total} port, kết quả chưa đầy đủ)"
+    if rep.stopped == "budget":
+        return f"\n(Hết thời gian {rep.time_budget:g}s: mới quét {rep.done}/{rep.total} port, kết quả chưa đầy đủ)"
+    return ""
+
+def _render_port_scan(rep: ScanReport) -> str:
+    if rep.open_ports:
+        return "Open port detected:\n" + _render_open(rep.open_ports) + _stop_note(rep)
+    return "No open ports detected." + _stop_note(rep)
 
 def port_scan(
     host: str,
     ports: Iterable[int] | None = None,
     timeout: float = 0.3,
-    workers: int = 200,
+    workers: int = 1000,
     progress_cb: Callable[[int, int], None] | None = None,
+    adaptive: bool = True,
+    event_cb: Callable[[ScanEvent], None] | None = None,
+    order: str = "numeric",
+    top_n: int | None = None,
+    time_budget: float | None = None,
+    banners: bool = False,
+    cancel: threading.Event | None = None,
 ) -> str:
     """
     Quét cổng TCP.
     - Nếu 'ports' = None hoặc rỗng -> quét toàn bộ 1..65535.
-    - progress_cb(total, done): callback để UI cập nhật progress.
+    - workers: số kết nối đồng thời tối đa (asyncio, không tạo thread cho mỗi port).
+    - progress_cb(total, done): callback để UI cập nhật progress (đã gom qua ProgressChannel).
+    - event_cb(ScanEvent): như progress_cb nhưng kèm lô port mở mới để hiển thị dần.
+    - adaptive: timeout theo RTT đo được ('timeout' là giá trị dự phòng) + quét lại port timeout.
+    - order="top": quét port phổ biến (TOP_PORTS) trước; top_n: chỉ quét N port phổ biến nhất.
+    - time_budget (giây): hết giờ thì dừng và trả kết quả tới thời điểm đó.
+    - banners: đọc banner/nhận diện dịch vụ cho port mở (chạy song song với việc quét).
+    - cancel: Event được set -> dừng sớm, trả kết quả tới thời điểm đó (dùng cho job nền).
+    Bản ghi có cấu trúc: port_scan_report().
     """
     try:
-        if not ports:
-            ports = range(1, 65536)
-        ports = [p for p in ports if 1 <= int(p) <= 65535]
-
-        total = len(ports)
-        open_ports: list[int] = []
-        done = 0
-
-        with ThreadPoolExecutor(max_workers=workers) as ex:
-            futures = {ex.submit(_probe_port, host, int(p), timeout): p for p in ports}
-            for fut in as_completed(futures):
-                port, ok = fut.result()
-                if ok:
-                    open_ports.append(port)
-                done += 1
-                if progress_cb:
-                    progress_cb(total, done)
-
-        open_ports.sort()
-        if open_ports:
-            return "Open port detected:\n" + "\n".join(f"{p}/tcp OPEN" for p in open_ports)
-        return "No open ports detected."
+        return _render_port_scan(port_scan_report(
+            host, ports, timeout, workers, progress_cb, adaptive, event_cb, order, top_n,
+            time_budget, banners, cancel))
     except Exception as e:
         return f"Lỗi scan: {e}"
+
+def sweep_scan(
+    targets: str | Iterable[str],
+    ports: Iterable[int] | None = None,
+    timeout: float = 0.3,
+    workers: int = 1000,
+    per_host: int = 100,
+    host_rate: float | None = None,
+    progress_cb: Callable[[int, int], None] | None = None,
+    adaptive: bool = True,
+    event_cb: Callable[[ScanEvent], None] | None = None,
+    order: str = "numeric",
+    top_n: int | None = None,
+    time_budget: float | None = None,
+    banners: bool = False,
+    cancel: threading.Event | None = None,
+) -> str:
+    """
+    Quét nhiều host (CIDR / danh sách / dải) với 1 ngân sách kết nối chung.
+    Kết quả gom theo host; progress_cb(total, done) / event_cb(ScanEvent) tính trên
+    tổng số (host, port) và được gom qua ProgressChannel như port_scan.
+    order / top_n / time_budget / banners / cancel: như port_scan. Bản ghi: sweep_report().
+    """
+    try:
+        if not any(True for _ in parse_targets(targets)):
+            return "Không có mục tiêu hợp lệ."
+        return _render_sweep(sweep_report(
+            targets, ports, timeout, workers, per_host, host_rate, progress_cb, adaptive, event_cb,
+            order, top_n, time_budget, banners, cancel))
+    except Exception as e:
+        return f"Lỗi scan: {e}"
+
+def _render_open(results: Iterable[ProbeResult]) -> str:
+    return "\n".join(
+        f"{r.port}/tcp OPEN" + (f"  {r.detail}" if r.detail else "")
+        for r in sorted(results, key=lambda r: r.port)
+    )
+
+def _render_sweep(rep: ScanReport) -> str:
+    lines = []
+    by_host = rep.by_host()
+    up = [h for h in rep.hosts if by_host.get(h)]
+    for h in up:
+        lines.append(f"== {h} ==")
+        lines.append(_render_open(by_host[h]))
+    for r in rep.errors:
+        lines.append(f"== {r.host} == Lỗi: {r.detail or ''}")
+    lines.append(f"{len(up)}/{len(rep.hosts)} host có port mở.")
+    return "\n".join(lines) + _stop_note(rep)
+
+# --------- Hiển thị 1 bản ghi bất kỳ (dùng cho cli.py) ---------
+def _render_probe(r: ProbeResult) -> str:
+    if r.state == "error":
+        return f"{r.host}: Lỗi: {r.detail or ''}"
+    return f"{r.host}:{r.port}/tcp {r.state.upper()}" + (f"  {r.detail}" if r.detail else "")
+
+def render_record(rec) -> str:
+    """Bản ghi (CertInfo, DnsResult, WhoisInfo, PingStats, ProbeResult, PathHop, ...) -> text như trên UI."""
+    render = {
+        CertInfo: _render_cert, DnsResult: _render_dns, WhoisInfo: _render_whois,
+        PingStats: _render_ping, ProbeResult: _render_probe, PathHop: _render_hop,
+    }.get(type(rec))
+    if render is None:
+        return "  ".join(f"{k}={v}" for k, v in record_row(rec).items() if v not in (None, ""))
+    title = {CertInfo: lambda c: f"{c.host}:{c.port}", DnsResult: lambda d: d.name,
+             WhoisInfo: lambda w: w.domain}.get(type(rec))
+    return (f"== {title(rec)} ==\n" if title else "") + render(rec)
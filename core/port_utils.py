@@ -0,0 +1,179 @@
+# core/port_utils.py
+from __future__ import annotations
+from bisect import bisect_right
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
+
+PORT_MIN, PORT_MAX = 1, 65535
+
+def _normalize(ranges: Iterable[Tuple[int, int]]) -> Tuple[Tuple[int, int], ...]:
+    """Kẹp vào 1..65535, sắp xếp và gộp các đoạn chồng/kề nhau."""
+    clipped = sorted(
+        (max(lo, PORT_MIN), min(hi, PORT_MAX))
+        for lo, hi in ranges
+        if hi >= PORT_MIN and lo <= PORT_MAX and lo <= hi
+    )
+    out: List[Tuple[int, int]] = []
+    for lo, hi in clipped:
+        if out and lo <= out[-1][1] + 1:
+            if hi > out[-1][1]:
+                out[-1] = (out[-1][0], hi)
+        else:
+            out.append((lo, hi))
+    return tuple(out)
+
+class PortSet:
+    """
+    Tập port TCP/UDP lưu dạng các đoạn [lo, hi] rời nhau, đã sắp xếp.
+    "1-65535" chỉ tốn 1 tuple thay vì list 65k int; duyệt lười (tăng dần),
+    len()/in/|/-/& tính trên đoạn. Bất biến, dùng chung giữa UI và port_scan.
+    """
+    __slots__ = ("_ranges", "_len")
+
+    def __init__(self, ranges: Iterable[Tuple[int, int]] = ()):
+        self._ranges = _normalize(ranges)
+        self._len = sum(hi - lo + 1 for lo, hi in self._ranges)
+
+    # ---- Tạo ----
+    @classmethod
+    def full(cls) -> PortSet:
+        return cls(((PORT_MIN, PORT_MAX),))
+
+    @classmethod
+    def parse(cls, spec: str) -> PortSet:
+        """
+        Parse '22,80,443' và dải '1-1024' (đảo ngược '1024-1' cũng được).
+        Phần không hợp lệ bị bỏ qua; giá trị ngoài 1..65535 bị cắt.
+        """
+        ranges: List[Tuple[int, int]] = []
+        for part in (spec or "").split(","):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                if "-" in part:
+                    a, b = part.split("-", 1)
+                    a, b = int(a), int(b)
+                    ranges.append((min(a, b), max(a, b)))
+                else:
+                    x = int(part)
+                    ranges.append((x, x))
+            except ValueError:
+                pass
+        return cls(ranges)
+
+    @classmethod
+    def from_iterable(cls, ports: Iterable[int]) -> PortSet:
+        if isinstance(ports, PortSet):
+            return ports
+        if isinstance(ports, range) and ports.step == 1:
+            return cls(((ports.start, ports.stop - 1),))
+        return cls((int(p), int(p)) for p in ports)
+
+    # ---- Truy vấn ----
+    @property
+    def ranges(self) -> Tuple[Tuple[int, int], ...]:
+        return self._ranges
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return bool(self._ranges)
+
+    def __iter__(self) -> Iterator[int]:
+        for lo, hi in self._ranges:
+            yield from range(lo, hi + 1)
+
+    def __contains__(self, port: object) -> bool:
+        if not isinstance(port, int):
+            return False
+        i = bisect_right(self._ranges, (port, PORT_MAX + 1)) - 1
+        return i >= 0 and self._ranges[i][0] <= port <= self._ranges[i][1]
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, PortSet) and self._ranges == other._ranges
+
+    def __hash__(self) -> int:
+        return hash(self._ranges)
+
+    # ---- Phép tập hợp ----
+    def __or__(self, other: PortSet) -> PortSet:
+        return PortSet(self._ranges + PortSet.from_iterable(other)._ranges)
+
+    def __sub__(self, other: PortSet) -> PortSet:
+        other = PortSet.from_iterable(other)
+        out: List[Tuple[int, int]] = []
+        j, cut = 0, other._ranges
+        for lo, hi in self._ranges:
+            while j < len(cut) and cut[j][1] < lo:
+                j += 1
+            k = j
+            while k < len(cut) and cut[k][0] <= hi:
+                if cut[k][0] > lo:
+                    out.append((lo, cut[k][0] - 1))
+                lo = max(lo, cut[k][1] + 1)
+                k += 1
+            if lo <= hi:
+                out.append((lo, hi))
+        return PortSet(out)
+
+    def __and__(self, other: PortSet) -> PortSet:
+        return self - (self - PortSet.from_iterable(other))
+
+    union = __or__
+    difference = __sub__
+    intersection = __and__
+
+    # ---- Hiển thị ----
+    def __str__(self) -> str:
+        return ",".join(str(lo) if lo == hi else f"{lo}-{hi}" for lo, hi in self._ranges)
+
+    def __repr__(self) -> str:
+        return f"PortSet('{self}')"
+
+
+# Port TCP phổ biến, xếp theo tần suất mở ngoài thực tế (theo bảng nmap-services, top 100)
+# rồi bổ sung các dịch vụ hạ tầng/DB hay gặp trong mạng nội bộ.
+TOP_PORTS: Tuple[int, ...] = tuple(dict.fromkeys((
+    80, 23, 443, 21, 22, 25, 3389, 110, 445, 139, 143, 53, 135, 3306, 8080, 1723, 111, 995,
+    993, 5900, 1025, 587, 8888, 199, 1720, 465, 548, 113, 81, 6001, 10000, 514, 5060, 179,
+    1026, 2000, 8443, 8000, 32768, 554, 26, 1433, 49152, 2001, 515, 8008, 49154, 1027, 5666,
+    646, 5000, 5631, 631, 49153, 8081, 2049, 88, 79, 5800, 106, 2121, 1110, 49155, 6000, 513,
+    990, 5357, 427, 49156, 543, 544, 5101, 144, 7, 389, 8009, 3128, 444, 9999, 5009, 7070,
+    5190, 3000, 5432, 1900, 3986, 13, 1029, 9, 5051, 6646, 49157, 1028, 873, 1755, 2717,
+    4899, 9100, 119, 37,
+    # hạ tầng / DB / message queue / container
+    636, 3268, 5985, 5986, 1521, 6379, 27017, 9200, 9300, 5672, 15672, 11211, 9092, 2181,
+    2375, 2376, 6443, 10250, 5601, 9000, 9090, 8086, 5984, 50000, 8161, 7001, 8200, 8500,
+    9418, 1883, 8883, 25565, 4444, 8880, 8090, 8181, 9443, 10443, 1194, 1812, 3260, 5353,
+)))
+
+class RankedPorts:
+    """
+    Duyệt port theo khả năng mở: các port trong TOP_PORTS (thuộc tập) trước,
+    phần còn lại tăng dần. top_n -> chỉ lấy N port đầu theo thứ tự đó.
+    Duyệt lại được nhiều lần và có len(), dùng thẳng cho port_scan/sweep.
+    """
+    __slots__ = ("_head", "_tail")
+
+    def __init__(self, ports: Iterable[int], top_n: int | None = None):
+        ports = PortSet.from_iterable(ports)
+        head = tuple(p for p in TOP_PORTS if p in ports)
+        rest = ports - PortSet.from_iterable(head)
+        if top_n is None:
+            self._head, self._tail = head, rest
+        else:
+            top_n = max(int(top_n), 0)
+            self._head = head[:top_n] + tuple(islice(rest, max(top_n - len(head), 0)))
+            self._tail = PortSet()
+
+    def __len__(self) -> int:
+        return len(self._head) + len(self._tail)
+
+    def __iter__(self) -> Iterator[int]:
+        yield from self._head
+        yield from self._tail
+
+    def __repr__(self) -> str:
+        return f"RankedPorts(head={len(self._head)}, tail={self._tail!s})"
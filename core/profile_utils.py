@@ -0,0 +1,138 @@
+# core/profile_utils.py
+"""
+Đo chi phí khởi động/rerun của app: thời gian import từng module trang (kèm các module
+kéo theo), độ trễ render lần đầu và các lần sau của từng trang, thời gian mỗi lượt chạy
+script. Số liệu giữ theo tiến trình (dùng chung mọi session), không phụ thuộc Streamlit.
+"""
+from __future__ import annotations
+import importlib
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+_MAX_RUNS = 200
+
+class ImportStat(NamedTuple):
+    module: str
+    ms: float
+    new_modules: int                 # số module mới nạp vào sys.modules (kể cả kéo theo)
+    packages: Tuple[str, ...]        # gói cấp 1-2 mới nạp, vd. ('core.network_utils', 'streamlit.components')
+    error: str | None = None
+
+    def row(self) -> dict:
+        out = self._asdict()
+        out["packages"] = ", ".join(self.packages)
+        return out
+
+class RenderStat(NamedTuple):
+    page: str
+    count: int
+    first_ms: float                  # lần render đầu tiên trong tiến trình (gồm khởi tạo lười của trang)
+    last_ms: float
+    avg_ms: float
+    max_ms: float
+
+class _Render:
+    __slots__ = ("count", "first", "last", "total", "max")
+
+    def __init__(self):
+        self.count, self.first, self.last, self.total, self.max = 0, 0.0, 0.0, 0.0, 0.0
+
+    def add(self, ms: float) -> None:
+        if not self.count:
+            self.first = ms
+        self.count += 1
+        self.last, self.total, self.max = ms, self.total + ms, max(self.max, ms)
+
+def _packages(names: Iterable[str]) -> Tuple[str, ...]:
+    return tuple(sorted({".".join(n.split(".")[:2]) for n in names}))
+
+def _process_age() -> float | None:
+    """Giây từ lúc tiến trình khởi động (psutil nếu có)."""
+    try:
+        import psutil
+        return time.time() - psutil.Process().create_time()
+    except Exception:
+        return None
+
+class StartupProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._imports: dict[str, ImportStat] = {}
+        self._renders: dict[str, _Render] = {}
+        self._runs: deque = deque(maxlen=_MAX_RUNS)   # ms mỗi lượt chạy app.py
+        self.first_run_at: float | None = None         # tuổi tiến trình ở lượt chạy đầu (cold start)
+
+    def import_module(self, name: str) -> ModuleType:
+        """importlib.import_module có đo giờ; chỉ lần nạp thật đầu tiên được ghi lại."""
+        if name in sys.modules:
+            return sys.modules[name]
+        before = set(sys.modules)
+        t0 = time.perf_counter()
+        try:
+            mod = importlib.import_module(name)
+        except Exception as e:
+            self._add_import(name, t0, before, f"{type(e).__name__}: {e}")
+            raise
+        self._add_import(name, t0, before, None)
+        return mod
+
+    def _add_import(self, name: str, t0: float, before: set, error: str | None) -> None:
+        ms = (time.perf_counter() - t0) * 1000
+        new = set(sys.modules) - before
+        with self._lock:
+            self._imports[name] = ImportStat(name, ms, len(new), _packages(new), error)
+
+    @contextmanager
+    def render(self, page: str) -> Iterator[None]:
+        """Đo 1 lần render trang (kể cả khi trang dừng bằng st.stop/st.rerun)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            with self._lock:
+                self._renders.setdefault(page, _Render()).add(ms)
+
+    def script_run(self, ms: float) -> None:
+        with self._lock:
+            if self.first_run_at is None:
+                self.first_run_at = _process_age()
+            self._runs.append(ms)
+
+    # ---- Đọc ----
+    def imports(self) -> List[ImportStat]:
+        """Chậm nhất trước."""
+        with self._lock:
+            return sorted(self._imports.values(), key=lambda s: s.ms, reverse=True)
+
+    def renders(self) -> List[RenderStat]:
+        with self._lock:
+            return [RenderStat(p, r.count, r.first, r.last, r.total / r.count, r.max)
+                    for p, r in self._renders.items() if r.count]
+
+    def script_runs(self) -> List[float]:
+        with self._lock:
+            return list(self._runs)
+
+    def summary(self) -> dict:
+        runs = self.script_runs()
+        imports = self.imports()
+        return {
+            "process_age_at_first_run_s": self.first_run_at,
+            "import_ms_total": sum(s.ms for s in imports),
+            "runs": len(runs),
+            "first_run_ms": runs[0] if runs else None,
+            "last_run_ms": runs[-1] if runs else None,
+            "avg_run_ms": sum(runs) / len(runs) if runs else None,
+        }
+
+_PROFILER = StartupProfiler()
+
+def profiler() -> StartupProfiler:
+    """Profiler dùng chung cho cả tiến trình (module được cache nên sống qua các lượt rerun)."""
+    return _PROFILER
@@ -5,60 +5,27 @@ import streamlit as st
 import streamlit.components.v1 as components
 
 from core.encryption_utils import (
+    MAX_MIN_PER_GROUP,
     build_charsets,
-    generate_one,
+    compile_policy,
+    coverage_bits,
+    generate_batch,
     entropy_bits,
+    iter_passphrases,
+    load_wordlist,
+    load_wordlist_bytes,
+    passphrase_bits,
     strength_label,
+    wordlist_sources,
 )
 
-def render():
-    st.subheader("🔐 Encryption — Password Generator")
+def _render_table(passwords: list[str], show_plain: bool) -> None:
+    # Dữ liệu cho iframe
+    pw_data = [{"plain": p, "masked": ("•" * len(p))} for p in passwords]
+    frame_height = min(720, 160 + 36 * len(pw_data))
 
-    colL, colR = st.columns([3, 2])
-    with colL:
-        length = st.slider("Password length", 8, 128, 16, 1)
-        count  = st.number_input("Quantity", min_value=1, max_value=50, value=1, step=1)
-        show_plain = st.checkbox("Show characters (unmasked)", value=False)
-    with colR:
-        st.markdown("**Character sets**")
-        use_lower  = st.checkbox("a–z", value=True)
-        use_upper  = st.checkbox("A–Z", value=True)
-        use_digits = st.checkbox("0–9", value=True)
-        use_symbols = st.checkbox("Symbols", value=False)
-
-        st.markdown("**Filters**")
-        exclude_similar   = st.checkbox("Exclude look-alike (I l 1 O 0 …)", value=True)
-        exclude_ambiguous = st.checkbox("Exclude ambiguous symbols ({ } [ ] …)", value=False)
-
-    gen = st.button("🎲 Generate", type="primary", use_container_width=True)
-
-    if gen:
-        try:
-            groups, combined = build_charsets(
-                use_lower, use_upper, use_digits, use_symbols,
-                exclude_similar, exclude_ambiguous
-            )
-            if not combined:
-                st.error("Select at least one character set.")
-                return
-            if length < len(groups):
-                st.error(f"Length ({length}) is too short for {len(groups)} required groups.")
-                return
-
-            bits = entropy_bits(length, len(combined))
-            st.caption(
-                f"Estimated entropy: **{bits:.1f} bits** — {strength_label(bits)} "
-                f"(alphabet ~{len(combined)} chars)"
-            )
-
-            passwords = [generate_one(int(length), groups, combined) for _ in range(int(count))]
-
-            # Dữ liệu cho iframe
-            pw_data = [{"plain": p, "masked": ("•" * len(p))} for p in passwords]
-            frame_height = min(720, 160 + 36 * len(pw_data))
-
-            components.html(
-                f"""
+    components.html(
+        f"""
 <style>
   :root {{ color-scheme: light dark; }}
   /* Mặc định (light) */
@@ -207,9 +174,128 @@ toggleBtn.addEventListener("click", () => {{
   toggleBtn.textContent = showPlain ? "🙈 Hide" : "👁 Show";
 }});
 </script>
-                """,
-                height=frame_height,
+        """,
+        height=frame_height,
+    )
+
+
+def _passphrase_ui() -> None:
+    sources = {p.name: p for p in wordlist_sources()}
+    upload_label = "Upload…"
+
+    colL, colR = st.columns([3, 2])
+    with colL:
+        words = st.slider("Words", 3, 12, 6, 1, key="pp_words")
+        count = st.number_input("Quantity", min_value=1, max_value=50, value=1, step=1, key="pp_count")
+        show_plain = st.checkbox("Show characters (unmasked)", value=False, key="pp_plain")
+    with colR:
+        source = st.selectbox("Wordlist", list(sources) + [upload_label], key="pp_source")
+        uploaded = None
+        if source == upload_label:
+            uploaded = st.file_uploader("Wordlist file (one word per line, diceware format ok)",
+                                        type=["txt"], key="pp_upload")
+        separators = st.text_input("Separators (several = random per gap)", "-", key="pp_sep")
+        capitalize = st.checkbox("Capitalize words", value=False, key="pp_cap")
+
+    if not sources and uploaded is None:
+        st.info("No wordlist found: put e.g. the EFF large wordlist in assets/wordlists "
+                "(or $VLABS_WORDLIST_DIR), or upload one.")
+    gen = st.button("🎲 Generate", type="primary", use_container_width=True, key="pp_gen")
+    if not gen:
+        return
+    try:
+        if uploaded is not None:
+            wl = load_wordlist_bytes(uploaded.getvalue(), uploaded.name)
+        elif source in sources:
+            wl = load_wordlist(sources[source])
+        else:
+            st.error("Select or upload a wordlist.")
+            return
+
+        bits = passphrase_bits(len(wl), int(words), separators)
+        note = ""
+        if not separators:
+            note = "; upper bound — words are joined without a separator"
+        elif not wl.unambiguous(separators):
+            note = "; upper bound — separators also occur inside words"
+        st.caption(
+            f"Entropy: **{bits:.1f} bits** — {strength_label(bits)} "
+            f"({len(wl):,} words in '{wl.name}'{note})"
+        )
+        passphrases = list(iter_passphrases(wl, int(count), words=int(words),
+                                            separators=separators, capitalize=capitalize))
+        _render_table(passphrases, show_plain)
+    except Exception as e:
+        st.error(f"Generation error: {e}")
+
+def render():
+    st.subheader("🔐 Encryption — Password Generator")
+
+    mode = st.radio("Mode", ["Password", "Passphrase"], horizontal=True, key="enc_mode")
+    if mode == "Passphrase":
+        _passphrase_ui()
+        return
+
+    colL, colR = st.columns([3, 2])
+    with colL:
+        length = st.slider("Password length", 8, 128, 16, 1)
+        count  = st.number_input("Quantity", min_value=1, max_value=50, value=1, step=1)
+        show_plain = st.checkbox("Show characters (unmasked)", value=False)
+    with colR:
+        st.markdown("**Character sets**")
+        use_lower  = st.checkbox("a–z", value=True)
+        use_upper  = st.checkbox("A–Z", value=True)
+        use_digits = st.checkbox("0–9", value=True)
+        use_symbols = st.checkbox("Symbols", value=False)
+
+        st.markdown("**Filters**")
+        exclude_similar   = st.checkbox("Exclude look-alike (I l 1 O 0 …)", value=True)
+        exclude_ambiguous = st.checkbox("Exclude ambiguous symbols ({ } [ ] …)", value=False)
+
+    with st.expander("Policy", expanded=False):
+        p1, p2, p3 = st.columns(3)
+        min_each = p1.number_input("Min per character set", min_value=0, max_value=MAX_MIN_PER_GROUP, value=1, step=1)
+        max_repeat = p2.number_input("Max repeated chars (0 = off)", min_value=0, max_value=16, value=0, step=1)
+        max_seq = p3.number_input("Max sequential chars (0 = off)", min_value=0, max_value=16, value=0, step=1)
+        forbid_text = st.text_input("Forbidden substrings (comma-separated, case-insensitive)", "")
+    forbidden = [w.strip() for w in forbid_text.split(",") if w.strip()]
+
+    gen = st.button("🎲 Generate", type="primary", use_container_width=True)
+
+    if gen:
+        try:
+            groups, combined = build_charsets(
+                use_lower, use_upper, use_digits, use_symbols,
+                exclude_similar, exclude_ambiguous
+            )
+            if not combined:
+                st.error("Select at least one character set.")
+                return
+            if length < len(groups) * int(min_each):
+                st.error(f"Length ({length}) is too short for {len(groups)} × {int(min_each)} required chars.")
+                return
+
+            constrained = min_each != 1 or max_repeat or max_seq or forbidden
+            if constrained:
+                with st.spinner("Compiling policy…"):
+                    policy = compile_policy(
+                        int(length), groups, [int(min_each)] * len(groups),
+                        int(max_repeat) or None, int(max_seq) or None, forbidden,
+                    )
+                bits = policy.bits
+            else:
+                bits = coverage_bits(int(length), groups)
+            st.caption(
+                f"Exact entropy: **{bits:.1f} bits** — {strength_label(bits)} "
+                f"(alphabet ~{len(combined)} chars; naive estimate {entropy_bits(length, len(combined)):.1f} bits)"
             )
 
+            if constrained:
+                passwords = list(policy.iter(int(count)))
+            else:
+                passwords = generate_batch(int(count), int(length), groups, combined)
+
+            _render_table(passwords, show_plain)
+
         except Exception as e:
             st.error(f"Generation error: {e}")
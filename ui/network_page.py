@@ -1,13 +1,20 @@
 # ui/network_page.py
 from __future__ import annotations
 
+import secrets
+import time
 import streamlit as st
 import streamlit.components.v1 as components
 from datetime import datetime
-from typing import List
+from typing import Callable, List
 
+from core.job_utils import Job, JobLimit, jobs
+from core.metrics_utils import metrics
+from core.port_utils import PortSet
 from core.network_utils import (
-    check_ssl, dns_lookup, whois_query, port_scan
+    check_ssl, dns_lookup, whois_query, port_scan, sweep_scan, parse_targets, ScanEvent,
+    iter_bulk_dns, read_names, ssl_inventory, iter_bulk_whois, iter_path_monitor,
+    governor_stats, set_network_owner, to_dataframe, DnsResult, WhoisInfo, PathHop,
 )
 
 # ---------------- Utils ----------------
@@ -88,14 +95,342 @@ def _client_ips_widget() -> None:
     )
 
 
+# ---------------- Bulk DNS ----------------
+_DNS_TYPES = ["A", "AAAA", "MX", "NS", "TXT", "CNAME"]
+
+def _bulk_dns_tab() -> None:
+    with st.form("f_bulk_dns"):
+        text = st.text_area("Hostnames (mỗi dòng 1 tên, hoặc phân cách bằng dấu phẩy)", height=150,
+                            placeholder="example.com\nwww.example.org")
+        up = st.file_uploader("Hoặc tải danh sách (.txt / .csv)", type=["txt", "csv"])
+        rtypes = st.multiselect("Record types", _DNS_TYPES, default=["A", "AAAA"])
+        ok = st.form_submit_button("Resolve")
+    if ok:
+        raw = text + "\n" + (up.getvalue().decode("utf-8", errors="ignore") if up else "")
+        names = read_names(raw)
+        if not names:
+            st.warning("Vui lòng nhập ít nhất 1 hostname.")
+        else:
+            # Cập nhật bảng theo nhịp thời gian, không theo từng tên
+            pbar = st.progress(0)
+            table = st.empty()
+            rows: List[DnsResult] = []
+            last = 0.0
+            for res in iter_bulk_dns(names, rtypes or ["A"]):
+                rows.append(res)
+                now = time.monotonic()
+                if now - last >= 0.5:
+                    last = now
+                    pbar.progress(min(len(rows) * 100 // len(names), 100))
+                    table.dataframe(to_dataframe(rows), use_container_width=True, hide_index=True)
+            pbar.progress(100)
+            table.empty()
+            st.session_state["bulk_dns_rows"] = rows
+
+    rows = st.session_state.get("bulk_dns_rows")
+    if rows:
+        df = to_dataframe(rows)
+        st.caption(f"{len(df)} tên — {(df['status'] == 'OK').sum()} OK")
+        st.dataframe(df, use_container_width=True, hide_index=True)
+        st.download_button("Download CSV", df.to_csv(index=False).encode("utf-8"),
+                           file_name="dns_bulk.csv", mime="text/csv")
+
+
+# ---------------- Bulk SSL ----------------
+def _bulk_ssl_section() -> None:
+    st.markdown("**Bulk certificate inventory**")
+    with st.form("f_ssl_bulk"):
+        text = st.text_area("Endpoints (host, host:port, https://host:port — mỗi dòng 1 mục)", height=150,
+                            placeholder="example.com\nmail.example.com:993")
+        ok = st.form_submit_button("Check all")
+    if ok:
+        if not text.strip():
+            st.warning("Vui lòng nhập ít nhất 1 endpoint.")
+        else:
+            pbar = st.progress(0)
+            certs = ssl_inventory(
+                text, progress_cb=lambda total, done: pbar.progress(min(done * 100 // max(total, 1), 100)))
+            pbar.empty()
+            st.session_state["ssl_bulk_rows"] = certs
+
+    rows = st.session_state.get("ssl_bulk_rows")
+    if rows:
+        df = to_dataframe(rows)
+        expiring = df["days_left"].notna() & (df["days_left"] < 30)
+        st.caption(f"{len(df)} endpoint — {int(expiring.sum())} chứng chỉ hết hạn trong < 30 ngày")
+        st.dataframe(df, use_container_width=True, hide_index=True)
+        st.download_button("Download CSV", df.to_csv(index=False).encode("utf-8"),
+                           file_name="ssl_inventory.csv", mime="text/csv")
+
+
+# ---------------- Jobs nền ----------------
+# Thao tác dài chạy trong core.job_utils (executor chung của tiến trình): rerun không làm mất việc,
+# session chỉ giữ job id; khi job đang chạy, phần hiển thị là fragment tự làm mới mỗi giây.
+# Job gắn owner = token ?sid= trên URL (xem _owner_id): reload vẫn gắn lại được, người khác không thấy.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment")
+
+def _job_caption(job: Job) -> None:
+    st.caption(f"Job {job.id} — {job.title} — {job.status} — {job.elapsed:.1f}s"
+               + (f" — {job.done}/{job.total}" if job.total else ""))
+
+def _submit(key: str, fn: Callable[..., object], *args, **kwargs) -> None:
+    try:
+        st.session_state[key] = jobs().submit(fn, *args, owner=_owner_id(), **kwargs)
+    except JobLimit as e:
+        st.warning(str(e))
+
+@_fragment(run_every=1.0)
+def _job_live(key: str, show: Callable[[Job], None]) -> None:
+    job = jobs().get(st.session_state.get(key), _owner_id())
+    if job is None or not job.active:
+        st.rerun()  # xong -> chạy lại cả trang để hiện kết quả tĩnh, ngừng poll
+    _job_caption(job)
+    show(job)
+    if st.button("Huỷ", key=f"{key}_cancel"):
+        job.cancel()
+
+def _job_panel(key: str, kind: str, show: Callable[[Job], None]) -> None:
+    """Hiển thị job gắn với session_state[key]; cho gắn lại job cùng loại của chính owner này."""
+    owner = _owner_id()
+    recent = jobs().list(kind, owner)
+    if st.session_state.get(key) is None:
+        live = next((j for j in recent if j.active), None)
+        if live is not None:   # vừa tải lại trang: tự gắn lại job đang chạy mới nhất
+            st.session_state[key] = live.id
+    if recent:
+        with st.expander(f"Jobs gần đây ({sum(j.active for j in recent)} đang chạy)"):
+            ids = [j.id for j in recent]
+            cur = st.session_state.get(key)
+            titles = {j.id: f"{j.id} — {j.title}" for j in recent}  # nhãn cố định (không kèm status)
+            st.caption(" · ".join(f"{j.id}: {j.status}" for j in recent[:10]))
+            pick = st.selectbox("Gắn lại job", ids, index=ids.index(cur) if cur in ids else 0,
+                                format_func=lambda i: titles.get(i, i), key=f"{key}_pick")
+            if st.button("Xem job này", key=f"{key}_attach"):
+                st.session_state[key] = pick
+    job = jobs().get(st.session_state.get(key), owner)
+    if job is None:
+        return
+    if job.active:
+        _job_live(key, show)
+    else:
+        _job_caption(job)
+        if job.error:
+            st.error(job.error)
+        show(job)
+
+
+# ---------------- Bulk WHOIS ----------------
+def _whois_job(ctx, names: List[str], refresh: bool) -> List[WhoisInfo]:
+    # Mỗi server WHOIS bị giãn cách vài giây/request -> đẩy dần từng dòng cho UI
+    rows: List[WhoisInfo] = []
+    it = iter_bulk_whois(names, refresh=refresh)
+    try:
+        for info in it:
+            rows.append(info)
+            ctx.emit(info)
+            ctx.progress(len(rows), len(names))
+            if ctx.cancelled:
+                break
+    finally:
+        it.close()
+    return rows
+
+def _show_whois_job(job: Job) -> None:
+    rows = job.items()
+    if job.active:
+        st.progress(job.percent)
+    if rows:
+        df = to_dataframe(rows)
+        if not job.active:
+            st.caption(f"{len(df)} domain — {int((df['source'] == 'cache').sum())} từ cache, "
+                       f"{int(df['error'].notna().sum())} lỗi")
+        st.dataframe(df, use_container_width=True, hide_index=True)
+        if not job.active:
+            st.download_button("Download CSV", df.to_csv(index=False).encode("utf-8"),
+                               file_name="whois_bulk.csv", mime="text/csv")
+
+def _bulk_whois_section() -> None:
+    st.markdown("**Bulk WHOIS**")
+    with st.form("f_whois_bulk"):
+        text = st.text_area("Domains (mỗi dòng 1 domain, hoặc phân cách bằng dấu phẩy)", height=150,
+                            placeholder="example.com\nexample.org")
+        refresh = st.checkbox("Bỏ qua cache", value=False)
+        ok = st.form_submit_button("Query all")
+    if ok:
+        names = read_names(text)
+        if not names:
+            st.warning("Vui lòng nhập ít nhất 1 domain.")
+        else:
+            _submit("whois_job", _whois_job, names, refresh, kind="whois", title=f"WHOIS {len(names)} domain")
+    _job_panel("whois_job", "whois", _show_whois_job)
+
+
+# ---------------- Port scan ----------------
+def _scan_job(ctx, targets: List[str], ports: PortSet, opts: dict) -> str:
+    multi = len(targets) > 1
+
+    def _on_event(ev: ScanEvent) -> None:
+        # event đã được gom theo thời gian/%, không theo từng port
+        ctx.progress(ev.done, ev.total)
+        if ev.new_open and not ev.final:
+            ctx.emit(*((f"{r.host}:{r.port}/tcp OPEN" if multi else f"{r.port}/tcp OPEN")
+                       + (f"  {r.detail}" if r.detail else "") for r in ev.new_open))
+
+    # Nhiều host -> sweep dùng chung 1 ngân sách kết nối
+    opts = dict(opts, event_cb=_on_event, cancel=ctx.cancel_event)
+    if multi:
+        return sweep_scan(targets, ports=ports, **opts)
+    return port_scan(targets[0], ports=ports, **opts)
+
+def _show_scan_job(job: Job) -> None:
+    if job.active:
+        st.progress(job.percent)
+        st.code("Đang quét...\n" + "\n".join(job.items()))
+    elif job.result is not None:
+        st.code(job.result)
+
+def _scan_tab() -> None:
+    with st.form("f_scan"):
+        host = st.text_input("Host/IP",
+                             placeholder="example.com | 10.0.0.0/24 | 10.0.0.1-50 | host1, host2")
+        ports_str = st.text_input("Ports",
+                                  placeholder="If It's empty -> return full range 1..65535")
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            order = st.selectbox("Order", ["Common ports first", "Numeric"])
+        with c2:
+            top_n = st.number_input("Top N (0 = all)", min_value=0, max_value=65535, value=0, step=100)
+        with c3:
+            budget = st.number_input("Time budget (s, 0 = none)", min_value=0, max_value=3600, value=0, step=5)
+        banners = st.checkbox("Grab banners (nhận diện dịch vụ trên port mở)", value=False)
+        ok = st.form_submit_button("Search")
+    if ok:
+        if not host.strip():
+            st.warning("Vui lòng nhập Host/IP.")
+        else:
+            try:
+                targets = list(parse_targets(host))
+            except ValueError as e:
+                st.error(str(e))
+                return
+            # Rỗng -> quét toàn bộ 1..65535 (PortSet lưu dạng đoạn, không bung ra list)
+            ports = PortSet.parse(ports_str) if ports_str.strip() else PortSet.full()
+            if not ports:
+                st.warning("Danh sách port không hợp lệ.")
+                return
+
+            opts = dict(
+                order="top" if order.startswith("Common") else "numeric",
+                top_n=int(top_n) or None,
+                time_budget=float(budget) or None,
+                banners=banners,
+            )
+            title = targets[0] if len(targets) == 1 else f"{len(targets)} host"
+            _submit("scan_job", _scan_job, targets, ports, opts, kind="scan",
+                    title=f"Scan {title} ({len(ports)} port)")
+    _capacity_caption()
+    _job_panel("scan_job", "scan", _show_scan_job)
+
+
+# ---------------- Path monitor ----------------
+def _path_job(ctx, host: str, rounds: int | None, interval: float) -> List[PathHop]:
+    rows: List[PathHop] = []
+    it = iter_path_monitor(host, rounds=rounds, interval=interval)
+    try:
+        # Mỗi lượt probe mọi TTL song song -> thay snapshot bảng hop
+        for i, hops in enumerate(it, 1):
+            rows = hops
+            ctx.publish(rows)
+            ctx.progress(i, rounds or 0)
+            if ctx.cancelled:
+                break
+    finally:
+        it.close()
+    return rows
+
+def _show_path_job(job: Job) -> None:
+    rows = job.result if not job.active and job.result is not None else job.snapshot
+    if rows:
+        st.dataframe(to_dataframe(rows), use_container_width=True, hide_index=True)
+
+def _path_tab() -> None:
+    with st.form("f_path"):
+        host = st.text_input("Host/IP", placeholder="example.com")
+        c1, c2 = st.columns(2)
+        with c1:
+            rounds = st.number_input("Số lượt (0 = chạy tới khi huỷ)", min_value=0, max_value=86400,
+                                     value=10, step=1)
+        with c2:
+            interval = st.number_input("Chu kỳ (s)", min_value=0.2, max_value=60.0, value=1.0, step=0.5)
+        ok = st.form_submit_button("Start")
+    if ok:
+        if not host.strip():
+            st.warning("Vui lòng nhập Host/IP.")
+        else:
+            # 0 vòng = monitor tới khi huỷ -> thread riêng, không giữ worker của pool
+            _submit("path_job", _path_job, host.strip(), int(rounds) or None, float(interval),
+                    kind="path", title=f"Path {host.strip()}", dedicated=not int(rounds))
+    _job_panel("path_job", "path", _show_path_job)
+
+
 # ---------------- Page ----------------
+# ---- Chẩn đoán: metrics của mọi thao tác mạng trong tiến trình ----
+def _metrics_tab() -> None:
+    m = metrics()
+    st.caption(f"Số liệu từ {datetime.fromtimestamp(m.started):%d/%m %H:%M:%S}, dùng chung mọi session. "
+               "Prometheus: `python cli.py serve` -> /metrics.")
+    c1, c2, _ = st.columns([1, 1, 6])
+    c1.button("Làm mới", key="metrics_refresh")
+    if c2.button("Reset", key="metrics_reset"):
+        m.reset()
+    _capacity_caption()
+    ops = m.ops()
+    if not ops:
+        st.info("Chưa có thao tác mạng nào được ghi nhận.")
+    else:
+        st.dataframe([{**o._asdict(), "error_pct": round(o.error_pct, 1)} for o in ops],
+                     use_container_width=True, hide_index=True)
+        st.caption("Độ trễ tính bằng ms; p50/p90/p99 ước lượng từ histogram. tcp_probe: từng port của scan; "
+                   "whois_wait: thời gian chờ lượt theo server (cao = đang bị giới hạn tốc độ).")
+    rows = [{"metric": n, "labels": ", ".join(f"{k}={v}" for k, v in lb.items()), "value": v}
+            for n, lb, v in m.counters() + m.gauges()]
+    if rows:
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+    with st.expander("Dạng text Prometheus"):
+        st.code(m.render_prometheus(), language="text")
+
+_OWNER_PARAM = "sid"
+
+def _owner_id() -> str:
+    """
+    Owner của job nền và lease mạng: token ngẫu nhiên giữ ở query param ?sid= của URL, nên tải
+    lại trang (session Streamlit mới) vẫn thấy và gắn lại được scan/monitor đang chạy.
+    Token là khoá: ai có URL đầy đủ cũng thấy/huỷ được job của owner đó.
+    """
+    sid = st.session_state.get("_owner_sid")
+    if sid is None:
+        sid = st.query_params.get(_OWNER_PARAM) or ""
+        if not (16 <= len(sid) <= 64 and sid.replace("-", "").replace("_", "").isalnum()):
+            sid = secrets.token_urlsafe(16)   # thiếu/sai dạng -> token mới, không nhận "default"...
+        st.session_state["_owner_sid"] = sid
+    if st.query_params.get(_OWNER_PARAM) != sid:   # đổi trang có thể xoá query param
+        st.query_params[_OWNER_PARAM] = sid
+    return sid
+
+def _capacity_caption() -> None:
+    g = governor_stats()
+    st.caption(f"Tải mạng chung: {g['in_flight']}/{g['capacity']} socket, {g['ops']}/{g['max_ops']} thao tác, "
+               f"{g['owners']} session" + (f", {g['waiting']} đang chờ" if g["waiting"] else ""))
+
 def render() -> None:
+    # Governor chia socket công bằng theo owner (token trên URL, sống qua reload) -> gắn cho mọi thao tác mạng
+    set_network_owner(_owner_id())
     #st.title("Network")
     #st.caption(" ")
 
     # Create tabs up-front so tab variables exist
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(
-        ["View IP", "Check SSL", "DNS", "WHOIS", "Port Scan"]
+    tab1, tab2, tab3, tab_bulk_dns, tab4, tab5, tab_path, tab_metrics = st.tabs(
+        ["View IP", "Check SSL", "DNS", "Bulk DNS", "WHOIS", "Port Scan", "Path", "Metrics"]
     )
 
     # ---- View IP ----
@@ -111,6 +446,7 @@ def render() -> None:
             ok = st.form_submit_button("Search")
         if ok and host.strip():
             st.code(check_ssl(host.strip(), int(port)))
+        _bulk_ssl_section()
 
     # ---- DNS ----
     with tab3:
@@ -120,6 +456,10 @@ def render() -> None:
         if ok and host.strip():
             st.code(dns_lookup(host.strip()))
 
+    # ---- Bulk DNS ----
+    with tab_bulk_dns:
+        _bulk_dns_tab()
+
     # ---- WHOIS ----
     with tab4:
         with st.form("f_whois"):
@@ -127,67 +467,19 @@ def render() -> None:
             ok = st.form_submit_button("Search")
         if ok and domain.strip():
             st.code(whois_query(domain.strip()))
+        _bulk_whois_section()
 
     # ---- Port Scan ----
     with tab5:
-        def _parse_ports(s: str) -> List[int]:
-            """Parse '22,80,443' and ranges like '1-1024' into a list of ints.
-            If s is empty -> return full range 1..65535
-            """
-            s = (s or "").strip()
-            if not s:
-                # Full scan
-                return list(range(1, 65536))
-
-            out: List[int] = []
-            for part in s.split(","):
-                part = part.strip()
-                if not part:
-                    continue
-                if "-" in part:
-                    a, b = part.split("-", 1)
-                    try:
-                        a, b = int(a), int(b)
-                        if a > b:
-                            a, b = b, a
-                        out.extend(range(max(1, a), min(65535, b) + 1))
-                    except Exception:
-                        pass
-                else:
-                    try:
-                        x = int(part)
-                        if 1 <= x <= 65535:
-                            out.append(x)
-                    except Exception:
-                        pass
-            # unique & sorted
-            return sorted(set(out))
-
-        with st.form("f_scan"):
-            host = st.text_input("Host/IP", placeholder="example.com")
-            ports_str = st.text_input("Ports",
-                                      placeholder="If It's empty -> return full range 1..65535")
-            ok = st.form_submit_button("Search")
-        if ok:
-            if not host.strip():
-                st.warning("Vui lòng nhập Host/IP.")
-            else:
-                ports = _parse_ports(ports_str)
-
-                # Progress bar
-                pbar = st.progress(0)
-                total_cache = {"total": max(len(ports), 1)}
-
-                def _cb(total: int, done: int) -> None:
-                    # network_utils.port_scan sẽ gọi callback với total & done
-                    total_cache["total"] = max(total, 1)
-                    p = int(done * 100 / total_cache["total"])
-                    pbar.progress(min(max(p, 0), 100))
-
-                # Thực hiện quét
-                result = port_scan(host.strip(), ports=ports, progress_cb=_cb)
-                pbar.progress(100)
-                st.code(result)
+        _scan_tab()
+
+    # ---- Path monitor ----
+    with tab_path:
+        _path_tab()
+
+    # ---- Metrics ----
+    with tab_metrics:
+        _metrics_tab()
 
 
 # Keep a callable for other modules